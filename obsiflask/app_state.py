@@ -1,6 +1,7 @@
 """
 A class to represent static variables used across the project
 """
+from collections import OrderedDict
 from datetime import datetime
 from obsiflask.config import AppConfig, UserConfig
 from obsiflask.version import get_version
@@ -13,13 +14,23 @@ class AppState:
     injected_vars_jinja: dict = {'version': get_version()}
     graphs: dict[str, "Graph"] = {}  # obsiflask.graph
     hints: dict[str, "HintIndex"] = {}
+    search_caches: dict[str, "SearchCache"] = {}  # obsiflask.search_cache
+    text_indices: dict[str, "TextIndex"] = {}  # obsiflask.text_index
+    mention_indices: dict[str, "MentionIndex"] = {}  # obsiflask.mentions
+    link_indices: dict[str, "LinkIndex"] = {}  # obsiflask.link_index
+    outline_indices: dict[str, "OutlineIndex"] = {}  # obsiflask.outline_index
+    property_indices: dict[str, "PropertyIndex"] = {}  # obsiflask.property_index
+    metadata_tables: dict[str, "MetadataTable"] = {}  # obsiflask.bases.metadata_table
+    materialized_views: dict[str, "MaterializedViews"] = {}  # obsiflask.bases.materialized
+    formula_caches: dict[str, "FormulaCache"] = {}  # obsiflask.bases.formula_cache
     session_tracker: dict[tuple[str, str], tuple[str, datetime]] = {
     }  # user, ip -> details, datetime
     users_per_vault: dict[str, set] = {}
     user_configs: dict[str, UserConfig] = {}
     vault_alias: dict[str, str] = {}
     shortlinks: dict[str, dict[str, str]] = {}
-    obfuscate_keys: dict[str, bytes] = {}
+    obfuscate_keys: OrderedDict[tuple[str, bytes], bytes] = OrderedDict(
+    )  # (key, salt) -> derived key, see obsiflask.encrypt.obfuscate
 
     @staticmethod
     def inject_vars():
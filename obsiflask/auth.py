@@ -52,7 +52,7 @@ def make_user_adjustments(user: str):
     """
     for vault in AppState.hints:
         hi: HintIndex = AppState.hints[vault]
-        hi.default_files_per_user[user] = copy(hi.default_files_per_user[None])
+        hi.populate_default_files(user, hi.default_files_per_user[None])
         AppState.messages[(vault, user)] = []
         cfg_dir_path = resolve_service_path(Path(AppState.config.auth.user_config_dir))
         cfg_path = cfg_dir_path / f'{user}.yml'
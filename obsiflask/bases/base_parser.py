@@ -4,13 +4,13 @@ Logic for parsing bases
 from typing import Callable
 
 from omegaconf import OmegaConf
-from lark import Lark
 
 from obsiflask.app_state import AppState
-from obsiflask.bases.view import View
+from obsiflask.bases.view import SUMMARIES, View
 from obsiflask.bases.filter import Filter, FilterAnd, FilterOr, FieldFilter, TrivialFilter
 from obsiflask.messages import add_message
-from obsiflask.bases.grammar import FilterTransformer, grammar
+from obsiflask.bases.compiler import compile_formula
+from obsiflask.bases.formula_cache import memoize_formula
 from obsiflask.utils import get_traceback
 
 class Base:
@@ -26,9 +26,13 @@ class Base:
             path (str): path to base w.r.t. vault
         """
         self.formulas = {}
+        self.vector_formulas = {}
+        self.content_formulas = set()
         self.properties = {}
         self.global_filter: Filter = None
         self.views: dict[str, View] = {}
+        self.materialized = False
+        # if set, the views are kept up to date in the background, see obsiflask.bases.materialized
 
 
 def parse_filter(filter_dict: dict, vault) -> Filter:
@@ -69,8 +73,12 @@ def parse_filter(filter_dict: dict, vault) -> Filter:
             return TrivialFilter()
 
 
-def parse_view(view: dict, vault: str, formulas: list[Callable],
-               properties: dict, base_path: str) -> View:
+def parse_view(view: dict,
+               vault: str,
+               formulas: list[Callable],
+               properties: dict,
+               base_path: str,
+               vector_formulas: dict | None = None) -> View:
     """
     View parsing
 
@@ -80,11 +88,13 @@ def parse_view(view: dict, vault: str, formulas: list[Callable],
         formulas (list[Callable]): list of callables for each formula
         properties (dict): dictionary of properties
         base_path (str): real path 
+        vector_formulas (dict | None, optional): formulae compiled for the metadata table.
+            Defaults to None.
 
     Returns:
         View: resulting view
     """
-    result = View(formulas, properties, base_path)
+    result = View(formulas, properties, base_path, vector_formulas)
     result.type = view['type']
     if result.type not in ['table', 'cards']:
         if AppState.config.vaults[vault].base_config.error_on_yaml_parse:
@@ -100,9 +110,25 @@ def parse_view(view: dict, vault: str, formulas: list[Callable],
     else:
         result.filter = TrivialFilter()
     result.order = view['order']
+    if view.get('limit') is not None:
+        result.limit = int(view['limit'])
     if 'sort' in view:
         for s in view['sort']:
             result.sorts.append((s['property'], s['direction']))
+    if view.get('groupBy') is not None:
+        group_by = view['groupBy']
+        if isinstance(group_by, str):
+            result.group_by = (group_by, 'ASC')
+        else:
+            result.group_by = (group_by['property'],
+                               group_by.get('direction', 'ASC'))
+    for prop, summary in view.get('summaries', {}).items():
+        if summary not in SUMMARIES:
+            if AppState.config.vaults[vault].base_config.error_on_yaml_parse:
+                raise ValueError(f'unsupported summary: {summary}')
+            add_message(f'unsupported summary: {summary}. Skipping', 1, vault)
+            continue
+        result.summaries[prop] = summary
     return result
 
 
@@ -125,12 +151,12 @@ def parse_base(real_path: str, vault: str) -> Base:
         base.global_filter = TrivialFilter()
 
     base.properties = yaml.get('properties', {})
+    base.materialized = bool(yaml.get('materialized', False))
     for key, formula in yaml.get('formulas', {}).items():
-        parser = Lark(grammar, start="start", parser="lalr")
-        try:
-            func = FilterTransformer().transform(parser.parse(formula))
-
-        except Exception as e:
+        compiled = compile_formula(formula)
+        func = compiled.func
+        if compiled.exception is not None:
+            e = compiled.exception
             if AppState.config.vaults[vault].base_config.error_on_field_parse:
                 raise ValueError(
                     f'Problems with formula {formula} parsing: {e}')
@@ -139,10 +165,19 @@ def parse_base(real_path: str, vault: str) -> Base:
                     f'Problems with formula {formula} parsing. Skipping', 1,
                     vault, get_traceback(e))
                 func = lambda x: ''
+        else:
+            func = memoize_formula(vault, formula, func)
+            if compiled.content:
+                base.content_formulas.add(key)
+            if compiled.vector_func is not None:
+                base.vector_formulas[key] = compiled.vector_func
         base.formulas[key] = func
 
     for view in yaml.get('views', []):
         base.views[view['name']] = parse_view(view, vault, base.formulas,
-                                              base.properties, real_path)
+                                              base.properties, real_path,
+                                              base.vector_formulas)
         base.views[view['name']].global_filter = base.global_filter
+        base.views[view['name']].materialized = base.materialized
+        base.views[view['name']].content_formulas = base.content_formulas
     return base
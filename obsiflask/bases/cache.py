@@ -1,10 +1,39 @@
 """
-A caching mechanism for bases. Will be removed in future
+A caching mechanism for bases.
 
+Rendered views are kept in a memory-bounded LRU (budget per vault, see BaseConfig.cache_size_mb).
+Entries are invalidated by the file index updates:
+    * added or removed files drop all the views of the vault
+    * modified files drop the views that show them,
+      other views check lazily on the next request if the modified files are accepted by their filters now
+Entries also expire after BaseConfig.cache_time seconds
 """
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
 from threading import Lock
+import json
 import time
+from typing import Any, Callable
+
 from obsiflask.app_state import AppState
+from obsiflask.file_index import FileIndexDelta
+
+
+@dataclass
+class CacheEntry:
+    """
+    Rendered view with its dependencies
+    """
+    result: Any
+    time: float
+    size: int
+    paths: set[Path] | None = None
+    # files shown in the view, None if the view depends on all the files
+    matches: Callable[[set[Path]], bool] | None = None
+    # checks if any of the changed files is accepted by the view filters
+    changed: set[Path] = field(default_factory=set)
+    # files modified after rendering, checked with "matches" on the next request
 
 
 class BaseCache:
@@ -12,7 +41,59 @@ class BaseCache:
     This class represents global variables for caching base results
     """
     cache_lock = Lock()
-    cache: dict[tuple[str, str, str], tuple[str, int]] = {}
+    cache: OrderedDict[tuple[str, str, str], CacheEntry] = OrderedDict()
+    sizes: dict[str, int] = {}
+    # vault -> total size of the entries
+    counters: dict[str, dict[str, int]] = {}
+    # vault -> hits, misses, evictions, invalidations
+
+    @staticmethod
+    def result_size(result: Any) -> int:
+        """
+        Approximate size of the rendered view
+
+        Args:
+            result (Any): json-compatible result
+
+        Returns:
+            int: size in bytes
+        """
+        return len(json.dumps(result, default=str))
+
+    @staticmethod
+    def _count(vault: str, counter: str, value: int = 1):
+        """
+        Increases the counter. Must be called under the lock
+        """
+        counters = BaseCache.counters.setdefault(
+            vault, {
+                'hits': 0,
+                'misses': 0,
+                'evictions': 0,
+                'invalidations': 0
+            })
+        counters[counter] += value
+
+    @staticmethod
+    def _drop(key: tuple[str, str, str]):
+        """
+        Removes the entry. Must be called under the lock
+        """
+        entry = BaseCache.cache.pop(key)
+        BaseCache.sizes[key[0]] = BaseCache.sizes.get(key[0], 0) - entry.size
+
+    @staticmethod
+    def clear(vault: str | None = None):
+        """
+        Drops the entries
+
+        Args:
+            vault (str | None, optional): vault name, all the vaults if not set. Defaults to None.
+        """
+        with BaseCache.cache_lock:
+            for key in list(BaseCache.cache):
+                if vault is None or key[0] == vault:
+                    BaseCache._drop(key)
 
     @staticmethod
     def prune():
@@ -23,16 +104,42 @@ class BaseCache:
             to_delete = set()
             for k, v in BaseCache.cache.items():
                 vault = k[0]
-                old_time = v[1]
-                delta = time.time() - old_time
+                delta = time.time() - v.time
                 if AppState.config.vaults[
                         vault].base_config.cache_time < delta:
                     to_delete.add(k)
             for k in to_delete:
-                del BaseCache.cache[k]
+                BaseCache._drop(k)
+
+    @staticmethod
+    def update(vault: str, delta: FileIndexDelta):
+        """
+        Invalidates the entries w.r.t. changed files
+
+        Args:
+            vault (str): vault name
+            delta (FileIndexDelta): changes from the file index
+        """
+        with BaseCache.cache_lock:
+            for key, entry in list(BaseCache.cache.items()):
+                if key[0] != vault:
+                    continue
+                if (delta.added or delta.removed or entry.paths is None
+                        or Path(key[1]) in delta.modified
+                        or entry.paths & delta.modified):
+                    # new or removed files can change the results and the links
+                    BaseCache._drop(key)
+                    BaseCache._count(vault, 'invalidations')
+                else:
+                    entry.changed |= delta.modified
 
     @staticmethod
-    def add_to_cache(vault: str, base_path: str, view: str, result: str):
+    def add_to_cache(vault: str,
+                     base_path: str,
+                     view: str,
+                     result: str,
+                     paths: set[Path] | None = None,
+                     matches: Callable[[set[Path]], bool] | None = None):
         """
         Adds base cache to base
 
@@ -41,10 +148,30 @@ class BaseCache:
             base_path (str): path to base w.r.t. vault
             view (str): view name
             result (str): result to save
+            paths (set[Path] | None, optional): files shown in the view.
+                If not set, any change in the vault drops the result. Defaults to None.
+            matches (Callable[[set[Path]], bool] | None, optional): checks if any of the modified
+                files is accepted by the view. If not set, any modified file drops the result.
+                Defaults to None.
         """
-        time_s = time.time()
-        BaseCache.prune()
-        BaseCache.cache[(vault, base_path, view)] = (result, time_s)
+        key = (vault, base_path, view)
+        size = BaseCache.result_size(result)
+        max_bytes = AppState.config.vaults[
+            vault].base_config.cache_size_mb * 1024 * 1024
+        if size > max_bytes:
+            return
+        with BaseCache.cache_lock:
+            if key in BaseCache.cache:
+                BaseCache._drop(key)
+            BaseCache.cache[key] = CacheEntry(result, time.time(), size,
+                                              paths, matches)
+            BaseCache.sizes[vault] = BaseCache.sizes.get(vault, 0) + size
+            for old_key in list(BaseCache.cache):
+                if BaseCache.sizes[vault] <= max_bytes:
+                    break
+                if old_key[0] == vault:
+                    BaseCache._drop(old_key)
+                    BaseCache._count(vault, 'evictions')
 
     @staticmethod
     def get_from_cache(vault: str, base_path: str,
@@ -57,11 +184,64 @@ class BaseCache:
             view (str): view name
 
         Returns:
-            tuple[str | None, bool]: string or None for the first variable in return, 
+            tuple[str | None, bool]: string or None for the first variable in return,
             flag if it was in cache for the second argument
         """
-        BaseCache.prune()
-        res = BaseCache.cache.get((vault, base_path, view), (None, None))
-        if res[1] is not None:
-            return res[0], True
-        return None, False
+        key = (vault, base_path, view)
+        with BaseCache.cache_lock:
+            entry = BaseCache.cache.get(key)
+            if entry is not None and time.time() - entry.time > AppState.config.vaults[
+                    vault].base_config.cache_time:
+                BaseCache._drop(key)
+                entry = None
+            if entry is None:
+                BaseCache._count(vault, 'misses')
+                return None, False
+            changed = entry.changed
+            entry.changed = set()
+        if changed and (entry.matches is None or entry.matches(changed)):
+            # the filters are checked without the lock, as they can read the files
+            with BaseCache.cache_lock:
+                if BaseCache.cache.get(key) is entry:
+                    BaseCache._drop(key)
+                BaseCache._count(vault, 'invalidations')
+                BaseCache._count(vault, 'misses')
+            return None, False
+        with BaseCache.cache_lock:
+            if key in BaseCache.cache:
+                BaseCache.cache.move_to_end(key)
+            BaseCache._count(vault, 'hits')
+        return entry.result, True
+
+    @staticmethod
+    def stats(vault: str) -> dict[str, int]:
+        """
+        Returns cache counters
+
+        Args:
+            vault (str): vault name
+
+        Returns:
+            dict[str, int]: counters
+        """
+        max_bytes = AppState.config.vaults[
+            vault].base_config.cache_size_mb * 1024 * 1024
+        with BaseCache.cache_lock:
+            BaseCache._count(vault, 'hits', 0)
+            stats = dict(BaseCache.counters[vault])
+            stats['entries'] = sum(1 for k in BaseCache.cache if k[0] == vault)
+            stats['bytes'] = BaseCache.sizes.get(vault, 0)
+            stats['max_bytes'] = int(max_bytes)
+            return stats
+
+
+def init_base_cache(vault: str):
+    """
+    Drops the cached views of the vault and subscribes the cache for the file index updates
+
+    Args:
+        vault (str): vault name
+    """
+    BaseCache.clear(vault)
+    AppState.indices[vault].add_listener(
+        lambda delta: BaseCache.update(vault, delta))
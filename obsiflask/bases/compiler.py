@@ -0,0 +1,279 @@
+"""
+Compilation of Bases expressions.
+
+Expressions are parsed with the shared parser (obsiflask.bases.grammar.parser),
+optimized and transformed into functions of FileInfo.
+The compiled expressions are cached by the expression string, so the same filter
+in a base, a graph legend or a search request is compiled once.
+
+Optimizations:
+    * constant folding: constant subexpressions are computed during compilation
+    * predicate reordering (filters only): operands of "and"/"or" chains are ordered by cost,
+      so the checks of the file path run before the checks that read the file
+"""
+import ast
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+from lark import Tree, Token
+
+from obsiflask.bases.grammar import FilterTransformer, parser
+from obsiflask.bases.vectorized import (ARITHMETIC, OPS, NotVectorized,
+                                        VectorFunc, compile_tree)
+
+CACHE_SIZE = 1024
+"""
+Number of compiled expressions kept in cache
+"""
+
+PATH_PROPERTIES = {'name', 'path', 'folder', 'ext'}
+"""
+File properties that are computed from the path without reading the file
+"""
+
+STAT_PROPERTIES = {'mtime', 'size'}
+"""
+File properties that need only the file status
+"""
+
+CONTENT_PROPERTIES = {'tags', 'links'}
+"""
+File properties that need the whole file content, other properties need at most the frontmatter
+"""
+
+CONTENT_METHODS = {'hasTag'}
+"""
+File methods that need the whole file content
+"""
+
+CONTENT_COST = 3
+"""
+Cost of the expressions that read the whole file, see get_cost
+"""
+
+UNARY = {
+    'not_': lambda a: not a,
+    'neg_': lambda a: -a,
+}
+"""
+Unary operators of the grammar
+"""
+
+
+@dataclass
+class Compiled:
+    """
+    Compiled expression
+    """
+    tree: Tree | None = None
+    # optimized tree
+    func: Callable[[Any], Any] | None = None
+    # function of FileInfo
+    vector_func: VectorFunc | None = None
+    # function of the metadata table, None if the expression is not vectorized
+    cost: int = 0
+    # relative cost of the evaluation for one file
+    content: bool = False
+    # if set, the expression needs the file content, not only the frontmatter
+    exception: Exception | None = None
+    # parsing error
+
+
+def const_value(tree: Tree) -> tuple[bool, Any]:
+    """
+    Returns the value of the constant subtree
+
+    Args:
+        tree (Tree): subtree
+
+    Returns:
+        tuple[bool, Any]: flag if the subtree is a constant and the value
+    """
+    if isinstance(tree, Tree) and tree.data == 'string':
+        return True, ast.literal_eval(tree.children[0])
+    if isinstance(tree, Tree) and tree.data == 'number':
+        tok = tree.children[0]
+        return True, float(tok) if "." in tok else int(tok)
+    if isinstance(tree, Tree) and tree.data == 'const':
+        return True, tree.children[0]
+    return False, None
+
+
+def fold_constants(tree: Tree) -> Tree:
+    """
+    Computes the constant subexpressions.
+    Subexpressions that fail (e.g. 1 / 0) are kept, so the error is raised during evaluation
+
+    Args:
+        tree (Tree): expression tree
+
+    Returns:
+        Tree: tree with "const" nodes instead of the constant subexpressions
+    """
+    if not isinstance(tree, Tree) or tree.data in ['attr', 'number', 'string']:
+        return tree
+    children = [fold_constants(c) for c in tree.children]
+    tree = Tree(tree.data, children)
+    if tree.data in ['and_', 'or_']:
+        is_const, value = const_value(children[0])
+        if is_const:
+            if bool(value) == (tree.data == 'and_'):
+                return children[1]
+            return Tree('const', [value])
+        return tree
+    if tree.data == 'binop':
+        left, op, right = children
+        func = OPS.get(str(op))
+        operands = [left, right]
+    elif tree.data in ARITHMETIC:
+        func = ARITHMETIC[tree.data]
+        operands = children
+    elif tree.data in UNARY:
+        func = UNARY[tree.data]
+        operands = children
+    else:
+        return tree
+    values = [const_value(c) for c in operands]
+    if func is None or not all(is_const for is_const, _ in values):
+        return tree
+    try:
+        return Tree('const', [func(*[v for _, v in values])])
+    except Exception:
+        return tree
+
+
+def get_cost(tree: Tree) -> int:
+    """
+    Estimates the cost of the expression for one file:
+    0 for the path properties and constants, 1 for the file status, 2 for the frontmatter,
+    CONTENT_COST if the whole file must be read
+
+    Args:
+        tree (Tree): expression tree
+
+    Returns:
+        int: cost
+    """
+    if not isinstance(tree, Tree):
+        return 0
+    if tree.data == 'attr':
+        names = [str(c) for c in tree.children]
+        if len(names) >= 2 and names[0] == 'file':
+            if names[1] in CONTENT_PROPERTIES:
+                return CONTENT_COST
+            if len(names) == 2 and names[1] in PATH_PROPERTIES:
+                return 0
+            if len(names) == 2 and names[1] in STAT_PROPERTIES:
+                return 1
+        return 2
+    if tree.data == 'method':
+        names = [
+            str(c) for c in tree.children
+            if isinstance(c, Token) and c.type == 'NAME'
+        ]
+        receiver = Tree('attr', names[:-1])
+        if names[:-1] == ['file'] and names[-1] in CONTENT_METHODS:
+            cost = CONTENT_COST
+        else:
+            cost = get_cost(receiver)
+        return max([cost] + [get_cost(c) for c in tree.children])
+    return max([get_cost(c) for c in tree.children], default=0)
+
+
+def uses_content(tree: Tree) -> bool:
+    """
+    Checks if the expression needs the file content (e.g. file.tags or file.hasTag)
+
+    Args:
+        tree (Tree): expression tree
+
+    Returns:
+        bool: True if the content must be read
+    """
+    return get_cost(tree) >= CONTENT_COST
+
+
+def _chain(tree: Tree, op: str) -> list[Tree]:
+    """
+    Returns the operands of the chain "a op b op c ..."
+    """
+    if isinstance(tree, Tree) and tree.data == op:
+        return [o for c in tree.children for o in _chain(c, op)]
+    return [tree]
+
+
+def reorder_predicates(tree: Tree) -> Tree:
+    """
+    Orders the operands of "and"/"or" chains by cost, operands of equal cost keep the source order.
+    It is used only for filters: the truth value is the same if no operand fails,
+    but the reordering can change which files report errors
+    (e.g. a failing operand is skipped after a cheaper false one)
+
+    Args:
+        tree (Tree): expression tree
+
+    Returns:
+        Tree: reordered tree
+    """
+    if not isinstance(tree, Tree) or tree.data in ['attr', 'number', 'string']:
+        return tree
+    if tree.data in ['and_', 'or_']:
+        operands = [
+            reorder_predicates(c) for c in _chain(tree, tree.data)
+        ]
+        operands.sort(key=get_cost)
+        result = operands[-1]
+        for operand in operands[-2::-1]:
+            # right-nested, as produced by the parser
+            result = Tree(tree.data, [operand, result])
+        return result
+    return Tree(tree.data, [reorder_predicates(c) for c in tree.children])
+
+
+def _compile(expr: str, is_filter: bool) -> Compiled:
+    """
+    Parses and compiles the expression
+    """
+    try:
+        tree = parser.parse(expr)
+        tree = fold_constants(tree)
+        if is_filter:
+            tree = reorder_predicates(tree)
+        func = FilterTransformer().transform(tree)
+    except Exception as e:
+        return Compiled(exception=e)
+    try:
+        vector_func = compile_tree(tree)
+    except NotVectorized:
+        vector_func = None
+    return Compiled(tree, func, vector_func, get_cost(tree),
+                    uses_content(tree))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_filter(expr: str) -> Compiled:
+    """
+    Compiles the filter expression. Only the truth value of the result is meaningful
+
+    Args:
+        expr (str): expression
+
+    Returns:
+        Compiled: compiled filter
+    """
+    return _compile(expr, True)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_formula(expr: str) -> Compiled:
+    """
+    Compiles the formula expression
+
+    Args:
+        expr (str): expression
+
+    Returns:
+        Compiled: compiled formula
+    """
+    return _compile(expr, False)
@@ -1,6 +1,11 @@
 """
 This module dexcirbes a FileInfo: a file representation that stores different properties 
-userful for the vault
+userful for the vault.
+
+The file is read lazily in tiers, each property reads only the tier it needs:
+    * path properties, mtime and size: no reading (file status only)
+    * frontmatter properties: only the frontmatter block is read (see read_header)
+    * tags and links: the whole content is read (see get_internal_data)
 """
 import os
 from pathlib import Path
@@ -8,14 +13,14 @@ from typing import Any
 from threading import Lock
 
 from flask import url_for
-from frontmatter import parse
 
 from obsiflask.utils import logger
 from obsiflask.app_state import AppState
 from obsiflask.messages import add_message, type_to_int
 from obsiflask.consts import COVER_KEY, wikilink, hashtag, MAX_FILE_SIZE_MARKDOWN
 from obsiflask.utils import get_traceback
-from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.text_index import read_header, read_text
+from obsiflask.frontmatter_parser import parse_metadata
 
 class FileInfo:
 
@@ -30,11 +35,49 @@ class FileInfo:
             index_path.resolve())
         self.real_path = Path(path).resolve()
         self.read = False  # indicates that we didn't read the file content yet
+        self.header_read = False  # indicates that we didn't parse the frontmatter yet
         self._tags = set()
         self.frontmatter = {}
         self._links = set()
+        self._raw_links: list[str] = []
+        self._links_generation = None
         self.lock = Lock()
 
+    def _parse_frontmatter(self, text: str):
+        """
+        Parses the frontmatter. Must be called under the lock
+
+        Args:
+            text (str): content of the file or its frontmatter block
+        """
+        try:
+            parsed = parse_metadata(text)
+        except Exception as e:
+            add_message(f'bad properties for file {self.vault_path}',
+                        type_to_int['warning'], self.vault, get_traceback(e))
+            parsed = {}
+        self.frontmatter = parsed
+        self.header_read = True
+
+    def read_header(self):
+        """
+        Reads only the frontmatter of the file, the content after it is not read
+        """
+        with self.lock:
+            if self.header_read:
+                return
+            if self.vault_path.suffix != '.md':
+                self.header_read = True
+                return
+            try:
+                self._parse_frontmatter(read_header(self.real_path,
+                                                    self.vault))
+            except Exception as e:
+                logger.warning(
+                    f'could not parse metadata from {self.vault_path}. Ignore it, if the fils is binary: {e}'
+                )
+            self.header_read = True
+
     def get_internal_data(self):
         """
         Reads file content and save tags and links
@@ -48,22 +91,14 @@ class FileInfo:
                 )
             if self.vault_path.suffix != '.md':
                 self.read = True
+                self.header_read = True
                 return
             try:
-                with obf_open(self.real_path, self.vault) as inp:
-                    text = inp.read()
-                matches = wikilink.finditer(text)
-
-                for m in matches:
-                    link = m.group(1)
-                    link = AppState.indices[self.vault].resolve_wikilink(
-                        link,
-                        self.real_path,
-                        True,
-                        escape=False,
-                        relative=False, wrt_anchor=False)
-                    if link:
-                        self._links.add(link)
+                text = read_text(self.real_path, self.vault)
+                self._raw_links = [
+                    m.group(1) for m in wikilink.finditer(text)
+                ]
+                self.resolve_links()
 
                 matches = hashtag.finditer(text)
 
@@ -71,14 +106,9 @@ class FileInfo:
                     tag = m.group(1).lstrip('#')
                     self._tags.add(tag)
 
-                try:
-                    parsed, _ = parse(text)
-                except Exception as e:
-                    add_message(f'bad properties for file {self.vault_path}',
-                                type_to_int['warning'], self.vault, get_traceback(e))
-                    parsed = {}
-                self.frontmatter = parsed
-                tags = parsed.get('tags', [])
+                if not self.header_read:
+                    self._parse_frontmatter(text)
+                tags = self.frontmatter.get('tags', [])
                 if isinstance(tags, str):
                     tags = [tags]
                 self._tags = self._tags | set([t.lstrip('#') for t in tags])
@@ -88,6 +118,27 @@ class FileInfo:
                     f'could not parse metadata from {self.vault_path}. Ignore it, if the fils is binary: {e}'
                 )
             self.read = True
+            self.header_read = True
+
+    def resolve_links(self):
+        """
+        Resolves wikilinks found in the file w.r.t. the current file index.
+        Since the resolution depends on the set of vault files, 
+        the links are resolved again when files are added or removed
+        """
+        index = AppState.indices[self.vault]
+        links = set()
+        for link in self._raw_links:
+            link = index.resolve_wikilink(link,
+                                          self.real_path,
+                                          True,
+                                          escape=False,
+                                          relative=False,
+                                          wrt_anchor=False)
+            if link:
+                links.add(link)
+        self._links = links
+        self._links_generation = getattr(index, 'names_generation', None)
 
     def handle_cover(self, value: str) -> str:
         """
@@ -130,11 +181,20 @@ class FileInfo:
                     return (str(self.vault_path))
                 elif args[1] == 'ext':
                     return str(self.vault_path.suffix.lstrip('.'))
+                elif args[1] == 'mtime':
+                    return os.path.getmtime(self.real_path)
+                elif args[1] == 'size':
+                    return os.path.getsize(self.real_path)
                 elif args[1] == 'tags':
                     self.get_internal_data()
                     return list(self._tags)
                 elif args[1] == 'links':
                     self.get_internal_data()
+                    if self._links_generation != getattr(
+                            AppState.indices[self.vault], 'names_generation',
+                            None):
+                        with self.lock:
+                            self.resolve_links()
                     return self._links
                 elif args[1] == 'name':
                     if render:
@@ -149,7 +209,7 @@ class FileInfo:
                         return (self.vault_path)
                     return self
 
-                self.get_internal_data()
+                self.read_header()
                 if args[0] == COVER_KEY and render and COVER_KEY in self.frontmatter:
                     return self.handle_cover(self.frontmatter[COVER_KEY])
                 return self.frontmatter.get(args[0], '')
@@ -1,19 +1,71 @@
 """
 Filtering logic for vault bases
 """
+from pathlib import Path
 
-from lark import Lark
+import numpy as np
+import pandas as pd
+from lark import Tree, Token
 
-from obsiflask.bases.grammar import FilterTransformer, grammar
+from obsiflask.bases.compiler import compile_filter, const_value, get_cost
+from obsiflask.bases.vectorized import NotVectorized, compile_tree, evaluate_mask
 from obsiflask.bases.file_info import FileInfo
 from obsiflask.app_state import AppState
 from obsiflask.messages import add_message
 
+Plan = tuple[set[Path] | None, bool]
+"""
+Candidates of the filter (None for all the files) and a flag
+if the candidates satisfy the filter exactly, so the check can be skipped
+"""
+
+
+def plan_and(plans: list[Plan]) -> Plan:
+    """
+    Combines plans of the "and" filter
+
+    Args:
+        plans (list[Plan]): plans of the children
+
+    Returns:
+        Plan: plan
+    """
+    candidates = None
+    for c, _ in plans:
+        if c is not None:
+            candidates = c if candidates is None else candidates & c
+    return candidates, all(exact for _, exact in plans)
+
+
+def plan_or(plans: list[Plan]) -> Plan:
+    """
+    Combines plans of the "or" filter
+
+    Args:
+        plans (list[Plan]): plans of the children
+
+    Returns:
+        Plan: plan
+    """
+    if any(c is None for c, _ in plans):
+        # a child that accepts everything makes the filter trivial
+        return None, any(c is None and exact for c, exact in plans)
+    return set().union(*[c for c, _ in plans]), all(exact
+                                                    for _, exact in plans)
+
 
 class Filter:
     """
     Abstract class to represent a filter
     """
+    cost: int = 0
+    """
+    Relative cost of the check for one file, used to order the checks
+    """
+    content: bool = False
+    """
+    If set, the check needs the file content (tags or links), not only the frontmatter
+    """
 
     def check(file: FileInfo) -> bool:
         """
@@ -27,6 +79,33 @@ class Filter:
         """
         raise NotImplementedError()
 
+    def plan(self, vault: str) -> Plan:
+        """
+        Finds the files that can satisfy the filter using the vault indices
+
+        Args:
+            vault (str): vault name
+
+        Returns:
+            Plan: candidates and exactness flag
+        """
+        return None, False
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Checks all the files of the metadata table at once
+
+        Args:
+            frame (pd.DataFrame): metadata table, see obsiflask.bases.metadata_table
+
+        Returns:
+            np.ndarray: boolean mask of the accepted files
+
+        Raises:
+            NotVectorized: if the filter can be checked only file by file
+        """
+        raise NotVectorized(f'{type(self).__name__} is not vectorized')
+
 
 class FilterAnd(Filter):
     """
@@ -42,9 +121,21 @@ class FilterAnd(Filter):
         """
         super().__init__()
         self.children = filters
+        self.cost = max([c.cost for c in filters], default=0)
+        self.content = any(c.content for c in filters)
+        self.ordered = sorted(filters, key=lambda c: c.cost)
 
     def check(self, file):
-        return all([c.check(file) for c in self.children])
+        return all(c.check(file) for c in self.ordered)
+
+    def plan(self, vault):
+        return plan_and([c.plan(vault) for c in self.children])
+
+    def mask(self, frame):
+        result = np.ones(len(frame), dtype=bool)
+        for c in self.children:
+            result &= c.mask(frame)
+        return result
 
 
 class FilterOr(Filter):
@@ -57,13 +148,25 @@ class FilterOr(Filter):
         Constructor
 
         Args:
-            filters (list[Filter]): filter to check with "AND" operator
+            filters (list[Filter]): filter to check with "OR" operator
         """
         super().__init__()
         self.children = filters
+        self.cost = max([c.cost for c in filters], default=0)
+        self.content = any(c.content for c in filters)
+        self.ordered = sorted(filters, key=lambda c: c.cost)
 
     def check(self, file):
-        return any([c.check(file) for c in self.children])
+        return any(c.check(file) for c in self.ordered)
+
+    def plan(self, vault):
+        return plan_or([c.plan(vault) for c in self.children])
+
+    def mask(self, frame):
+        result = np.zeros(len(frame), dtype=bool)
+        for c in self.children:
+            result |= c.mask(frame)
+        return result
 
 
 class TrivialFilter(Filter):
@@ -75,8 +178,14 @@ class TrivialFilter(Filter):
     def check(self, file: FileInfo):
         return True
 
+    def plan(self, vault):
+        return None, True
+
+    def mask(self, frame):
+        return np.ones(len(frame), dtype=bool)
+
 
-class FieldFilter:
+class FieldFilter(Filter):
     """
     Filter that parses formula and check files against this formula
     """
@@ -88,13 +197,118 @@ class FieldFilter:
         Args:
             expr (str): expression for the filter
         """
-        self.parser = Lark(grammar, start="start", parser="lalr")
-        self.exception = None
         self.expr = expr
+        compiled = compile_filter(expr)
+        # compiled filters are cached and shared, see obsiflask.bases.compiler
+        self.exception = compiled.exception
+        self.tree = compiled.tree
+        self.func = compiled.func
+        self.vector_func = compiled.vector_func
+        self.cost = compiled.cost
+        self.content = compiled.content
+
+    @staticmethod
+    def _property(tree: Tree) -> str | None:
+        """
+        Returns the note property name if the subtree is a frontmatter property
+
+        Args:
+            tree (Tree): subtree
+
+        Returns:
+            str | None: property name
+        """
+        if (isinstance(tree, Tree) and tree.data == 'attr'
+                and len(tree.children) == 1
+                and str(tree.children[0]) != 'file'):
+            return str(tree.children[0])
+        return None
+
+    @staticmethod
+    def _plan_path(tree: Tree, vault: str) -> Plan:
+        """
+        Plans the subtree that depends only on the file paths:
+        it is evaluated over the path columns of the metadata table without reading the files
+
+        Args:
+            tree (Tree): subtree
+            vault (str): vault name
+
+        Returns:
+            Plan: candidates and exactness flag
+        """
+        is_const, value = const_value(tree)
+        if is_const:
+            return (None if value else set()), True
+        table = AppState.metadata_tables.get(vault)
+        if table is None:
+            return None, False
         try:
-            self.func = FilterTransformer().transform(self.parser.parse(expr))
-        except Exception as e:
-            self.exception = e
+            frame = table.get_path_frame()
+            mask = evaluate_mask(compile_tree(tree), frame)
+        except Exception:
+            # the errors are reported by the check
+            return None, False
+        return set(frame.index[mask]), True
+
+    def _plan_tree(self, tree: Tree, vault: str) -> Plan:
+        """
+        Plans the subtree: predicates of the file path are evaluated over the paths,
+        equality and "contains" for properties are answered with the property index
+
+        Args:
+            tree (Tree): subtree
+            vault (str): vault name
+
+        Returns:
+            Plan: candidates and exactness flag
+        """
+        if not isinstance(tree, Tree):
+            return None, False
+        if get_cost(tree) == 0:
+            return self._plan_path(tree, vault)
+        if tree.data == 'and_':
+            return plan_and([self._plan_tree(c, vault) for c in tree.children])
+        if tree.data == 'or_':
+            return plan_or([self._plan_tree(c, vault) for c in tree.children])
+        index = AppState.property_indices.get(vault)
+        if index is None:
+            return None, False
+        if tree.data == 'binop' and str(tree.children[1]) == '==':
+            left, _, right = tree.children
+            if self._property(right) is not None:
+                left, right = right, left
+            name = self._property(left)
+            is_const, value = const_value(right)
+            if name is not None and is_const:
+                candidates = index.equal(name, value)
+                return candidates, candidates is not None
+        if tree.data == 'method':
+            names = [
+                str(c) for c in tree.children
+                if isinstance(c, Token) and c.type == 'NAME'
+            ]
+            args = [
+                a for c in tree.children if isinstance(c, Tree)
+                for a in c.children
+            ]
+            if len(names) == 2 and names[1] == 'contains' and len(
+                    args) == 1 and names[0] != 'file':
+                is_const, value = const_value(args[0])
+                if is_const:
+                    candidates = index.contains(names[0], value)
+                    return candidates, candidates is not None
+        return None, False
+
+    def plan(self, vault):
+        if self.exception:
+            return None, False
+        return self._plan_tree(self.tree, vault)
+
+    def mask(self, frame):
+        if self.vector_func is None:
+            raise NotVectorized(f'expression {self.expr} is not vectorized')
+        return evaluate_mask(self.vector_func, frame)
 
     def check(self, file: FileInfo):
         if self.exception:
@@ -0,0 +1,190 @@
+"""
+Memoization of Bases formulas evaluated row-wise.
+
+Formula values are kept per (formula expression, file) with the signature of the file:
+modification time and size of the note and the names generation of the file index
+(formulas can use the resolved links). The cache is shared by all the bases and views of the vault,
+so the same formula in several views is computed once per note.
+Entries of the changed files are dropped by the file index updates, and the cache is
+bounded by BaseConfig.formula_cache_size entries (LRU).
+Formulas evaluated over the columns (see obsiflask.bases.vectorized) are not memoized
+"""
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable
+
+from obsiflask.app_state import AppState
+from obsiflask.bases.file_info import FileInfo
+from obsiflask.file_index import FileIndexDelta
+
+
+class FormulaCache:
+    """
+    Formula values of the vault files
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.lock = Lock()
+        self.values: OrderedDict[tuple[str, Path],
+                                 tuple[tuple, Any, Exception | None]] = OrderedDict()
+        # (expression, real path) -> signature, value, error
+        self.exprs: dict[Path, set[str]] = {}
+        # real path -> expressions with cached values
+        self.hits = 0
+        self.misses = 0
+
+    def _drop_path(self, path: Path):
+        """
+        Removes the values of the file. Must be called under the lock
+        """
+        for expr in self.exprs.pop(path, ()):
+            self.values.pop((expr, path), None)
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Drops the values of the changed files
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.modified | delta.removed:
+                self._drop_path(path)
+
+    def clear(self):
+        """
+        Drops all the values
+        """
+        with self.lock:
+            self.values.clear()
+            self.exprs.clear()
+
+    def signature(self, info: FileInfo) -> tuple | None:
+        """
+        Returns the signature of the file
+
+        Args:
+            info (FileInfo): file
+
+        Returns:
+            tuple | None: modification time, size and names generation,
+                None if the file is not in the metadata table
+        """
+        table = AppState.metadata_tables.get(self.vault)
+        if table is None:
+            return None
+        row = table.rows.get(info.real_path)
+        if row is None:
+            return None
+        return (row['file.mtime'], row['file.size'],
+                AppState.indices[self.vault].names_generation)
+
+    def evaluate(self, expr: str, func: Callable[[FileInfo], Any],
+                 info: FileInfo) -> Any:
+        """
+        Returns the memoized value of the formula, computes it if needed.
+        Errors are memoized as well and raised again
+
+        Args:
+            expr (str): formula expression
+            func (Callable[[FileInfo], Any]): compiled formula
+            info (FileInfo): file
+
+        Returns:
+            Any: value of the formula
+        """
+        signature = self.signature(info)
+        if signature is None:
+            return func(info)
+        key = (expr, info.real_path)
+        with self.lock:
+            cached = self.values.get(key)
+            if cached is not None and cached[0] == signature:
+                self.values.move_to_end(key)
+                self.hits += 1
+                if cached[2] is not None:
+                    raise cached[2]
+                return cached[1]
+            self.misses += 1
+        value, error = None, None
+        try:
+            value = func(info)
+        except Exception as e:
+            error = e
+        max_size = AppState.config.vaults[
+            self.vault].base_config.formula_cache_size
+        with self.lock:
+            self.values[key] = (signature, value, error)
+            self.values.move_to_end(key)
+            self.exprs.setdefault(info.real_path, set()).add(expr)
+            while len(self.values) > max_size:
+                (old_expr, old_path), _ = self.values.popitem(last=False)
+                exprs = self.exprs.get(old_path)
+                if exprs is not None:
+                    exprs.discard(old_expr)
+                    if not exprs:
+                        del self.exprs[old_path]
+        if error is not None:
+            raise error
+        return value
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns cache counters
+
+        Returns:
+            dict[str, int]: counters
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.values)
+            }
+
+
+def memoize_formula(vault: str, expr: str,
+                    func: Callable[[FileInfo], Any]) -> Callable[[FileInfo], Any]:
+    """
+    Wraps the compiled formula with the formula cache of the vault
+
+    Args:
+        vault (str): vault name
+        expr (str): formula expression
+        func (Callable[[FileInfo], Any]): compiled formula
+
+    Returns:
+        Callable[[FileInfo], Any]: memoized formula
+    """
+
+    def memoized(info: FileInfo) -> Any:
+        cache = AppState.formula_caches.get(vault)
+        if cache is None:
+            return func(info)
+        return cache.evaluate(expr, func, info)
+
+    return memoized
+
+
+def init_formula_cache(vault: str) -> FormulaCache:
+    """
+    Creates a formula cache for the vault and subscribes it for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        FormulaCache: formula cache
+    """
+    cache = FormulaCache(vault)
+    AppState.formula_caches[vault] = cache
+    AppState.indices[vault].add_listener(cache.update)
+    return cache
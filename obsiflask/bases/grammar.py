@@ -3,7 +3,7 @@ Grammar module for bases
 """
 import ast
 
-from lark import Transformer, v_args, Tree
+from lark import Lark, Transformer, v_args, Tree
 
 grammar = r"""
 ?start: expr
@@ -51,6 +51,11 @@ NUMBER: /\d+(\.\d+)?/
 %ignore " "
 """
 
+parser = Lark(grammar, start="start", parser="lalr")
+"""
+Shared parser: the LALR tables are built once per process
+"""
+
 ### METHODS IMPLEMENTATION
 
 
@@ -95,6 +100,10 @@ class FilterTransformer(Transformer):
     def string(self, tok):
         return lambda ctx: ast.literal_eval(tok)
 
+    def const(self, value):
+        # folded constant, see obsiflask.bases.compiler
+        return lambda ctx: value
+
     def method(self, *args):
         names = []
         method_args = []
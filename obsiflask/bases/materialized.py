@@ -0,0 +1,343 @@
+"""
+Materialized base views: the rows of the views are kept up to date in the background,
+so the views (e.g. dashboards embedded into notes) are served without computation.
+
+A base is materialized if its yaml has "materialized: true".
+The rows are stored per file with the sorted result. When the files are changed,
+only these files are checked with the filters and their rows are recomputed,
+then the old rows are removed from the sorted result and the new ones are inserted with bisect.
+If the view needs the content of the files (e.g. links), added or removed files lead
+to the full recomputation, since the links can be resolved differently.
+The requests get the last materialized result, only the first one computes it
+"""
+from bisect import bisect_left
+from functools import total_ordering
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any
+
+import numpy as np
+from flask import Flask, current_app, has_request_context, request
+
+from obsiflask.app_state import AppState
+from obsiflask.bases.view import NAN_CONST, View, report_problems
+from obsiflask.file_index import FileIndexDelta
+from obsiflask.messages import add_message
+from obsiflask.utils import get_traceback, logger
+
+
+def is_missing(value: Any) -> bool:
+    """
+    Checks if the converted value is missing (NaN), see obsiflask.bases.view.convert_field
+    """
+    return isinstance(value, float) and np.isnan(value)
+
+
+@total_ordering
+class Descending:
+    """
+    Wrapper with the reversed comparison for descending sorting of strings
+    """
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def __eq__(self, other: 'Descending') -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: 'Descending') -> bool:
+        return self.value > other.value
+
+
+class MaterializedView:
+    """
+    Rows of a single view
+    """
+
+    def __init__(self, view: View, vault: str):
+        """
+        Constructor
+
+        Args:
+            view (View): view
+            vault (str): vault name
+        """
+        self.view = view
+        self.vault = vault
+        self.rows: dict[Path, dict[str, Any]] = {}
+        # real path -> column -> value
+        self.final_order: list[str] = []
+        self.ordering: list[tuple[str, bool]] = []
+        # sorting columns and ascending flags, see View.get_ordering
+        self.strings: list[int] = []
+        # number of rows with string values for each sorting column:
+        # the column is sorted as strings if there are any, otherwise as numbers
+        self.keys: list[tuple] = []
+        # sorted keys of the rows, the path goes last so the keys are unique
+        self.result: list[dict] | None = None
+        # rows to show, in the order of the keys. The lists are replaced, not changed,
+        # since they can be used by the requests during the refresh
+        self.full = True
+        # the rows must be recomputed for all the files
+        self.changed: set[Path] = set()
+        # files to check
+        self.lock = Lock()
+        # held during the refresh
+        self.pending_lock = Lock()
+        # guards "full" and "changed", so the updates are not blocked by the refresh
+
+    @property
+    def dirty(self) -> bool:
+        return self.full or bool(self.changed)
+
+    def _compute(self, paths: set[Path] | None) -> dict[Path, dict[str, Any]]:
+        """
+        Computes the rows of the accepted files
+
+        Args:
+            paths (set[Path] | None): files to check, all the files if None
+
+        Returns:
+            dict[Path, dict[str, Any]]: rows
+        """
+        frame = self.view.gather(self.vault, paths)
+        problems = []
+        columns, self.final_order = self.view.get_columns(
+            self.vault, frame, problems)
+        report_problems(self.vault, problems)
+        return {
+            path: {c: values[i]
+                   for c, values in columns.items()}
+            for i, path in enumerate(frame.index)
+        }
+
+    def _count_strings(self, row: dict[str, Any], sign: int):
+        """
+        Updates the number of string values in the sorting columns
+        """
+        for i, (column, _) in enumerate(self.ordering):
+            if isinstance(row[column], str):
+                self.strings[i] += sign
+
+    def _key(self, path: Path, row: dict[str, Any]) -> tuple:
+        """
+        Returns the sorting key of the row, same as obsiflask.bases.view.sort_key
+
+        Args:
+            path (Path): real path
+            row (dict[str, Any]): converted values of the columns
+
+        Returns:
+            tuple: key
+        """
+        key = []
+        for (column, asc), strings in zip(self.ordering, self.strings):
+            value = row[column]
+            if strings:
+                value = '' if is_missing(value) else str(value)
+                key.append(value if asc else Descending(value))
+            else:
+                value = NAN_CONST if is_missing(value) else float(value)
+                key.append(value if asc else -value)
+        key.append(str(path))
+        return tuple(key)
+
+    def _display(self, row: dict[str, Any]) -> dict[str, Any]:
+        """
+        Converts the row to show, same as View.to_records
+        """
+        return {
+            c: '' if is_missing(row[c]) else row[c]
+            for c in self.final_order
+        }
+
+    def _sort(self):
+        """
+        Sorts all the rows
+        """
+        self.ordering = [(self.view.column_name(prop), asc)
+                         for prop, asc in self.view.get_ordering(self.vault)]
+        self.strings = [0] * len(self.ordering)
+        for row in self.rows.values():
+            self._count_strings(row, 1)
+        keyed = sorted(
+            (self._key(path, row), path) for path, row in self.rows.items())
+        self.keys = [key for key, _ in keyed]
+        self.result = [self._display(self.rows[path]) for _, path in keyed]
+
+    def _merge(self, changed: set[Path]):
+        """
+        Recomputes the rows of the changed files and merges them into the sorted result
+
+        Args:
+            changed (set[Path]): changed, added or removed files
+        """
+        new_rows = self._compute(changed)
+        keys, result = self.keys[:], self.result[:]
+        old_rows = {
+            path: self.rows.pop(path)
+            for path in changed if path in self.rows
+        }
+        for path, row in old_rows.items():
+            key = self._key(path, row)
+            i = bisect_left(keys, key)
+            if i == len(keys) or keys[i] != key:
+                raise ValueError(f'{path} is not found in the sorted rows')
+            del keys[i]
+            del result[i]
+        strings = self.strings[:]
+        for row in old_rows.values():
+            self._count_strings(row, -1)
+        for row in new_rows.values():
+            self._count_strings(row, 1)
+        self.rows.update(new_rows)
+        if [s > 0 for s in strings] != [s > 0 for s in self.strings]:
+            # the type of a sorting column is changed
+            self._sort()
+            return
+        for path, row in new_rows.items():
+            key = self._key(path, row)
+            i = bisect_left(keys, key)
+            keys.insert(i, key)
+            result.insert(i, self._display(row))
+        self.keys, self.result = keys, result
+
+    def refresh(self):
+        """
+        Updates the rows of the changed files and merges them into the sorted result
+        """
+        with self.lock:
+            with self.pending_lock:
+                full, changed = self.full, self.changed
+                self.full, self.changed = False, set()
+            if full or self.result is None:
+                self.rows = self._compute(None)
+                self._sort()
+            elif changed:
+                self._merge(changed)
+
+
+class MaterializedViews:
+    """
+    Materialized views of the vault and the background thread that refreshes them
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.views: dict[tuple[str, str], MaterializedView] = {}
+        # (base path, view name) -> view
+        self.lock = Lock()
+        self.event = Event()
+        self.thread: Thread | None = None
+        self.app: Flask | None = None
+        self.url_root = '/'
+        # the views are rendered with url_for, so the request context is recreated in the thread
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Marks the views for refreshing and wakes up the thread
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for (base_path, name), view in list(self.views.items()):
+                if Path(base_path) in delta.modified | delta.removed:
+                    # will be parsed again on the next request
+                    del self.views[(base_path, name)]
+                    continue
+                with view.pending_lock:
+                    if (delta.added
+                            or delta.removed) and view.view.needs_content():
+                        view.full = True
+                    else:
+                        view.changed |= (delta.added | delta.modified
+                                         | delta.removed)
+        self.event.set()
+
+    def get(self, view: View, force_refresh: bool = False) -> list[dict]:
+        """
+        Returns the last materialized rows of the view, the changes are applied by the thread.
+        The view is registered and computed on the first request
+
+        Args:
+            view (View): view
+            force_refresh (bool, optional): if set, recomputes the view right away. Defaults to False.
+
+        Returns:
+            list[dict]: rows
+        """
+        key = (view.base_path, view.name)
+        with self.lock:
+            if key not in self.views:
+                self.views[key] = MaterializedView(view, self.vault)
+            materialized = self.views[key]
+            if has_request_context():
+                self.app = current_app._get_current_object()
+                self.url_root = request.url_root
+            if self.thread is None:
+                self.thread = Thread(target=self.run, daemon=True)
+                self.thread.start()
+        if force_refresh:
+            with materialized.pending_lock:
+                materialized.full = True
+        if force_refresh or materialized.result is None:
+            materialized.refresh()
+        elif materialized.dirty:
+            self.event.set()
+        return materialized.result
+
+    def refresh(self):
+        """
+        Refreshes all the changed views
+        """
+        with self.lock:
+            views = [v for v in self.views.values() if v.dirty]
+        for view in views:
+            try:
+                view.refresh()
+            except Exception as e:
+                add_message(
+                    f'problems during materialized view refresh: {view.view.name}',
+                    1, self.vault, get_traceback(e))
+
+    def run(self):
+        """
+        Background loop: checks the vault files and refreshes the changed views
+        """
+        while AppState.materialized_views.get(self.vault) is self:
+            try:
+                self.event.wait(timeout=AppState.config.vaults[
+                    self.vault].file_index_update_time)
+                self.event.clear()
+                AppState.indices[self.vault].check_refresh()
+                if self.app is None:
+                    self.refresh()
+                else:
+                    with self.app.test_request_context(base_url=self.url_root):
+                        self.refresh()
+            except Exception as e:
+                logger.error(f'materialized views refresh failed: {e}')
+                self.event.wait(timeout=1)
+
+
+def init_materialized_views(vault: str) -> MaterializedViews:
+    """
+    Creates the materialized views of the vault and subscribes them for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        MaterializedViews: materialized views
+    """
+    views = MaterializedViews(vault)
+    AppState.materialized_views[vault] = views
+    AppState.indices[vault].add_listener(views.update)
+    return views
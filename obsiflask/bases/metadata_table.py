@@ -0,0 +1,338 @@
+"""
+Metadata table: a columnar representation of the vault files for Bases.
+
+For each file the table keeps a FileInfo and a row with file properties and frontmatter.
+Rows are updated only for the changed files (see FileIndexDelta),
+so views are rendered without reading the vault files.
+Files are read lazily: a frame for the given paths reads only these paths.
+The path properties of all the files are available without reading in a separate frame (get_path_frame).
+The content of the files (tags and links) is read only for the frames that need it,
+other frames are built from the frontmatter blocks (see FileInfo.read_header).
+The rows are converted into a pandas DataFrame with object columns:
+    file.path, file.folder, file.name, file.ext, file.mtime, file.size, file.tags, file.links
+and one column per frontmatter key. Missing frontmatter values are "", as in FileInfo.get_prop
+"""
+from pathlib import Path
+from threading import RLock
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from obsiflask.app_state import AppState
+from obsiflask.bases.file_info import FileInfo
+from obsiflask.file_index import FileIndex, FileIndexDelta
+
+PATH_COLUMNS = ['file.path', 'file.folder', 'file.name', 'file.ext']
+"""
+Columns with the file properties computed from the path
+"""
+
+HEADER_COLUMNS = [
+    'file.path', 'file.folder', 'file.name', 'file.ext', 'file.mtime',
+    'file.size'
+]
+"""
+Columns with the file properties that do not need the file content
+"""
+
+CONTENT_COLUMNS = ['file.tags', 'file.links']
+"""
+Columns with the file properties computed from the file content
+"""
+
+FILE_COLUMNS = HEADER_COLUMNS + CONTENT_COLUMNS
+"""
+Columns with the file properties
+"""
+
+
+def make_column(values: list[Any]) -> np.ndarray:
+    """
+    Converts the values into an object array without unpacking lists and sets
+
+    Args:
+        values (list[Any]): values
+
+    Returns:
+        np.ndarray: array
+    """
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    return result
+
+
+class MetadataTable:
+    """
+    Metadata of the vault files for one vault
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.lock = RLock()
+        # reentrant: reading files can refresh the file index, which calls update()
+        self.infos: dict[Path, FileInfo] = {}
+        # real path -> file info
+        self.rows: dict[Path, dict[str, Any]] = {}
+        # real path -> file properties
+        self.frontmatter: dict[Path, dict[str, Any]] = {}
+        # real path -> frontmatter
+        self.dirty: set[Path] = set()
+        self.content: set[Path] = set()
+        # files with the content columns in the rows
+        self.initialized = False
+        self.links_generation = None
+        # names generation of the file index, when the links were resolved
+        self.frame: pd.DataFrame | None = None
+        # built from the rows on demand
+        self.header_frame: pd.DataFrame | None = None
+        # same without the content columns
+        self.path_frame: pd.DataFrame | None = None
+        # path columns of all the files, rebuilt when files are added or removed
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Marks changed files for reading
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.removed:
+                self.infos.pop(path, None)
+                self.rows.pop(path, None)
+                self.frontmatter.pop(path, None)
+                self.dirty.discard(path)
+            self.dirty |= delta.added | delta.modified
+            self.content -= delta.added | delta.modified | delta.removed
+            self.frame = None
+            self.header_frame = None
+            if delta.added or delta.removed:
+                self.path_frame = None
+
+    @staticmethod
+    def _path_row(vault_path: Path) -> dict[str, str]:
+        """
+        Returns the path properties of the file, same as FileInfo.get_prop
+
+        Args:
+            vault_path (Path): path w.r.t. vault
+
+        Returns:
+            dict[str, str]: values of PATH_COLUMNS
+        """
+        return {
+            'file.path': str(vault_path),
+            'file.folder': str(vault_path.parent),
+            'file.name': str(vault_path.name),
+            'file.ext': str(vault_path.suffix.lstrip('.'))
+        }
+
+    def _read(self, path: Path):
+        """
+        Reads the frontmatter of the file and updates its row. Must be called under the lock
+
+        Args:
+            path (Path): real path of the file
+        """
+        info = FileInfo(path, self.vault)
+        self.content.discard(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            self.infos.pop(path, None)
+            self.rows.pop(path, None)
+            self.frontmatter.pop(path, None)
+            self.path_frame = None
+            return
+        info.read_header()
+        self.infos[path] = info
+        self.frontmatter[path] = {
+            str(k): v
+            for k, v in info.frontmatter.items()
+        }
+        self.rows[path] = {
+            **self._path_row(info.vault_path),
+            'file.mtime': stat.st_mtime,
+            'file.size': stat.st_size
+        }
+
+    def _read_content(self, path: Path):
+        """
+        Reads the content of the file and adds the content columns to its row.
+        Must be called under the lock
+
+        Args:
+            path (Path): real path of the file
+        """
+        info = self.infos[path]
+        info.get_internal_data()
+        self.rows[path]['file.tags'] = list(info._tags)
+        self.rows[path]['file.links'] = info._links
+        self.content.add(path)
+
+    def _initialize(self, index: FileIndex):
+        """
+        Marks all the vault files for reading on the first use. Must be called under the lock
+
+        Args:
+            index (FileIndex): file index of the vault
+        """
+        if not self.initialized:
+            self.dirty |= {f for f in index if f.is_file()}
+            self.initialized = True
+            self.path_frame = None
+
+    def _prepare(self,
+                 paths: set[Path] | None = None,
+                 content: bool = True):
+        """
+        Reads the changed files and resolves the links again if the vault files were renamed
+
+        Args:
+            paths (set[Path] | None, optional): if set, only these files are read. Defaults to None.
+            content (bool, optional): if set, the content of the files is read as well. Defaults to True.
+        """
+        index = AppState.indices[self.vault]
+        # the file index can call update(), so it is used before taking the lock
+        index.check_refresh()
+        with self.lock:
+            self._initialize(index)
+            if paths is None:
+                to_read = list(self.dirty)
+            else:
+                to_read = [p for p in paths if p in self.dirty]
+            for path in to_read:
+                self.dirty.discard(path)
+                self._read(path)
+                self.frame = None
+                self.header_frame = None
+            if content:
+                targets = self.rows if paths is None else paths
+                for path in targets:
+                    if path in self.rows and path not in self.content:
+                        self._read_content(path)
+                        self.frame = None
+            if self.links_generation != index.names_generation:
+                for path in self.content:
+                    self.rows[path]['file.links'] = self.infos[path].get_prop(
+                        ['file', 'links'])
+                self.links_generation = index.names_generation
+                self.frame = None
+
+    def _build_frame(self, paths: list[Path], content: bool) -> pd.DataFrame:
+        """
+        Converts the rows into a table. Must be called under the lock
+
+        Args:
+            paths (list[Path]): real paths of the read files
+            content (bool): if set, the content columns are added
+
+        Returns:
+            pd.DataFrame: table
+        """
+        columns = {
+            c: make_column([self.rows[p][c] for p in paths])
+            for c in (FILE_COLUMNS if content else HEADER_COLUMNS)
+        }
+        keys = dict.fromkeys(k for p in paths for k in self.frontmatter[p])
+        for key in keys:
+            if key not in columns:
+                columns[key] = make_column(
+                    [self.frontmatter[p].get(key, '') for p in paths])
+        return pd.DataFrame(columns,
+                            index=pd.Index(paths, dtype=object),
+                            dtype=object)
+
+    def get_frame(self,
+                  paths: set[Path] | None = None,
+                  content: bool = True) -> pd.DataFrame:
+        """
+        Returns the table of the vault files
+
+        Args:
+            paths (set[Path] | None, optional): if set, only these files are read and returned.
+                Defaults to None.
+            content (bool, optional): if not set, only the frontmatter of the files is read
+                and the table has no CONTENT_COLUMNS. Defaults to True.
+
+        Returns:
+            pd.DataFrame: table indexed by the real paths, with object columns
+        """
+        self._prepare(paths, content)
+        with self.lock:
+            if paths is not None:
+                return self._build_frame([p for p in paths if p in self.rows],
+                                         content)
+            if content or self.frame is not None:
+                if self.frame is None:
+                    self.frame = self._build_frame(list(self.rows), True)
+                return self.frame
+            if self.header_frame is None:
+                self.header_frame = self._build_frame(list(self.rows), False)
+            return self.header_frame
+
+    def get_path_frame(self) -> pd.DataFrame:
+        """
+        Returns the path properties of all the vault files without reading them
+
+        Returns:
+            pd.DataFrame: table indexed by the real paths, with PATH_COLUMNS
+        """
+        index = AppState.indices[self.vault]
+        index.check_refresh()
+        with self.lock:
+            self._initialize(index)
+            if self.path_frame is None:
+                paths = list(self.rows.keys() | self.dirty)
+                rows = [
+                    self._path_row(p.relative_to(index.path)) for p in paths
+                ]
+                self.path_frame = pd.DataFrame(
+                    {
+                        c: make_column([r[c] for r in rows])
+                        for c in PATH_COLUMNS
+                    },
+                    index=pd.Index(paths, dtype=object),
+                    dtype=object)
+            return self.path_frame
+
+    def get_infos(self, paths: list[Path]) -> list[FileInfo]:
+        """
+        Returns the file infos of the files in the table
+
+        Args:
+            paths (list[Path]): real paths
+
+        Returns:
+            list[FileInfo]: file infos
+        """
+        self._prepare(set(paths), content=False)
+        with self.lock:
+            infos = [self.infos.get(path) for path in paths]
+        return [
+            info if info is not None else FileInfo(path, self.vault)
+            for path, info in zip(paths, infos)
+        ]
+
+
+def init_metadata_table(vault: str) -> MetadataTable:
+    """
+    Creates a metadata table for the vault and subscribes it for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        MetadataTable: metadata table
+    """
+    table = MetadataTable(vault)
+    AppState.metadata_tables[vault] = table
+    AppState.indices[vault].add_listener(table.update)
+    return table
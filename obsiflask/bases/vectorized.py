@@ -0,0 +1,232 @@
+"""
+Column-wise evaluation of Bases expressions over the metadata table
+(see obsiflask.bases.metadata_table).
+
+An expression tree is compiled into a function of the table.
+The operations are applied to whole columns with numpy ufuncs made of the same Python operators
+as in FilterTransformer, so the results are the same as for row-wise evaluation.
+If an expression cannot be evaluated over the columns (e.g. it uses the FileInfo object itself),
+NotVectorized is raised, and the caller falls back to row-wise evaluation
+"""
+import ast
+import operator
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+from lark import Tree, Token
+
+from obsiflask.bases.grammar import contains, containsAny, isEmpty, startsWith
+
+VectorFunc = Callable[[pd.DataFrame], Any]
+"""
+Compiled expression: returns an object array with a value for each row, or a scalar
+"""
+
+OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda a, b: a in b,
+    "not in": lambda a, b: a not in b,
+}
+"""
+Binary operators of the grammar
+"""
+
+ARITHMETIC = {
+    'add_': operator.add,
+    'sub_': operator.sub,
+    'mult_': operator.mul,
+    'div_': operator.truediv,
+    'and_': lambda a, b: a and b,
+    'or_': lambda a, b: a or b,
+}
+"""
+Arithmetic and logical operators of the grammar
+"""
+
+
+def has_tag(tags: Any, *args) -> bool:
+    """
+    Same as grammar.hasTag, but takes the "tags" property instead of the file
+
+    Args:
+        tags (Any): "tags" property of the note
+
+    Returns:
+        bool: True if the note has the tag
+    """
+    if len(args) != 1:
+        raise ValueError('hasTag requires 1 argument')
+    return args[0].lstrip('#') in tags
+
+
+METHODS = {
+    'contains': contains,
+    'containsAny': containsAny,
+    'isEmpty': isEmpty,
+    'startsWith': startsWith,
+}
+"""
+Methods of the grammar
+"""
+
+
+class NotVectorized(Exception):
+    """
+    The expression cannot be evaluated over the columns
+    """
+
+
+def _scalar(value: Any) -> np.ndarray:
+    """
+    Wraps the value into 0-dim object array, so lists are not unpacked by numpy
+    """
+    result = np.empty((), dtype=object)
+    result[()] = value
+    return result
+
+
+def apply(func: Callable, *args) -> Any:
+    """
+    Applies the function elementwise
+
+    Args:
+        func (Callable): Python function
+        args: object arrays or scalars
+
+    Returns:
+        Any: object array or scalar if all the arguments are scalars
+    """
+    if not any(isinstance(a, np.ndarray) for a in args):
+        return func(*args)
+    return np.frompyfunc(func, len(args), 1)(
+        *[a if isinstance(a, np.ndarray) else _scalar(a) for a in args])
+
+
+def get_column(frame: pd.DataFrame, names: list[str]) -> Any:
+    """
+    Returns the values of the property, same as FileInfo.get_prop
+
+    Args:
+        frame (pd.DataFrame): metadata table
+        names (list[str]): property, e.g. ["file", "name"] or ["status"]
+
+    Returns:
+        Any: object array or "" for the missing frontmatter key
+    """
+    if len(names) == 2 and names[0] == 'file':
+        column = 'file.' + names[1]
+        if column in frame.columns:
+            return frame[column].to_numpy(dtype=object)
+    elif len(names) == 1 and names[0] != 'file':
+        if names[0] in frame.columns:
+            return frame[names[0]].to_numpy(dtype=object)
+        return ''
+    raise NotVectorized(f'property {names} is not in the table')
+
+
+def compile_tree(tree: Tree) -> VectorFunc:
+    """
+    Compiles the expression tree
+
+    Args:
+        tree (Tree): tree parsed with grammar
+
+    Returns:
+        VectorFunc: function of the table
+
+    Raises:
+        NotVectorized: if the expression is not supported
+    """
+    if not isinstance(tree, Tree):
+        raise NotVectorized(f'unexpected token {tree}')
+    if tree.data == 'start':
+        return compile_tree(tree.children[0])
+    if tree.data == 'attr':
+        names = [str(c) for c in tree.children]
+        return lambda frame: get_column(frame, names)
+    if tree.data == 'number':
+        tok = tree.children[0]
+        value = float(tok) if "." in tok else int(tok)
+        return lambda frame: value
+    if tree.data == 'string':
+        value = ast.literal_eval(tree.children[0])
+        return lambda frame: value
+    if tree.data == 'const':
+        value = tree.children[0]
+        return lambda frame: value
+    if tree.data == 'binop':
+        left, op, right = tree.children
+        if str(op) not in OPS:
+            raise NotVectorized(f'unsupported operator {op}')
+        func = OPS[str(op)]
+        left, right = compile_tree(left), compile_tree(right)
+        return lambda frame: apply(func, left(frame), right(frame))
+    if tree.data in ARITHMETIC:
+        func = ARITHMETIC[tree.data]
+        left, right = [compile_tree(c) for c in tree.children]
+        return lambda frame: apply(func, left(frame), right(frame))
+    if tree.data in ['not_', 'neg_']:
+        func = operator.not_ if tree.data == 'not_' else operator.neg
+        arg = compile_tree(tree.children[0])
+        return lambda frame: apply(func, arg(frame))
+    if tree.data == 'method':
+        names = [
+            str(c) for c in tree.children
+            if isinstance(c, Token) and c.type == 'NAME'
+        ]
+        args = [
+            compile_tree(a) for c in tree.children if isinstance(c, Tree)
+            for a in c.children
+        ]
+        if names[-1] == 'isEmpty':
+            args = []  # arguments are ignored, as in FilterTransformer
+        attr = names[:-1]
+        if names[-1] == 'hasTag' and attr == ['file']:
+            func, attr = has_tag, ['tags']
+        elif names[-1] in METHODS:
+            func = METHODS[names[-1]]
+        else:
+            raise NotVectorized(f'unsupported method {names[-1]}')
+        return lambda frame: apply(func, get_column(frame, attr),
+                                   *[a(frame) for a in args])
+    raise NotVectorized(f'unsupported expression {tree.data}')
+
+
+def evaluate(func: VectorFunc, frame: pd.DataFrame) -> list[Any]:
+    """
+    Evaluates the compiled expression
+
+    Args:
+        func (VectorFunc): compiled expression
+        frame (pd.DataFrame): metadata table
+
+    Returns:
+        list[Any]: value for each row
+    """
+    result = func(frame)
+    if isinstance(result, np.ndarray):
+        return list(result)
+    return [result] * len(frame)
+
+
+def evaluate_mask(func: VectorFunc, frame: pd.DataFrame) -> np.ndarray:
+    """
+    Evaluates the compiled filter
+
+    Args:
+        func (VectorFunc): compiled expression
+        frame (pd.DataFrame): metadata table
+
+    Returns:
+        np.ndarray: boolean mask of the rows
+    """
+    result = func(frame)
+    if isinstance(result, np.ndarray):
+        return np.frompyfunc(bool, 1, 1)(result).astype(bool)
+    return np.full(len(frame), bool(result))
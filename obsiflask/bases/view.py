@@ -1,14 +1,20 @@
 """
 View class that represents different base views
 """
-from typing import Callable
+from pathlib import Path
+from typing import Callable, Generator
 from threading import Lock
 
+import numpy as np
 import pandas as pd
+from flask import url_for
+from lark import Tree
 
 from obsiflask.app_state import AppState
-from obsiflask.bases.filter import Filter
+from obsiflask.bases.compiler import uses_content
+from obsiflask.bases.filter import Filter, plan_and
 from obsiflask.bases.file_info import FileInfo
+from obsiflask.bases.vectorized import VectorFunc, evaluate, get_column
 from obsiflask.messages import add_message
 from obsiflask.utils import logger
 from obsiflask.bases.cache import BaseCache
@@ -16,6 +22,31 @@ from obsiflask.consts import COVER_KEY
 
 NAN_CONST = 0
 MAX_VIEW_ERRORS = 50
+STREAM_CHUNK_SIZE = 200
+GROUP_COLUMN = '_group'
+"""
+Column with the label of the row group, set only for the grouped views
+"""
+
+NUMERIC_SUMMARIES = {
+    'Sum': 'sum',
+    'Average': 'mean',
+    'Min': 'min',
+    'Max': 'max',
+    'Median': 'median',
+    'Stddev': 'std',
+}
+"""
+Summaries computed over the numeric values, mapped to the pandas aggregations
+"""
+
+SUMMARIES = list(NUMERIC_SUMMARIES) + [
+    'Range', 'Earliest', 'Latest', 'Checked', 'Unchecked', 'Empty', 'Filled',
+    'Unique'
+]
+"""
+Supported column summaries, named as in Obsidian
+"""
 
 
 def convert_field(x):
@@ -30,13 +61,170 @@ def convert_field(x):
         return x
 
 
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the positions of k smallest values, same as the first k positions of the stable sorting
+
+    Args:
+        values (np.ndarray): numeric values
+        k (int): number of positions
+
+    Returns:
+        np.ndarray: sorted positions
+    """
+    if k >= len(values):
+        return np.argsort(values, kind='stable')
+    if k <= 0:
+        return np.arange(0)
+    threshold = values[np.argpartition(values, k - 1)[:k]].max()
+    less = np.flatnonzero(values < threshold)
+    equal = np.flatnonzero(values == threshold)[:k - len(less)]
+    positions = np.concatenate([less, equal])
+    return positions[np.argsort(values[positions], kind='stable')]
+
+
+def sort_key(values: list) -> pd.Series:
+    """
+    Converts the values for sorting and grouping: numbers if no value is a string, otherwise strings
+
+    Args:
+        values (list): converted values, see convert_field
+
+    Returns:
+        pd.Series: numeric series with NaN for the missing values, or string series
+    """
+    if not any(isinstance(v, str) for v in values):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    return pd.Series(values, dtype=object).fillna('').astype(str)
+
+
+def order_positions(keys: list[list], ascending: list[bool],
+                    k: int | None) -> np.ndarray:
+    """
+    Sorts the rows by the keys (stable). Only the first k positions are sorted
+
+    Args:
+        keys (list[list]): converted values of the sorting properties, see convert_field
+        ascending (list[bool]): ascending flag for each key
+        k (int | None): number of the first rows needed, all the rows if None
+
+    Returns:
+        np.ndarray: positions of the rows in the sorted order
+    """
+    series = {
+        i: sort_key(values).fillna(NAN_CONST)
+        for i, values in enumerate(keys)
+    }
+    if len(keys) == 1 and k is not None and pd.api.types.is_numeric_dtype(
+            series[0]):
+        values = series[0].to_numpy(dtype=float)
+        return top_k(values if ascending[0] else -values, k)
+    df = pd.DataFrame(series)
+    df = df.sort_values(list(series), ascending=ascending, kind='stable')
+    return df.index.to_numpy()[:k]
+
+
+def group_label(value) -> str:
+    """
+    Returns the label of the group for the converted value
+
+    Args:
+        value: value of the grouping property, see convert_field
+
+    Returns:
+        str: label, "" for the missing values
+    """
+    if value is None or isinstance(value, float) and np.isnan(value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def json_value(value):
+    """
+    Converts numpy scalars into json-compatible values, NaN into None
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def aggregate(values: pd.Series, codes: np.ndarray, name: str) -> pd.Series:
+    """
+    Computes the summary of the values for each group
+
+    Args:
+        values (pd.Series): converted values of the column, see convert_field
+        codes (np.ndarray): group number of each value
+        name (str): summary name, see SUMMARIES
+
+    Returns:
+        pd.Series: summary indexed by the group number, missing for the groups without values
+    """
+    objects = values.to_numpy(dtype=object)
+    values = pd.Series(objects, dtype=object)
+    empty = pd.isna(values).to_numpy() | (objects == '')
+    if name in NUMERIC_SUMMARIES or name == 'Range':
+        numeric = pd.to_numeric(values.where(~empty), errors='coerce')
+        grouped = numeric.groupby(codes)
+        if name == 'Range':
+            return grouped.max() - grouped.min()
+        return grouped.agg(NUMERIC_SUMMARIES[name])
+    if name in ['Checked', 'Unchecked']:
+        flags = np.array([v is (name == 'Checked') for v in objects], dtype=bool)
+        return pd.Series(flags).groupby(codes).sum()
+    if name in ['Empty', 'Filled']:
+        flags = empty if name == 'Empty' else ~empty
+        return pd.Series(flags).groupby(codes).sum()
+    strings = values[~empty].astype(str)
+    grouped = strings.groupby(codes[~empty])
+    if name == 'Unique':
+        return grouped.nunique().reindex(np.unique(codes), fill_value=0)
+    if name == 'Earliest':
+        return grouped.min()
+    if name == 'Latest':
+        return grouped.max()
+    raise ValueError(f'unsupported summary: {name}')
+
+
+def report_problems(vault: str, problems: list[str]):
+    """
+    Shows the problems of the view rendering as a single message
+
+    Args:
+        vault (str): vault name
+        problems (list[str]): problems
+    """
+    if problems:
+        use_log = True
+        if len(problems) > MAX_VIEW_ERRORS:
+            for p in problems:
+                logger.warning(p)
+            problems = problems[:MAX_VIEW_ERRORS] + [
+                '...', 'See  system logs'
+            ]
+            use_log = False
+
+        add_message('problems during base rendering',
+                    1,
+                    vault,
+                    '\n'.join(problems),
+                    use_log=use_log)
+
+
 class View:
     """
     View objects represents different views in terms of Obsidian bases
     """
 
-    def __init__(self, formulas: list[Callable], properties: dict[str, dict],
-                 base_path: str):
+    def __init__(self,
+                 formulas: list[Callable],
+                 properties: dict[str, dict],
+                 base_path: str,
+                 vector_formulas: dict[str, VectorFunc] | None = None):
         """
         Construvctor
 
@@ -44,6 +232,8 @@ class View:
             formulas (list[Callable]): list of formulae
             properties (dict[str, dict]): properties of view
             base_path (str): path w.r.t. vault
+            vector_formulas (dict[str, VectorFunc] | None, optional): formulae compiled
+                for the metadata table, see obsiflask.bases.vectorized. Defaults to None.
         """
         self.type = ''
         self.name = ''
@@ -51,11 +241,94 @@ class View:
         self.order: list[str] = []
         self.sorts: list[tuple[str, str]] = []
         self.formulas: list = formulas
+        self.vector_formulas = vector_formulas or {}
         self.properties: dict[str, dict] = properties
         self.base_path = base_path
         self.global_filter = None
+        self.materialized = False
+        # if set, the rows are kept up to date by obsiflask.bases.materialized
+        self.limit: int | None = None
+        # maximal number of rows, "limit" key of the view
+        self.group_by: tuple[str, str] | None = None
+        # property and direction, "groupBy" key of the view
+        self.summaries: dict[str, str] = {}
+        # property -> summary name, "summaries" key of the view
+        self.content_formulas: set[str] = set()
+        # formulae that need the file content, see obsiflask.bases.compiler.uses_content
         self.lock = Lock()
 
+    def needs_content(self) -> bool:
+        """
+        Checks if the view needs the content of the files (tags or links).
+        Otherwise, only the frontmatter of the files is read
+
+        Returns:
+            bool: True if the content must be read
+        """
+        props = self.order + [s[0] for s in self.sorts] + list(self.summaries)
+        if self.group_by is not None:
+            props.append(self.group_by[0])
+        for prop in props:
+            names = prop.split('.')
+            if uses_content(Tree('attr', names)):
+                return True
+            if names[0] == 'formula' and names[-1] in self.content_formulas:
+                return True
+        return self.global_filter.content or self.filter.content
+
+    def gather(self,
+               vault: str,
+               paths: set[Path] | None = None) -> pd.DataFrame:
+        """
+        Selects the rows of the metadata table w.r.t. filters
+
+        Args:
+            vault (str): vault name
+            paths (set[Path] | None, optional): if set, only these files are checked. Defaults to None.
+
+        Returns:
+            pd.DataFrame: rows of the accepted files
+        """
+        candidates, exact = plan_and(
+            [self.global_filter.plan(vault),
+             self.filter.plan(vault), (paths, True)])
+        table = AppState.metadata_tables[vault]
+        # path and property predicates are answered without reading the files,
+        # so only the candidates are read
+        frame = table.get_frame(candidates, self.needs_content())
+        if exact:
+            return frame
+        try:
+            mask = self.global_filter.mask(frame) & self.filter.mask(frame)
+        except Exception as e:
+            # the errors are reported by the row-wise check
+            logger.debug(f'using row-wise filtering: {e}')
+            files = table.get_infos(list(frame.index))
+            files = [f for f in files if self.global_filter.check(f)]
+            files = [f for f in files if self.filter.check(f)]
+            mask = frame.index.isin([f.real_path for f in files])
+        return frame[mask]
+
+    def matches(self, vault: str, paths: set[Path]) -> bool:
+        """
+        Checks if any of the files is accepted by the view filters.
+        Used by BaseCache to decide if modified files change the cached view
+
+        Args:
+            vault (str): vault name
+            paths (set[Path]): real paths of the files
+
+        Returns:
+            bool: True if the files can change the view
+        """
+        paths = [p for p in paths if p.is_file()]
+        try:
+            return any(
+                self.global_filter.check(f) and self.filter.check(f)
+                for f in AppState.metadata_tables[vault].get_infos(paths))
+        except Exception:
+            return True
+
     def gather_files(self, vault: str) -> list[FileInfo]:
         """
         Gathering files w.r.t. filters
@@ -66,129 +339,467 @@ class View:
         Returns:
             list[FileInfo]: list of files
         """
-        files = [f for f in AppState.indices[vault] if f.is_file()]
-        files = [FileInfo(f, vault) for f in files]
-        files = [f for f in files if self.global_filter.check(f)]
-        files = [f for f in files if self.filter.check(f)]
-        return files
+        return AppState.metadata_tables[vault].get_infos(
+            list(self.gather(vault).index))
 
-    def make_view(self, vault: str, force_refresh: bool) -> dict:
+    def get_values(self, vault: str, prop_str: str, frame: pd.DataFrame,
+                   problems: list[str]) -> list:
+        """
+        Returns values of the property or formula for the view
+
+        Args:
+            vault (str): vault name
+            prop_str (str): property, e.g. "file.name" or "formula.name"
+            frame (pd.DataFrame): rows of the files
+            problems (list[str]): list to add the problems
+
+        Returns:
+            list: value for each row
+        """
+        prop = prop_str.split('.')
+        try:
+            if prop[0] == 'formula':
+                return evaluate(self.vector_formulas[prop[1]], frame)
+            if prop == ['file', 'name']:
+                return [
+                    f"<a href=\"{url_for('renderer', subpath=path, vault=vault)}\">{name}</a>"
+                    for path, name in zip(frame['file.path'], frame['file.name'])
+                ]
+            if prop == ['file']:
+                return list(frame['file.path'])
+            if prop != [COVER_KEY]:
+                return evaluate(lambda frame: get_column(frame, prop), frame)
+        except Exception as e:
+            logger.debug(f'using row-wise values for {prop_str}: {e}')
+        values = []
+        for f in AppState.metadata_tables[vault].get_infos(list(frame.index)):
+            try:
+                if prop[0] == 'formula':
+                    value = self.formulas[prop[1]](f)
+                else:
+                    value = f.get_prop(prop, render=True)
+            except Exception as e:
+                if AppState.config.vaults[
+                        vault].base_config.error_on_field_parse:
+                    raise ValueError(
+                        f'could not infer value {prop_str} from {f.vault_path}: {e}'
+                    )
+                else:
+                    problems.append(
+                        f'could not infer value {prop_str} from {f.vault_path}: {e}'
+                    )
+                    value = ''
+            values.append(value)
+        return values
+
+    def column_name(self, prop: str) -> str:
+        """
+        Returns the name of the column for the property
+
+        Args:
+            prop (str): property, e.g. "file.name" or "formula.name"
+
+        Returns:
+            str: display name if set in the properties of the base, otherwise the property with "_"
+        """
+        if prop in self.properties and 'displayName' in self.properties[prop]:
+            return self.properties[prop]['displayName']
+        return prop.replace('.', '_')
+
+    def get_sorts(self) -> list[tuple[str, str]]:
+        """
+        Returns the properties needed for sorting, the grouping property goes first
+
+        Returns:
+            list[tuple[str, str]]: properties and directions
+        """
+        if self.group_by is None:
+            return self.sorts
+        return [self.group_by] + self.sorts
+
+    def get_columns(self, vault: str, frame: pd.DataFrame,
+                    problems: list[str]) -> tuple[dict[str, list], list[str]]:
+        """
+        Computes the columns of the view
+
+        Args:
+            vault (str): vault name
+            frame (pd.DataFrame): rows of the accepted files
+            problems (list[str]): list to add the problems
+
+        Returns:
+            tuple[dict[str, list], list[str]]: converted values of the columns (including the sorting ones)
+                and the order of the columns to show
+        """
+        columns = {}
+        # order is matter, so it's not a set
+        order_list_plus_sort = self.order[:]
+        for r in self.get_sorts():
+            order_list_plus_sort.append(r[0])
+        final_order = []
+        if self.type == 'cards':
+            if COVER_KEY not in order_list_plus_sort:
+                order_list_plus_sort.append(COVER_KEY)
+        for r in order_list_plus_sort:
+            prop_name = self.column_name(r)
+            if prop_name in columns:
+                continue
+            values = [
+                convert_field(v)
+                for v in self.get_values(vault, r, frame, problems)
+            ]
+            if r in self.order and prop_name not in final_order:
+                final_order.append(prop_name)
+            columns[prop_name] = values
+
+        if self.type == 'cards' and COVER_KEY not in final_order:
+            final_order.append(COVER_KEY)
+        if self.group_by is not None:
+            columns[GROUP_COLUMN] = [
+                group_label(v)
+                for v in columns[self.column_name(self.group_by[0])]
+            ]
+            final_order.append(GROUP_COLUMN)
+        return columns, final_order
+
+    def get_ordering(self, vault: str) -> list[tuple[str, bool]]:
+        """
+        Returns the sorting of the view, shared by the full, paged and streamed rendering:
+        the grouping property goes first, then the sorting properties.
+        Without sorting properties the rows are sorted by the first column
+
+        Args:
+            vault (str): vault name
+
+        Returns:
+            list[tuple[str, bool]]: properties and ascending flags
+        """
+        ordering = []
+        for prop, direction in self.sorts:
+            if direction not in ['ASC', 'DESC']:
+                if AppState.config.vaults[
+                        vault].base_config.error_on_yaml_parse:
+                    raise ValueError(f'Bad value for sorting: {prop}')
+                add_message(f'problems with sorting: {prop}. Skipping', 1,
+                            vault)
+                continue
+            ordering.append((prop, direction == 'ASC'))
+        if not ordering and self.order:
+            logger.debug('using default sorting')
+            ordering.append((self.order[0], True))
+        if self.group_by is not None:
+            ordering.insert(0, (self.group_by[0], self.group_by[1] != 'DESC'))
+        return ordering
+
+    def to_result(self, vault: str, columns: dict[str, list],
+                  final_order: list[str]) -> list[dict]:
+        """
+        Sorts the rows and converts them into a json-compatible list
+
+        Args:
+            vault (str): vault name
+            columns (dict[str, list]): converted values of the columns, see get_columns
+            final_order (list[str]): order of the columns to show
+
+        Returns:
+            list[dict]: rows of the view
+        """
+        ordering = self.get_ordering(vault)
+        if not ordering:
+            return self.to_records(columns, final_order)
+        positions = order_positions(
+            [columns[self.column_name(prop)] for prop, _ in ordering],
+            [asc for _, asc in ordering], None)
+        columns = {
+            column: [values[i] for i in positions]
+            for column, values in columns.items()
+        }
+        return self.to_records(columns, final_order)
+
+    def sort_positions(self, vault: str, frame: pd.DataFrame,
+                       problems: list[str], k: int | None) -> np.ndarray:
+        """
+        Sorts the rows by the sorting properties only. Only the first k positions are sorted
+
+        Args:
+            vault (str): vault name
+            frame (pd.DataFrame): rows of the accepted files
+            problems (list[str]): list to add the problems
+            k (int | None): number of the first rows needed, all the rows if None
+
+        Returns:
+            np.ndarray: positions of the rows in frame, in the order of the view
+        """
+        ordering = self.get_ordering(vault)
+        if not ordering:
+            return np.arange(len(frame))[:k]
+        keys = [[
+            convert_field(v)
+            for v in self.get_values(vault, prop, frame, problems)
+        ] for prop, _ in ordering]
+        return order_positions(keys, [asc for _, asc in ordering], k)
+
+    def to_records(self, columns: dict[str, list],
+                   final_order: list[str]) -> list[dict]:
+        """
+        Converts the columns of a page into a json-compatible list without sorting
+
+        Args:
+            columns (dict[str, list]): converted values of the columns, see get_columns
+            final_order (list[str]): order of the columns to show
+
+        Returns:
+            list[dict]: rows
+        """
+        for column, values in columns.items():
+            columns[column] = [
+                '' if isinstance(v, float) and np.isnan(v) else v
+                for v in values
+            ]
+        n = len(next(iter(columns.values()), []))
+        return [{c: columns[c][i] for c in final_order} for i in range(n)]
+
+    def _window(self, vault: str, offset: int,
+                limit: int | None) -> tuple[pd.DataFrame, int, list[str]]:
+        """
+        Selects the rows of the page. Must be called under the lock
+
+        Args:
+            vault (str): vault name
+            offset (int): number of rows to skip
+            limit (int | None): page size, all the rows if None
+
+        Returns:
+            tuple[pd.DataFrame, int, list[str]]: rows of the page in the order of the view,
+                total number of rows in the view and the problems
+        """
+        frame = self.gather(vault)
+        problems = []
+        total = len(frame)
+        if self.limit is not None:
+            total = min(total, self.limit)
+        end = total if limit is None else min(total, offset + limit)
+        if end <= offset:
+            return frame.iloc[:0], total, problems
+        positions = self.sort_positions(vault, frame, problems, end)
+        return frame.iloc[positions[offset:end]], total, problems
+
+    def make_page(self,
+                  vault: str,
+                  force_refresh: bool,
+                  offset: int = 0,
+                  limit: int | None = None) -> tuple[list[dict], int]:
+        """
+        Renders a page of the view. Only the rows of the page are computed,
+        other rows are only sorted by the sorting properties
+
+        Args:
+            vault (str): vault name
+            force_refresh (bool): if set, will drop cache for current view
+            offset (int, optional): number of rows to skip. Defaults to 0.
+            limit (int | None, optional): page size, all the rows if None. Defaults to None.
+
+        Returns:
+            tuple[list[dict], int]: rows of the page and total number of rows in the view
+        """
+        if self.materialized:
+            result = AppState.materialized_views[vault].get(
+                self, force_refresh)[:self.limit]
+            end = None if limit is None else offset + limit
+            return result[offset:end], len(result)
+        name = f'{self.name}[{offset}:{limit}]'
+        if not force_refresh:
+            cached, found_in_cache = BaseCache.get_from_cache(
+                vault, self.base_path, name)
+            if found_in_cache:
+                return cached
+        with self.lock:
+            page, total, problems = self._window(vault, offset, limit)
+            rows = []
+            if len(page) > 0:
+                columns, final_order = self.get_columns(vault, page, problems)
+                rows = self.to_records(columns, final_order)
+            report_problems(vault, problems)
+            # the rows outside the page can move into it after any change
+            BaseCache.add_to_cache(vault, self.base_path, name, (rows, total))
+            return rows, total
+
+    def stream_page(
+            self,
+            vault: str,
+            force_refresh: bool,
+            offset: int = 0,
+            limit: int | None = None,
+            chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> tuple[int, Generator[dict, None, None]]:
+        """
+        Same as make_page, but the rows are computed by chunks while they are consumed
+
+        Args:
+            vault (str): vault name
+            force_refresh (bool): if set, will drop cache for current view
+            offset (int, optional): number of rows to skip. Defaults to 0.
+            limit (int | None, optional): page size, all the rows if None. Defaults to None.
+            chunk_size (int, optional): number of rows computed at once. Defaults to STREAM_CHUNK_SIZE.
+
+        Returns:
+            tuple[int, Generator[dict, None, None]]: total number of rows in the view and the rows
+        """
+        name = f'{self.name}[{offset}:{limit}]'
+        if not force_refresh and not self.materialized:
+            cached, found_in_cache = BaseCache.get_from_cache(
+                vault, self.base_path, name)
+            if found_in_cache:
+                return cached[1], iter(cached[0])
+        if self.materialized:
+            rows, total = self.make_page(vault, force_refresh, offset, limit)
+            return total, iter(rows)
+        with self.lock:
+            page, total, problems = self._window(vault, offset, limit)
+
+        def generate():
+            rows = []
+            for start in range(0, len(page), chunk_size):
+                columns, final_order = self.get_columns(
+                    vault, page.iloc[start:start + chunk_size], problems)
+                chunk = self.to_records(columns, final_order)
+                rows.extend(chunk)
+                yield from chunk
+            report_problems(vault, problems)
+            BaseCache.add_to_cache(vault, self.base_path, name, (rows, total))
+
+        return total, generate()
+
+    def _summaries(self, vault: str, frame: pd.DataFrame, codes: np.ndarray,
+                   n_groups: int, problems: list[str]) -> list[dict]:
+        """
+        Computes the summaries of the columns for each group
+
+        Args:
+            vault (str): vault name
+            frame (pd.DataFrame): rows of the view
+            codes (np.ndarray): group number of each row
+            n_groups (int): number of groups
+            problems (list[str]): list to add the problems
+
+        Returns:
+            list[dict]: column -> summary for each group
+        """
+        result = [{} for _ in range(n_groups)]
+        for prop, name in self.summaries.items():
+            values = pd.Series([
+                convert_field(v)
+                for v in self.get_values(vault, prop, frame, problems)
+            ],
+                               dtype=object)
+            try:
+                summary = aggregate(values, codes, name)
+            except Exception as e:
+                problems.append(f'could not compute {name} of {prop}: {e}')
+                continue
+            column = self.column_name(prop)
+            for code in range(n_groups):
+                result[code][column] = json_value(summary.get(code))
+        return result
+
+    def summarize(self, vault: str, force_refresh: bool) -> dict:
+        """
+        Computes the groups and the column summaries of the view over the columns of the metadata table
+
+        Args:
+            vault (str): vault name
+            force_refresh (bool): if set, will drop cache for current view
+
+        Returns:
+            dict: "summaries" of the columns for all the rows, and "groups" in the order of the view,
+                each with "key" (see group_label), "count" and "summaries"
+        """
+        name = f'{self.name}#summary'
+        if not force_refresh:
+            cached, found_in_cache = BaseCache.get_from_cache(
+                vault, self.base_path, name)
+            if found_in_cache:
+                return cached
+        with self.lock:
+            frame = self.gather(vault)
+            problems = []
+            if self.limit is not None:
+                frame = frame.iloc[self.sort_positions(vault, frame, problems,
+                                                       self.limit)]
+            result = {
+                'summaries':
+                self._summaries(vault, frame, np.zeros(len(frame), dtype=int),
+                                1, problems)[0],
+                'groups': []
+            }
+            if self.group_by is not None and len(frame) > 0:
+                prop, direction = self.group_by
+                values = [
+                    convert_field(v)
+                    for v in self.get_values(vault, prop, frame, problems)
+                ]
+                keys = sort_key(values)
+                codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+                uniques = pd.Series(uniques)
+                order = np.argsort(
+                    uniques.fillna(NAN_CONST).to_numpy(dtype=object),
+                    kind='stable')
+                if direction == 'DESC':
+                    order = order[::-1]
+                counts = np.bincount(codes, minlength=len(uniques))
+                summaries = self._summaries(vault, frame, codes, len(uniques),
+                                            problems)
+                result['groups'] = [{
+                    'key': group_label(uniques[code]),
+                    'count': int(counts[code]),
+                    'summaries': summaries[code]
+                } for code in order]
+            report_problems(vault, problems)
+            # with the limit, the rows outside the view can move into it after any change
+            paths = set(frame.index) if self.limit is None else None
+            BaseCache.add_to_cache(vault, self.base_path, name, result, paths,
+                                   lambda changed: self.matches(vault, changed))
+            return result
+
+    def make_view(self,
+                  vault: str,
+                  force_refresh: bool,
+                  offset: int = 0,
+                  limit: int | None = None) -> dict:
         """
         Renders a view into a json-compatible dict
 
         Args:
             vault (str): vault name
             force_refresh (bool): if set, will drop cache for current view
+            offset (int, optional): number of rows to skip. Defaults to 0.
+            limit (int | None, optional): number of rows to render, all the rows if None.
+                Defaults to None.
 
 
         Returns:
             dict: resulting dict
         """
+        if offset or limit is not None or self.limit is not None:
+            return self.make_page(vault, force_refresh, offset, limit)[0]
+        if self.materialized:
+            return AppState.materialized_views[vault].get(self, force_refresh)
         if not force_refresh:
             cached, found_in_cache = BaseCache.get_from_cache(
                 vault, self.base_path, self.name)
             if found_in_cache:
                 return cached
         with self.lock:  # maybe too much
-            files = self.gather_files(vault)
-            result = []
+            frame = self.gather(vault)
+            matches = lambda changed: self.matches(vault, changed)
+            if len(frame) == 0:
+                BaseCache.add_to_cache(vault, self.base_path, self.name, [],
+                                       set(), matches)
+                return []
             problems = []
-            # order is matter, so it's not a set
-            order_list_plus_sort = self.order[:]
-            is_numeric = {}
-            for r in self.sorts:
-                order_list_plus_sort.append(r[0])
-            final_order = []
-            if self.type == 'cards':
-                if COVER_KEY not in order_list_plus_sort:
-                    order_list_plus_sort.append(COVER_KEY)
-            for f in files:
-                result.append({})
-                for r in order_list_plus_sort:
-                    prop_name = r.replace('.', '_')
-                    try:
-                        prop = r.split('.')
-                        if r in self.properties and 'displayName' in self.properties[
-                                r]:
-                            prop_name = self.properties[r]['displayName']
-
-                        if prop[0] == 'formula':
-                            value = self.formulas[prop[1]](f)
-                        else:
-                            value = f.get_prop(prop, render=True)
-                    except Exception as e:
-                        if AppState.config.vaults[
-                                vault].base_config.error_on_field_parse:
-                            raise ValueError(
-                                f'could not infer value {r} from {f.vault_path}: {e}'
-                            )
-                        else:
-                            problems.append(
-                                f'could not infer value {r} from {f.vault_path}: {e}'
-                            )
-                            value = ''
-                    if r in self.order and prop_name not in final_order:
-                        final_order.append(prop_name)
-                    value = convert_field(value)
-                    result[-1][prop_name] = value
-                    if prop_name not in is_numeric:
-                        is_numeric[prop_name] = True
-
-                    if isinstance(value, str):
-                        is_numeric[prop_name] = False
-
-            if self.type == 'cards' and COVER_KEY not in final_order:
-                final_order.append(COVER_KEY)
-
-            if problems:
-                use_log = True
-                if len(problems) > MAX_VIEW_ERRORS:
-                    for p in problems:
-                        logger.warning(p)
-                    problems = problems[:MAX_VIEW_ERRORS] + [
-                        '...', 'See  system logs'
-                    ]
-                    use_log = False
-
-                add_message('problems during base rendering',
-                            1,
-                            vault,
-                            '\n'.join(problems),
-                            use_log=use_log)
-            df = pd.DataFrame(result)
-            if len(df) > 0:
-                columns_to_sort = []
-                asc = []
-                for s in self.sorts:
-                    s = s[0].replace('.', '_'), s[1]
-                    if s[0] not in df.columns or s[1] not in ['ASC', 'DESC']:
-                        if AppState.config.vaults[
-                                vault].base_config.error_on_yaml_parse:
-                            raise ValueError(f'Bad value for sorting: {s}')
-                        else:
-                            add_message(
-                                f'problems with sorting: {s}. Skipping', 1,
-                                vault)
-                            continue
-                    columns_to_sort.append(s[0])
-                    asc.append(s[1] == 'ASC')
-                if len(columns_to_sort) == 0:
-                    column = df.columns[0]
-                    columns_to_sort.append(column)
-                    asc.append(True)
-                    logger.warning('using defualt sorting')
-
-                if len(columns_to_sort) > 0:
-                    for column in is_numeric:
-                        if is_numeric[column]:
-                            df[column] = pd.to_numeric(
-                                df[column], errors='coerce').fillna(NAN_CONST)
-                        else:
-                            df[column] = df[column].fillna('').astype(str)
-                    df = df.sort_values(columns_to_sort, ascending=asc)
-                else:
-                    add_message('The view is not sorted', 1, vault)
-            df = df[final_order]
-            result = df.to_dict(orient="records")
-            BaseCache.add_to_cache(vault, self.base_path, self.name, result)
+            columns, final_order = self.get_columns(vault, frame, problems)
+            report_problems(vault, problems)
+            result = self.to_result(vault, columns, final_order)
+            BaseCache.add_to_cache(vault, self.base_path, self.name, result,
+                                   set(frame.index), matches)
             return result
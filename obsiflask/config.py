@@ -86,6 +86,21 @@ class BaseConfig:
         },
     )
 
+    cache_size_mb: float = field(
+        default=16,
+        metadata={
+            "help": ("Memory budget in MB for the cache of rendered views")
+        },
+    )
+
+    formula_cache_size: int = field(
+        default=100000,
+        metadata={
+            "help":
+            ("Max number of formula values (formula, note) kept in the cache")
+        },
+    )
+
 
 @dataclass
 class GraphConfig:
@@ -271,6 +286,26 @@ class VaultConfig:
         },
     )
 
+    search_cache_size_mb: float = field(
+        default=16,
+        metadata={
+            "help":
+            ("Memory budget in MB for the cache of search results. "
+             "The cached results are dropped when the file index is rebuilt, "
+             "so changes made outside the app can be missed until then "
+             "(see file_index_update_time)")
+        },
+    )
+
+    text_index_save_time: int = field(
+        default=60,
+        metadata={
+            "help":
+            ("The text index is saved into service_dir (encrypted with obfuscation_key) "
+             "not more often than once per this amount of seconds")
+        },
+    )
+
     message_list_size: int = field(
         default=100,
         metadata={
@@ -320,6 +355,31 @@ class VaultConfig:
         metadata={"help": "Remove frequent ngrams"},
     )
 
+    autocomplete_frecency_half_life_days: float = field(
+        default=14,
+        metadata={
+            "help":
+            ("Autocomplete ranks files and tags by frecency: opens, edits and link insertions, "
+             "whose weight is halved each autocomplete_frecency_half_life_days days")
+        },
+    )
+
+    autocomplete_frecency_max_items: int = field(
+        default=1000,
+        metadata={
+            "help":
+            ("Max files and tags to keep in the frecency model of each user")
+        },
+    )
+
+    autocomplete_cache_size: int = field(
+        default=64,
+        metadata={
+            "help":
+            ("Max autocomplete requests to cache for each user, 0 to disable the cache")
+        },
+    )
+
     obfuscation_key: str = field(
         default="abc",
         metadata={
@@ -11,10 +11,13 @@ resulting obfuscation content will also be changed insignificantly
 import json
 import os
 import hashlib
+import shutil
 from pathlib import Path
 from base64 import b64decode, b64encode
 import argparse
+from threading import Lock, get_ident
 
+import numpy as np
 from Crypto.Cipher import ChaCha20
 
 from obsiflask.app_state import AppState
@@ -28,6 +31,11 @@ SALT_LENGTH = 16
 """
 Length of salt to generate
 """
+MAX_CACHED_KEYS = 4096
+"""
+Maximal number of derived keys to keep in memory
+"""
+_keys_lock = Lock()
 
 
 def make_key(password: str,
@@ -47,6 +55,33 @@ def make_key(password: str,
     return key
 
 
+def get_key(password: str, salt: bytes) -> bytes:
+    """
+    Cached version of make_key.
+    Key derivation is slow by design, 
+    so the derived keys are stored in AppState.obfuscate_keys, 
+    keyed by the password and salt.
+
+    Args:
+        password (str): obfuscation key
+        salt (bytes): salt
+
+    Returns:
+        bytes: derived key
+    """
+    cache_key = (password, salt)
+    with _keys_lock:
+        if cache_key in AppState.obfuscate_keys:
+            AppState.obfuscate_keys.move_to_end(cache_key)
+            return AppState.obfuscate_keys[cache_key]
+    key = make_key(password, salt)
+    with _keys_lock:
+        AppState.obfuscate_keys[cache_key] = key
+        while len(AppState.obfuscate_keys) > MAX_CACHED_KEYS:
+            AppState.obfuscate_keys.popitem(last=False)
+    return key
+
+
 def init_obfuscation():
     """
     A placeholder for obfuscation logic.
@@ -57,6 +92,26 @@ def init_obfuscation():
             raise ValueError(f'Bad obfuscation key for {vault}')
 
 
+def repeating_key_xor(data: bytes, key: bytes) -> bytes:
+    """
+    Vectorized xor of the data with the repeated key
+
+    Args:
+        data (bytes): bytes to process
+        key (bytes): key
+
+    Returns:
+        bytes: resulting bytes
+    """
+    if len(data) == 0:
+        return b''
+    data_arr = np.frombuffer(data, dtype=np.uint8)
+    key_arr = np.frombuffer(key, dtype=np.uint8)
+    repeats = -(-len(data_arr) // len(key_arr))
+    key_stream = np.tile(key_arr, repeats)[:len(data_arr)]
+    return np.bitwise_xor(data_arr, key_stream).tobytes()
+
+
 def repeating_key_xor_encrypt(pt: bytes, key: bytes) -> bytes:
     """
     Xor obfuscation
@@ -68,8 +123,7 @@ def repeating_key_xor_encrypt(pt: bytes, key: bytes) -> bytes:
     Returns:
         bytes: resulting obfuscated bytes
     """
-    ct = bytes([b ^ key[i % len(key)] for i, b in enumerate(pt)])
-    return ct
+    return repeating_key_xor(pt, key)
 
 
 def repeating_key_xor_decrypt(ct: bytes, key: bytes) -> bytes:
@@ -83,8 +137,7 @@ def repeating_key_xor_decrypt(ct: bytes, key: bytes) -> bytes:
     Returns:
         bytes: original bytes
     """
-    pt = bytes([b ^ key[i % len(key)] for i, b in enumerate(ct)])
-    return pt
+    return repeating_key_xor(ct, key)
 
 
 def obf_open(file_name: str,
@@ -120,6 +173,39 @@ def obf_open(file_name: str,
         return ObfuscationTextFile(file_name, method, vault, key)
 
 
+def obf_write_atomic(file_name: Path | str, vault: str, content: str):
+    """
+    Writes a text file atomically: the content is written into a hidden temporary file
+    in the same folder, which then replaces the original one.
+    Obfuscated files keep their salt, so the obfuscated content changes only where the text changes.
+
+    Args:
+        file_name (Path | str): name of the file
+        vault (str): vault name
+        content (str): content to write
+    """
+    file_name = Path(file_name)
+    obfuscate = AppState.config.vaults[vault].obfuscation_suffix in file_name.suffixes
+    tmp_name = file_name.with_name(
+        f'.{file_name.name}.{os.getpid()}.{get_ident()}.tmp')
+    try:
+        if obfuscate and file_name.exists():
+            # header with the salt is read by ObfuscationTextFile before writing
+            with open(file_name, 'rb') as inp, open(tmp_name, 'wb') as out:
+                out.write(inp.read(len(MAGIC_PHRASE) + 1 + SALT_LENGTH))
+        with obf_open(tmp_name,
+                      vault,
+                      'w',
+                      obfuscation_mode='obfuscate' if obfuscate else 'raw') as out:
+            out.write(content)
+        if file_name.exists():
+            shutil.copymode(file_name, tmp_name)
+        os.replace(tmp_name, file_name)
+    finally:
+        if tmp_name.exists():
+            tmp_name.unlink()
+
+
 class ObfuscationTextFile(object):
     """
     Helper for handling obfuscated text files
@@ -141,7 +227,7 @@ class ObfuscationTextFile(object):
         """
         self.key = key or AppState.config.vaults[vault].obfuscation_key
         self._read_header(file_name)
-        self.key = make_key(self.key, self.salt)
+        self.key = get_key(self.key, self.salt)
         assert method in ['r', 'w']
         fixed_method = method
         if method == 'r':
@@ -239,14 +325,14 @@ class ObfuscationBinaryFile(object):
         nonce = b64decode(result['nonce'])
         content = b64decode(result['content'])
         salt = b64decode(result['salt'])
-        key = make_key(self.key, salt)
+        key = get_key(self.key, salt)
         cipher = ChaCha20.new(key=key, nonce=nonce)
         plaintext = cipher.decrypt(content)
         return plaintext
 
     def write(self, content: bytes):
         salt = os.urandom(16)
-        key = make_key(self.key, salt)
+        key = get_key(self.key, salt)
         cipher = ChaCha20.new(key=key)
         ciphertext = b64encode(cipher.encrypt(content)).decode('utf-8')
         nonce = b64encode(cipher.nonce).decode('utf-8')
@@ -3,13 +3,41 @@ The module contains a FileIndex class that helps to resolve obsidian links w.r.t
 """
 import os
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
 from urllib import parse
 
-from obsiflask.utils import logger
+from obsiflask.utils import logger, get_traceback
 from obsiflask.app_state import AppState
 
 
+@dataclass
+class FileIndexDelta:
+    """
+    Changes of the vault files between two generations of the index
+    """
+    generation: int
+    """
+    Generation of the index after the changes
+    """
+    added: set[Path] = field(default_factory=set)
+    """
+    New files (absolute paths)
+    """
+    removed: set[Path] = field(default_factory=set)
+    """
+    Deleted files (absolute paths)
+    """
+    modified: set[Path] = field(default_factory=set)
+    """
+    Files with changed content (absolute paths)
+    """
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+
 class FileIndex:
 
     def __init__(self, path: str, template_dir: str, vault: str):
@@ -37,6 +65,42 @@ class FileIndex:
         self._file_set = set()
         self._tree = {}
         self._templates = []
+        self._signatures: dict[Path, tuple[int, int]] = {}
+        self._dirs: set[Path] = set()
+        self.generation = 0
+        # increased each time the set of files or their content changes
+        self.names_generation = 0
+        # increased each time files are added or removed, i.e. links can be resolved differently
+        self._listeners: list[Callable[[FileIndexDelta], None]] = []
+
+    def add_listener(self, listener: Callable[[FileIndexDelta], None]):
+        """
+        Registers a callback that is called with the delta
+        each time the vault files are changed
+
+        Args:
+            listener (Callable[[FileIndexDelta], None]): callback
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, delta: FileIndexDelta):
+        """
+        Increases generation and passes the delta to the listeners
+
+        Args:
+            delta (FileIndexDelta): changes
+        """
+        self.generation += 1
+        if delta.added or delta.removed:
+            self.names_generation += 1
+        delta.generation = self.generation
+        for listener in self._listeners:
+            try:
+                listener(delta)
+            except Exception as e:
+                logger.error(
+                    f'problems during file index update for {self.vault}: {get_traceback(e)}'
+                )
 
     def get_templates(self) -> list[Path]:
         """
@@ -98,20 +162,90 @@ class FileIndex:
         self._file_set = set(self._files)
 
         self._name_to_path = {}
+        signatures = {}
         for file in self._files:
             is_dir = file.is_dir()
             if not is_dir:
+                signatures[file] = self._get_signature(file)
                 shortname = str(file.name)
                 if shortname not in self._name_to_path:
                     self._name_to_path[shortname] = set()
                 self._name_to_path[shortname].add(file.parent)
+        old_signatures = self._signatures
+        self._signatures = signatures
+        dirs = self._file_set - set(signatures)
+        if dirs != self._dirs:
+            # folders are not passed to listeners, but they are used in hints
+            self._dirs = dirs
+            self.names_generation += 1
         self.last_time = time.time()
         self.tree = self.build_tree()
-        files_to_add = list(
-            set([str(f.relative_to(self.path)) for f in self._files])
-            | set([str(f.name) for f in self._files]))
-        AppState.hints[self.vault].string_all_file_index.update_index(
-            files_to_add)
+        if signatures != old_signatures:
+            delta = FileIndexDelta(self.generation)
+            for f, signature in signatures.items():
+                if f not in old_signatures:
+                    delta.added.add(f)
+                elif old_signatures[f] != signature:
+                    delta.modified.add(f)
+            delta.removed = set(old_signatures) - set(signatures)
+            self._notify(delta)
+        hint_index = AppState.hints[self.vault].string_all_file_index
+        if hint_index.current_state != self.names_generation:
+            files_to_add = set([
+                str(f.relative_to(self.path)) for f in self._files
+            ]) | set([str(f.name) for f in self._files])
+            hint_index.update_index(files_to_add, self.names_generation)
+
+    @staticmethod
+    def _get_signature(path: Path) -> tuple[int, int]:
+        """
+        Returns a cheap signature of the file content: modification time and size
+
+        Args:
+            path (Path): path to file
+
+        Returns:
+            tuple[int, int]: signature
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return (-1, -1)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def apply_changes(self, paths: list[Path | str]):
+        """
+        Notifies the index that the files were changed inside the service
+        (e.g. saved by the editor).
+        All the changes are passed to the listeners as a single delta.
+
+        Args:
+            paths (list[Path | str]): changed files
+        """
+        delta = FileIndexDelta(self.generation)
+        for path in paths:
+            path = Path(path).resolve()
+            if path not in self._file_set or not path.exists():
+                # new or deleted files require a full refresh to update the tree
+                self.refresh()
+                return
+            signature = self._get_signature(path)
+            if self._signatures.get(path) != signature:
+                self._signatures[path] = signature
+                delta.modified.add(path)
+        if delta:
+            self._notify(delta)
+
+    def get_generation(self) -> int:
+        """
+        Returns the current generation of the index.
+        The generation changes each time the vault files are changed
+
+        Returns:
+            int: generation
+        """
+        self.check_refresh()
+        return self.generation
 
     def check_refresh(self):
         """
@@ -141,13 +275,24 @@ class FileIndex:
         self.check_refresh()
         return self._name_to_path
 
+    def get_dirs(self) -> set[Path]:
+        """
+        Returns the folders of the vault
+
+        Returns:
+            set[Path]: folders
+        """
+        self.check_refresh()
+        return self._dirs
+
     def resolve_wikilink(self,
                          name: str,
                          path: Path,
                          resolve_markdown_without_ext: bool = False,
                          escape=True,
                          relative: bool = True,
-                         wrt_anchor: bool = True) -> str | None:
+                         wrt_anchor: bool = True,
+                         validate_anchor: bool = False) -> str | None:
         """
         Tries to resolve the wikilink
 
@@ -160,6 +305,9 @@ class FileIndex:
             relative (bool, optional): if True, will return relative link w.r.t. path, otherwise relative path
              w.r.t. index path. 
                 Defaults to True.
+            wrt_anchor (bool, optional): if True, will add the anchor to the escaped link. Defaults to True.
+            validate_anchor (bool, optional): if True, will drop the anchor if the note
+                has no such heading or block (see obsiflask.outline_index). Defaults to False.
 
         Returns:
             str | None: a resolved link or None if fails
@@ -203,6 +351,13 @@ class FileIndex:
             link = ((self.path / Path(name + '.md')))
 
         if link is not None:
+            if anchor and validate_anchor and link.suffix == '.md':
+                outline_index = AppState.outline_indices.get(self.vault)
+                if outline_index is not None and not outline_index.has_anchor(
+                        link, anchor):
+                    logger.warning(
+                        f'could not find anchor {anchor} in {link.name}')
+                    anchor = None
             if relative:
                 link = str(os.path.relpath(link, path))
             else:
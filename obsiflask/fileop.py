@@ -19,6 +19,7 @@ from obsiflask.auth import get_user
 from obsiflask.utils import get_traceback
 from obsiflask.encrypt.obfuscate import obf_open
 from obsiflask.consts import MAX_FILE_SIZE_MARKDOWN, TEXT_FILES_SFX
+from obsiflask.link_index import plan_backlink_rewrites, apply_backlink_rewrites
 
 lock = Lock()
 
@@ -240,6 +241,31 @@ def copy_move_file_op(in_: str | Path, out_: str | Path, vault: str,
             in_.unlink()
 
 
+def get_moves(vault: str, path: Path, dst: Path) -> dict[Path, Path]:
+    """
+    Returns new paths of the files that will be moved
+
+    Args:
+        vault (str): vault name
+        path (Path): file or directory to move
+        dst (Path): destination, for directories it must be the final path
+
+    Returns:
+        dict[Path, Path]: old real path -> new real path for each moved file
+    """
+    path = path.resolve()
+    dst = dst.resolve()
+    if not path.is_dir():
+        if dst.is_dir():
+            dst = dst / path.name
+        return {path: dst}
+    return {
+        f: dst / f.relative_to(path)
+        for f in AppState.indices[vault]
+        if f.is_relative_to(path) and not f.is_dir()
+    }
+
+
 def copy_move_file(vault: str, form: FileOpForm, copy: bool) -> bool:
     """
     Copy/Move processing
@@ -259,6 +285,7 @@ def copy_move_file(vault: str, form: FileOpForm, copy: bool) -> bool:
     try:
         path = AppState.indices[vault].path / Path(form.target.data)
         dst = AppState.indices[vault].path / Path(form.destination.data)
+        rewrites = []
         with lock:
             if path.is_dir():
                 if dst.exists():
@@ -267,6 +294,17 @@ def copy_move_file(vault: str, form: FileOpForm, copy: bool) -> bool:
             else:
                 dst.parent.mkdir(parents=True, exist_ok=True)
             isdir = path.is_dir()
+            if not copy:
+                moves = get_moves(vault, path, dst)
+                try:
+                    rewrites = plan_backlink_rewrites(vault, moves)
+                except Exception as e:
+                    add_message(
+                        f'Could not find links to {form.target.data}, they will not be updated',
+                        type=1,
+                        vault=vault,
+                        details=get_traceback(e),
+                        user=get_user())
             if copy:
                 copy_move_file_op(path, dst, vault, True)
                 if isdir:
@@ -284,10 +322,13 @@ def copy_move_file(vault: str, form: FileOpForm, copy: bool) -> bool:
                     shutil.move(path, dst)
 
         AppState.indices[vault].refresh()
-        add_message(f'{op_label} {form.target.data}: successful',
-                    0,
-                    vault,
-                    user=get_user())
+        message = f'{op_label} {form.target.data}: successful'
+        if rewrites:
+            with lock:
+                changed = apply_backlink_rewrites(vault, rewrites, moves)
+            AppState.indices[vault].apply_changes(changed)
+            message += f'. Links updated in {len(changed)} files'
+        add_message(message, 0, vault, user=get_user())
         return True
     except Exception as e:
         logger.error(f'problem during file {op_label} {path.name}: {e}')
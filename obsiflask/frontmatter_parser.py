@@ -0,0 +1,119 @@
+"""
+Shared frontmatter parser for the renderer, the property index and Bases.
+
+The YAML block is found without copying the note (the same boundaries as in python-frontmatter),
+and parsed with the C-accelerated YAML loader if PyYAML is built with libyaml.
+Parsed blocks are cached (LRU by the block text), so the same header is parsed once
+for all the consumers. The cached values are shared, so the callers must not modify them in place.
+Notes with TOML or JSON frontmatter are parsed with python-frontmatter
+"""
+import re
+from functools import lru_cache
+from typing import Any
+
+import frontmatter
+import yaml
+
+CACHE_SIZE = 4096
+"""
+Number of parsed frontmatter blocks kept in cache
+"""
+
+FRONTMATTER_BOUNDARY = re.compile(r'^-{3,}\s*$', re.MULTILINE)
+"""
+Line that opens and closes the YAML frontmatter, same as in python-frontmatter
+"""
+
+LEADING_SPACES = re.compile(r'\s*')
+
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+"""
+YAML loader: the C implementation if available
+"""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def load_header(header: str) -> Any:
+    """
+    Parses the YAML block
+
+    Args:
+        header (str): text between the frontmatter boundaries
+
+    Returns:
+        Any: parsed YAML
+    """
+    return yaml.load(header, Loader=Loader)
+
+
+def split(text: str) -> tuple[str, str, int] | None:
+    """
+    Finds the YAML frontmatter of the note
+
+    Args:
+        text (str): content of the note
+
+    Returns:
+        tuple[str, str, int] | None: the note (without leading spaces if they are on the boundary line),
+            YAML block and position of the content after it.
+            None if the note has no YAML frontmatter
+    """
+    start = LEADING_SPACES.match(text).end()
+    if start > 0 and text[start - 1] != '\n':
+        # the boundary is not at the beginning of the line
+        text = text[start:]
+        start = 0
+    boundaries = FRONTMATTER_BOUNDARY.finditer(text, start)
+    opening = next(boundaries, None)
+    if opening is None or opening.start() != start:
+        return None
+    closing = next(boundaries, None)
+    if closing is None:
+        return None
+    return text, text[opening.end():closing.start()], closing.end()
+
+
+def _is_other_format(text: str) -> bool:
+    """
+    Checks if the note starts with TOML or JSON frontmatter
+    """
+    return text.lstrip().startswith(('+++', '{', '}'))
+
+
+def parse_metadata(text: str) -> dict[str, Any]:
+    """
+    Returns only the frontmatter of the note, same as python-frontmatter
+
+    Args:
+        text (str): content of the note or its frontmatter block
+
+    Returns:
+        dict[str, Any]: properties, empty if the note has no frontmatter
+    """
+    found = split(text)
+    if found is None:
+        if _is_other_format(text):
+            return frontmatter.parse(text)[0]
+        return {}
+    data = load_header(found[1])
+    return dict(data) if isinstance(data, dict) else {}
+
+
+def parse(text: str) -> tuple[dict[str, Any], str]:
+    """
+    Splits the note into frontmatter and content, same as frontmatter.parse
+
+    Args:
+        text (str): content of the note
+
+    Returns:
+        tuple[dict[str, Any], str]: properties and stripped content
+    """
+    found = split(text)
+    if found is None:
+        if _is_other_format(text):
+            return frontmatter.parse(text)
+        return {}, text.strip()
+    text, header, end = found
+    data = load_header(header)
+    return (dict(data) if isinstance(data, dict) else {}), text[end:].strip()
@@ -12,6 +12,7 @@ from flask import url_for
 
 from obsiflask.app_state import AppState
 from obsiflask.bases.file_info import FileInfo
+from obsiflask.file_index import FileIndexDelta
 from obsiflask.utils import logger
 from obsiflask.hint import MAX_HINT
 from obsiflask.pages.renderer import url_for_tag
@@ -45,6 +46,34 @@ class Graph:
         self.result = None
         self.last_time_built = -1
         self.lock = Lock()
+        self._file_infos: dict[Path, FileInfo] = {}
+        # file infos are reused between builds for unchanged files
+        AppState.indices[vault].add_listener(self.on_files_changed)
+
+    def on_files_changed(self, delta: FileIndexDelta):
+        """
+        Drops file infos for the changed files
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        for path in delta.removed | delta.modified:
+            self._file_infos.pop(path, None)
+
+    def get_file_info(self, path: Path) -> FileInfo:
+        """
+        Returns a file info for the file, reusing it if the file was not changed
+
+        Args:
+            path (Path): real path
+
+        Returns:
+            FileInfo: file info
+        """
+        info = self._file_infos.get(path)
+        if info is None:
+            info = FileInfo(path, self.vault)
+        return info
 
     def build(self,
               rebuild: bool = False,
@@ -68,9 +97,10 @@ class Graph:
                 return self.result
             files = list(AppState.indices[self.vault])
             files = [
-                FileInfo(f, self.vault) for f in files
+                self.get_file_info(f) for f in files
                 if f.is_file() and f.suffix == ".md"
             ]
+            self._file_infos = {f.real_path: f for f in files}
             used_tags = {}
 
             nodes = [str(f.get_prop(['file', 'path'])) for f in files]
@@ -141,10 +171,28 @@ class Graph:
                         None, best_files)
             all_files = set([str(f.vault_path) for f in result.files]) | set(
                 [str(f.vault_path.name) for f in result.files])
+            index = AppState.indices[self.vault]
             AppState.hints[self.vault].string_file_index.update_index(
-                all_files)
+                all_files, index.names_generation)
             AppState.hints[self.vault].string_tag_index.update_index(
-                set(used_tags))
+                set(used_tags), index.generation)
+            # in-degree is used as the centrality for the prefix autocomplete
+            in_degrees = np.zeros(len(result.node_labels))
+            for _, v in result.edges:
+                in_degrees[v] += 1
+            file_scores = {}
+            for file_id, f in enumerate(result.files):
+                score = float(in_degrees[file_id])
+                file_scores[str(f.vault_path)] = score
+                name = str(f.vault_path.name)
+                file_scores[name] = max(file_scores.get(name, 0.0), score)
+            AppState.hints[self.vault].file_prefix_index.update_index(
+                file_scores, index.generation)
+            AppState.hints[self.vault].tag_prefix_index.update_index(
+                {
+                    tag: float(in_degrees[tag_id])
+                    for tag, tag_id in used_tags.items()
+                }, index.generation)
             if dry:
                 return result
 
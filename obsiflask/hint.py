@@ -3,24 +3,60 @@ Basic logic for autocomplete task.
 Gathers info about recently openned files (and all files as well),
 popular tags.
 
-Also there is an implementation of fuzzy search index
+Also there are implementations of fuzzy search index
 """
-from zlib import crc32
-from threading import Lock
-from collections import deque
+import atexit
+import bisect
+import heapq
+import json
+import math
+import time
+from pathlib import Path
+from threading import Lock, RLock
+from collections import deque, OrderedDict
+from typing import Hashable
 
-from obsiflask.utils import logger
+import numpy as np
+
+from obsiflask.app_state import AppState
+from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.file_index import FileIndexDelta
+from obsiflask.utils import logger, get_traceback, resolve_service_path
 
 MAX_HINT = 10
 """
 Note, this number is approximate. Can be slightly more
 """
 _lock = Lock()
+FRECENCY_WEIGHTS = {'open': 1.0, 'edit': 2.0, 'link': 4.0}
+"""
+Weights of the user actions in the frecency model
+"""
+FRECENCY_SAVE_TIME = 60
+"""
+The frecency models are saved not more often than once per this amount of seconds
+"""
+FRECENCY_SEARCH_FACTOR = 5
+"""
+Number of candidates (w.r.t. MAX_HINT) to take from the ngram index for reranking with frecency
+"""
+SPARSE_MERGE_FACTOR = 4
+"""
+The search session merges new ngrams into the previous match counts only if
+the number of candidates and postings is SPARSE_MERGE_FACTOR times less than the index size,
+otherwise the counts are computed densely
+"""
 
 
-class NaiveStringIndex:
+class ArrayStringIndex:
     """
-    Fuzzy index based on ngrams
+    Fuzzy index based on ngrams with postings stored as numpy arrays.
+
+    Strings are interned: each string gets an integer id,
+    and each ngram is mapped into a sorted uint32 array of the string ids.
+    The search counts ngram matches for all the strings at once with np.bincount.
+
+    The interface is the same as in the naive baseline (tests/benchmarks/naive_index.py)
     """
 
     def __init__(self, ngram_order: int, max_ngrams: int,
@@ -41,53 +77,260 @@ class NaiveStringIndex:
         self.max_ngrams = max_ngrams
         assert max_ngrams > 0
         self.current_state: int = -1
-        self.ngrams_to_strings: dict[str, set[str]] = None
+        # generation of the strings, see update_index
+        self.ngrams_to_strings: dict[str, np.ndarray] = None
+        # ngram -> sorted ids of the strings
+        self.id_to_string: list[str] = []
+        self.string_to_id: dict[str, int] = {}
+        # only alive strings
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        # removed strings stay in postings until the next rebuild
+        self.blacklist: set[str] = set()
+        # too frequent ngrams or pruned ngrams
+        self.rebuild_size = 0
+        # number of strings after the last full rebuild
+        self.removed_since_rebuild = 0
+        self.version = 0
+        # increased on any change of the postings, invalidates search sessions
+        self.lock = RLock()
 
-    def update_index(self, strings: set[str]):
+    @property
+    def strings(self) -> set[str]:
         """
-        Rebuils index with new strings.
-        If nothing was changed, does nothing
+        Strings in the index
+        """
+        return set(self.string_to_id)
+
+    def get_ngrams(self, s: str) -> set[str]:
+        """
+        Returns ngrams of the string
+
         Args:
-            strings (set[str]): new strings to rebuild index
+            s (str): string
+
+        Returns:
+            set[str]: ngrams
         """
-        hash_ = crc32(''.join(sorted(strings)).encode('utf-8', 'ignore'))
-        if hash_ == self.current_state:
+        return {
+            s[ngram_id:ngram_id + self.ngram_order]
+            for ngram_id in range(len(s) - self.ngram_order + 1)
+        }
+
+    def prune(self, max_ngrams: int):
+        """
+        Keeps only max_ngrams rarest ngrams, others are blacklisted
+
+        Args:
+            max_ngrams (int): number of ngrams to keep
+        """
+        if len(self.ngrams_to_strings) <= max_ngrams:
             return
-        self.ngrams_to_strings = {}
-        blacklist = set()
-
-        def prune():
-            sorted_keys = sorted(
-                self.ngrams_to_strings.keys(),
-                key=lambda x: len(self.ngrams_to_strings[x]))[self.max_ngrams:]
-            for k in sorted_keys:
+        to_keep = set(
+            heapq.nsmallest(max_ngrams,
+                            self.ngrams_to_strings,
+                            key=lambda x: len(self.ngrams_to_strings[x])))
+        for k in list(self.ngrams_to_strings):
+            if k not in to_keep:
                 logger.debug(f'Pruning {k} from ngram index')
                 del self.ngrams_to_strings[k]
-                blacklist.add(k)
+                self.blacklist.add(k)
 
-        for k in strings:
-            for ngram_id in range(len(k) - self.ngram_order + 1):
-                ngram = k[ngram_id:ngram_id + self.ngram_order]
-                if ngram in blacklist:
-                    continue
+    def _index(self, strings: list[str]):
+        """
+        Interns the strings and adds their ids into the postings.
+        Since ids are increasing, the postings stay sorted
 
-                if ngram not in self.ngrams_to_strings:
-                    self.ngrams_to_strings[ngram] = set()
-                self.ngrams_to_strings[ngram].add(k)
-                if len(self.ngrams_to_strings[ngram]) / len(
-                        strings) > self.max_prop_in_dict:
-                    blacklist.add(ngram)
-                    del self.ngrams_to_strings[ngram]
-                    logger.debug(f'Pruning {ngram} from ngram index')
-                if len(self.ngrams_to_strings) > 2 * self.max_ngrams:
-                    prune()
-        prune()
-        self.current_state = hash_
-        if len(blacklist) > 0:
+        Args:
+            strings (list[str]): new strings to index
+        """
+        self.version += 1
+        first_id = len(self.id_to_string)
+        new_postings: dict[str, list[int]] = {}
+        for string_id, k in enumerate(strings, first_id):
+            self.id_to_string.append(k)
+            self.string_to_id[k] = string_id
+            for ngram in self.get_ngrams(k):
+                if ngram not in self.blacklist:
+                    new_postings.setdefault(ngram, []).append(string_id)
+        self.lengths = np.concatenate(
+            [self.lengths,
+             np.array([len(k) for k in strings], dtype=np.int32)])
+        self.alive = np.concatenate(
+            [self.alive, np.ones(len(strings), dtype=bool)])
+        total = len(self.string_to_id)
+        for ngram, ids in new_postings.items():
+            ids = np.array(ids, dtype=np.uint32)
+            old_ids = self.ngrams_to_strings.get(ngram)
+            if old_ids is not None:
+                ids = np.concatenate([old_ids, ids])
+            if len(ids) / total > self.max_prop_in_dict:
+                self.blacklist.add(ngram)
+                self.ngrams_to_strings.pop(ngram, None)
+                logger.debug(f'Pruning {ngram} from ngram index')
+            else:
+                self.ngrams_to_strings[ngram] = ids
+        self.prune(self.max_ngrams)
+
+    def rebuild(self, strings: set[str]):
+        """
+        Rebuilds index from scratch
+
+        Args:
+            strings (set[str]): strings to index
+        """
+        with self.lock:
+            self.ngrams_to_strings = {}
+            self.blacklist = set()
+            self.id_to_string = []
+            self.string_to_id = {}
+            self.lengths = np.zeros(0, dtype=np.int32)
+            self.alive = np.zeros(0, dtype=bool)
+            self.rebuild_size = len(strings)
+            self.removed_since_rebuild = 0
+            self.version += 1
+            self._index(sorted(strings))
+        if len(self.blacklist) > 0:
             logger.info(
-                f'Pruned {len(blacklist)} ngrams during index building')
+                f'Pruned {len(self.blacklist)} ngrams during index building')
+
+    def add(self, strings: set[str]):
+        """
+        Adds strings into the index.
+        The ngrams that were blacklisted before are not restored,
+        so the index is rebuilt when its size is doubled
 
-    def search(self, q: str) -> tuple[list[tuple[str, str]], float]:
+        Args:
+            strings (set[str]): strings to add
+        """
+        with self.lock:
+            new_strings = sorted(k for k in strings
+                                 if k not in self.string_to_id)
+            if not new_strings:
+                return
+            if self.ngrams_to_strings is None or len(self.string_to_id) + len(
+                    new_strings) > 2 * self.rebuild_size:
+                self.rebuild(self.strings | set(new_strings))
+                return
+            self._index(new_strings)
+
+    def remove(self, strings: set[str]):
+        """
+        Removes strings from the index.
+        The strings are only marked as removed, postings are cleaned during rebuild.
+        The index is rebuilt when a half of strings is removed
+
+        Args:
+            strings (set[str]): strings to remove
+        """
+        with self.lock:
+            if self.ngrams_to_strings is None:
+                return
+            for k in strings:
+                string_id = self.string_to_id.pop(k, None)
+                if string_id is None:
+                    continue
+                self.alive[string_id] = False
+                self.removed_since_rebuild += 1
+                self.version += 1
+            if self.removed_since_rebuild > self.rebuild_size / 2:
+                self.rebuild(self.strings)
+
+    def update_index(self, strings: set[str], generation: int | None = None):
+        """
+        Updates index with new strings: only the difference with the current strings is indexed.
+        If nothing was changed, does nothing
+
+        Args:
+            strings (set[str]): new strings
+            generation (int | None, optional): generation of the strings (e.g. from FileIndex).
+                If it equals to the generation of the index, the strings are not compared at all.
+                Defaults to None.
+        """
+        with self.lock:
+            if generation is not None and generation == self.current_state:
+                return
+            if self.ngrams_to_strings is None:
+                self.rebuild(strings)
+            else:
+                current = self.strings
+                to_remove = current - strings
+                to_add = strings - current
+                if not to_remove and not to_add:
+                    if generation is not None:
+                        self.current_state = generation
+                    return
+                if (self.removed_since_rebuild + len(to_remove) >
+                        self.rebuild_size / 2
+                        or len(strings) > 2 * self.rebuild_size):
+                    self.rebuild(strings)
+                else:
+                    self.remove(to_remove)
+                    self.add(to_add)
+            if generation is not None:
+                self.current_state = generation
+            else:
+                self.current_state += 1
+
+    def apply_delta(self, added: set[str], removed: set[str], generation: int,
+                    base_generation: int) -> bool:
+        """
+        Adds and removes the changed strings without comparing all the strings.
+        Works only if the index has the strings of base_generation,
+        otherwise it missed some changes and update_index is needed
+
+        Args:
+            added (set[str]): new strings
+            removed (set[str]): removed strings
+            generation (int): generation of the strings after the changes
+            base_generation (int): generation of the strings before the changes
+
+        Returns:
+            bool: True if the changes were applied
+        """
+        with self.lock:
+            if (self.ngrams_to_strings is None
+                    or self.current_state != base_generation):
+                return False
+            self.remove(removed - added)
+            self.add(added)
+            self.current_state = generation
+            return True
+
+    def _merge_posting(self, ids: np.ndarray, counts: np.ndarray,
+                       posting: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Adds one ngram match to the sparse match counts
+
+        Args:
+            ids (np.ndarray): sorted ids of the strings with matches
+            counts (np.ndarray): number of matches
+            posting (np.ndarray): sorted ids of the strings with the ngram
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: new ids and counts
+        """
+        pos = np.searchsorted(ids, posting)
+        found = pos < len(ids)
+        found[found] = ids[pos[found]] == posting[found]
+        counts = counts.copy()
+        counts[pos[found]] += 1
+        new_ids = posting[~found]
+        new_ids = new_ids[self.alive[new_ids]]
+        if len(new_ids) == 0:
+            return ids, counts
+        ids = np.concatenate([ids, new_ids])
+        # both parts are sorted, so the stable sort (timsort) just merges them
+        order = np.argsort(ids, kind='stable')
+        counts = np.concatenate([counts,
+                                 np.ones(len(new_ids), dtype=counts.dtype)])
+        return ids[order], counts[order]
+
+    def search(self,
+               q: str,
+               limit: int = MAX_HINT,
+               session: 'SearchSession | None' = None
+               ) -> tuple[list[tuple[str, int]], int]:
         """
         Search in the index.
         Returns only the results with the best match, 
@@ -96,39 +339,538 @@ class NaiveStringIndex:
 
         Args:
             q (str): string to find
+            limit (int, optional): max number of results. Defaults to MAX_HINT.
+            session (SearchSession | None, optional): the previous search of the user.
+                If the query extends the previous one, only the new ngrams are looked up.
+                Defaults to None.
 
         Returns:
-            tuple[list[tuple[str, str]], float]: tuple with two elements:
+            tuple[list[tuple[str, int]], int]: tuple with two elements:
                 the first is a list of found matches, for each there is also provided a difference
                 of length between the query string and the collection string
-                the second is the ratio of ngrams that were found in the string
+                the second is the number of query ngrams that were found in the best matches
         """
         q = q.strip()
-        if len(q) < self.ngram_order:
-            return [], 0
-        candidates = {}
-        for ngram_id in range(len(q) - self.ngram_order + 1):
-            ngram = q[ngram_id:ngram_id + self.ngram_order]
-            for c in self.ngrams_to_strings.get(ngram, []):
-                if c not in candidates:
-                    candidates[c] = 0
-                candidates[c] += 1
-        if len(candidates) == 0:
-            return [], 0
-        best_match = max(candidates.values())
-        top_candidates = [(c, abs(len(q) - len(c)))
-                          for c, v in candidates.items() if v == best_match]
-        top_candidates = sorted(top_candidates, key=lambda x: x[1])[:MAX_HINT]
+        with self.lock:
+            if self.ngrams_to_strings is None:
+                return [], 0
+            first_ngram = 0
+            previous = None
+            if (session is not None and session.version == self.version
+                    and session.query is not None
+                    and q.startswith(session.query)):
+                first_ngram = max(len(session.query) - self.ngram_order + 1,
+                                  0)
+                previous = session.ids, session.counts
+            postings = [
+                self.ngrams_to_strings[ngram] for ngram in (
+                    q[ngram_id:ngram_id + self.ngram_order]
+                    for ngram_id in range(first_ngram,
+                                          len(q) - self.ngram_order + 1))
+                if ngram in self.ngrams_to_strings
+            ]
+            if previous is None:
+                ids = np.zeros(0, dtype=np.uint32)
+                counts = np.zeros(0, dtype=np.int64)
+                if postings:
+                    counts = np.bincount(np.concatenate(postings),
+                                         minlength=len(self.alive))
+                    counts[~self.alive] = 0
+                    ids = np.flatnonzero(counts).astype(np.uint32)
+                    counts = counts[ids]
+            else:
+                ids, counts = previous
+                size = len(ids) + sum(len(p) for p in postings)
+                if size * SPARSE_MERGE_FACTOR > len(self.alive):
+                    # too many candidates, dense counts are faster
+                    dense = np.zeros(len(self.alive), dtype=np.int64)
+                    dense[ids] = counts
+                    if postings:
+                        dense += np.bincount(np.concatenate(postings),
+                                             minlength=len(self.alive))
+                        dense[~self.alive] = 0
+                    ids = np.flatnonzero(dense).astype(np.uint32)
+                    counts = dense[ids]
+                else:
+                    for posting in postings:
+                        ids, counts = self._merge_posting(ids, counts, posting)
+            if session is not None:
+                session.query = q
+                session.version = self.version
+                session.ids, session.counts = ids, counts
+            if len(ids) == 0:
+                return [], 0
+            best_match = int(counts.max())
+            candidates = ids[counts == best_match]
+            diffs = np.abs(self.lengths[candidates] - len(q))
+            if len(candidates) > limit:
+                top = np.argpartition(diffs, limit)[:limit]
+                candidates = candidates[top]
+                diffs = diffs[top]
+            order = np.argsort(diffs, kind='stable')
+            top_candidates = [(self.id_to_string[candidates[i]], int(diffs[i]))
+                              for i in order]
         return top_candidates, best_match
 
 
+class _TrieNode:
+    """
+    Node of the compressed prefix trie
+    """
+    __slots__ = ('label', 'children', 'items', 'top')
+
+    def __init__(self, label: str):
+        self.label = label
+        # lowercased part of the key on the edge from the parent
+        self.children: dict[str, _TrieNode] = {}
+        # first char of the child label -> child
+        self.items: list[str] = []
+        # strings whose key ends in this node
+        self.top: list[tuple[float, str]] = []
+        # (-score, string) of the best strings in the subtree, sorted
+
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix index: compressed trie over the strings.
+    Each node keeps the top strings of its subtree by score (e.g. graph centrality),
+    so completion of a prefix is O(prefix length).
+
+    Strings are added and removed incrementally; on removal, the top lists are
+    recomputed only on the path of the string from the top lists of the children.
+    If most of the strings are changed, the index is rebuilt
+    """
+
+    def __init__(self, top_k: int = MAX_HINT * FRECENCY_SEARCH_FACTOR):
+        """
+        Constructor
+
+        Args:
+            top_k (int, optional): max strings to keep in each node. 
+                Defaults to MAX_HINT * FRECENCY_SEARCH_FACTOR.
+        """
+        self.top_k = top_k
+        self.root = _TrieNode('')
+        self.scores: dict[str, float] = {}
+        self.current_state: int = -1
+        # generation of the strings, see update_index
+        self.version = 0
+        # increased on any change
+        self.lock = RLock()
+
+    @property
+    def strings(self) -> set[str]:
+        """
+        Strings in the index
+        """
+        return set(self.scores)
+
+    def _path(self, key: str) -> list[_TrieNode]:
+        """
+        Returns nodes from the root to the node of the key. Must be called under the lock
+
+        Args:
+            key (str): lowercased string
+
+        Returns:
+            list[_TrieNode]: nodes, empty if the key is not found
+        """
+        path = [self.root]
+        node = self.root
+        while key:
+            node = node.children.get(key[0])
+            if node is None or not key.startswith(node.label):
+                return []
+            path.append(node)
+            key = key[len(node.label):]
+        return path
+
+    def _insert(self, string: str, score: float, update_top: bool = True):
+        """
+        Inserts the string. Must be called under the lock
+
+        Args:
+            string (str): string
+            score (float): score of the string, the larger the better
+            update_top (bool, optional): if not set, the top lists are not updated,
+                see rebuild. Defaults to True.
+        """
+        key = string.lower()
+        node = self.root
+        path = [node]
+        while key:
+            child = node.children.get(key[0])
+            if child is None:
+                child = _TrieNode(key)
+                node.children[key[0]] = child
+            elif not key.startswith(child.label):
+                common = 1
+                while (common < len(key)
+                       and child.label[common] == key[common]):
+                    common += 1
+                # split the edge
+                middle = _TrieNode(child.label[:common])
+                child.label = child.label[common:]
+                middle.children[child.label[0]] = child
+                middle.top = list(child.top)
+                node.children[key[0]] = middle
+                child = middle
+            key = key[len(child.label):]
+            node = child
+            path.append(node)
+        if string not in node.items:
+            node.items.append(string)
+        if not update_top:
+            return
+        entry = (-score, string)
+        for n in path:
+            if len(n.top) < self.top_k or entry < n.top[-1]:
+                bisect.insort(n.top, entry)
+                del n.top[self.top_k:]
+
+    def _delete(self, string: str, score: float):
+        """
+        Removes the string. Must be called under the lock
+
+        Args:
+            string (str): string
+            score (float): score of the string
+        """
+        path = self._path(string.lower())
+        if not path:
+            return
+        if string in path[-1].items:
+            path[-1].items.remove(string)
+        entry = (-score, string)
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            if depth > 0 and not node.items and len(node.children) <= 1:
+                parent = path[depth - 1]
+                if not node.children:
+                    del parent.children[node.label[0]]
+                    continue
+                # merge the node with its only child
+                child = next(iter(node.children.values()))
+                child.label = node.label + child.label
+                parent.children[child.label[0]] = child
+                continue
+            if entry in node.top:
+                self._update_top(node)
+
+    def _update_top(self, node: _TrieNode):
+        """
+        Computes the top list of the node from its strings and the top lists of the children.
+        Must be called under the lock
+
+        Args:
+            node (_TrieNode): node
+        """
+        candidates = [(-self.scores[s], s) for s in node.items]
+        for child in node.children.values():
+            candidates.extend(child.top)
+        node.top = heapq.nsmallest(self.top_k, candidates)
+
+    def rebuild(self, scores: dict[str, float]):
+        """
+        Rebuilds index from scratch: the strings are inserted first,
+        then the top lists are computed bottom-up
+
+        Args:
+            scores (dict[str, float]): strings with their scores
+        """
+        with self.lock:
+            self.root = _TrieNode('')
+            self.scores = dict(scores)
+            for string, score in scores.items():
+                self._insert(string, score, update_top=False)
+            stack = [(self.root, False)]
+            while stack:
+                node, visited = stack.pop()
+                if visited:
+                    self._update_top(node)
+                else:
+                    stack.append((node, True))
+                    stack.extend((c, False) for c in node.children.values())
+            self.version += 1
+
+    def add(self, scores: dict[str, float]):
+        """
+        Adds strings into the index, the strings that are already indexed are rescored
+
+        Args:
+            scores (dict[str, float]): strings with their scores
+        """
+        with self.lock:
+            for string, score in scores.items():
+                old_score = self.scores.get(string)
+                if old_score == score:
+                    continue
+                if old_score is not None:
+                    self._delete(string, old_score)
+                self.scores[string] = score
+                self._insert(string, score)
+                self.version += 1
+
+    def remove(self, strings: set[str]):
+        """
+        Removes strings from the index
+
+        Args:
+            strings (set[str]): strings to remove
+        """
+        with self.lock:
+            for string in strings:
+                score = self.scores.get(string)
+                if score is None:
+                    continue
+                self._delete(string, score)
+                del self.scores[string]
+                self.version += 1
+
+    def update_index(self,
+                     scores: dict[str, float],
+                     generation: int | None = None):
+        """
+        Updates index with new strings: only the difference with the current strings
+        and their scores is indexed
+
+        Args:
+            scores (dict[str, float]): new strings with their scores
+            generation (int | None, optional): generation of the strings (e.g. from FileIndex).
+                If it equals to the generation of the index, the strings are not compared at all.
+                Defaults to None.
+        """
+        with self.lock:
+            if generation is not None and generation == self.current_state:
+                return
+            to_remove = set(self.scores) - set(scores)
+            to_add = {
+                s: score
+                for s, score in scores.items() if self.scores.get(s) != score
+            }
+            if len(to_remove) + len(to_add) > len(scores) / 2:
+                self.rebuild(scores)
+            else:
+                self.remove(to_remove)
+                self.add(to_add)
+            if generation is not None:
+                self.current_state = generation
+            else:
+                self.current_state += 1
+
+    def search(self, q: str, limit: int = MAX_HINT) -> list[tuple[str, int]]:
+        """
+        Finds the strings that start with the query (case-insensitive)
+
+        Args:
+            q (str): prefix
+            limit (int, optional): max number of results. Defaults to MAX_HINT.
+
+        Returns:
+            list[tuple[str, int]]: strings with the best scores, for each there is also provided
+                a difference of length between the query string and the string
+        """
+        key = q.strip().lower()
+        if not key:
+            return []
+        with self.lock:
+            node = self.root
+            while key:
+                node = node.children.get(key[0])
+                if node is None:
+                    return []
+                if node.label.startswith(key):
+                    break
+                if not key.startswith(node.label):
+                    return []
+                key = key[len(node.label):]
+            return [(s, len(s) - len(q.strip())) for _, s in node.top[:limit]]
+
+
+class SearchSession:
+    """
+    The last search of one user in one string index.
+    When the user types the next characters, the query extends the previous one,
+    so its ngram match counts are the previous counts plus the counts of the new ngrams
+    """
+
+    def __init__(self):
+        self.query: str | None = None
+        self.version = -1
+        # version of the index, see ArrayStringIndex.version
+        self.ids = np.zeros(0, dtype=np.uint32)
+        self.counts = np.zeros(0, dtype=np.int64)
+        # ids of the strings with at least one matched ngram and the number of matches
+
+
+class HintSession:
+    """
+    Hint state of one user: searches in the string indices and LRU cache of the recent hints
+    """
+
+    def __init__(self, cache_size: int):
+        """
+        Constructor
+
+        Args:
+            cache_size (int): max hint requests to cache, 0 to disable the cache
+        """
+        self.cache_size = cache_size
+        self.cache: OrderedDict[Hashable, tuple[Hashable, list[dict]]] = OrderedDict()
+        # request -> (state of the indices, hints)
+        self.searches: dict[str, SearchSession] = {}
+        # index name -> the last search
+        self.lock = Lock()
+
+    def get(self, key: Hashable, state: Hashable) -> list[dict] | None:
+        """
+        Returns the cached hints
+
+        Args:
+            key (Hashable): request
+            state (Hashable): current state of the indices, see HintIndex.get_state
+
+        Returns:
+            list[dict] | None: copy of the hints or None if they are not cached or outdated
+        """
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is None or cached[0] != state:
+                return None
+            self.cache.move_to_end(key)
+            return [dict(r) for r in cached[1]]
+
+    def put(self, key: Hashable, state: Hashable, result: list[dict]):
+        """
+        Caches the hints
+
+        Args:
+            key (Hashable): request
+            state (Hashable): current state of the indices
+            result (list[dict]): hints
+        """
+        if self.cache_size <= 0:
+            return
+        with self.lock:
+            self.cache[key] = (state, [dict(r) for r in result])
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def get_search(self, name: str) -> SearchSession:
+        """
+        Returns the last search in the index
+
+        Args:
+            name (str): index name
+
+        Returns:
+            SearchSession: search session
+        """
+        with self.lock:
+            if name not in self.searches:
+                self.searches[name] = SearchSession()
+            return self.searches[name]
+
+
+class FrecencyModel:
+    """
+    Frecency of the items (files or tags) for one user:
+    a sum of the action weights that decay exponentially with time.
+
+    Instead of the score, each item stores its logarithm at a fixed zero time:
+    log2(sum(weight * 2^(time / half_life))).
+    This key does not change with time, so the order of the items is kept,
+    an update is O(1), and eviction of the least frecent item uses a heap (O(log n))
+    """
+
+    def __init__(self, half_life: float, max_items: int):
+        """
+        Constructor
+
+        Args:
+            half_life (float): time in seconds, after which the action weight is halved
+            max_items (int): max items to keep, the least frecent ones are evicted
+        """
+        self.half_life = half_life
+        self.max_items = max_items
+        self.keys: dict[str, float] = {}
+        self.heap: list[tuple[float, str]] = []
+        # min-heap of the keys, can contain outdated entries
+        self.version = 0
+        # increased on each update, invalidates the cached hints of the model users
+
+    def update(self, item: str, weight: float, now: float | None = None):
+        """
+        Registers an action with the item
+
+        Args:
+            item (str): file or tag
+            weight (float): action weight
+            now (float | None, optional): time of the action. Defaults to current time.
+        """
+        if now is None:
+            now = time.time()
+        key = math.log2(weight) + now / self.half_life
+        self.version += 1
+        if item in self.keys:
+            old = self.keys[item]
+            key = max(old, key) + math.log2(1 + 2**(-abs(old - key)))
+        self.keys[item] = key
+        heapq.heappush(self.heap, (key, item))
+        while len(self.keys) > self.max_items:
+            old_key, old_item = heapq.heappop(self.heap)
+            if self.keys.get(old_item) == old_key:
+                del self.keys[old_item]
+        if len(self.heap) > 2 * self.max_items:
+            self.heap = [(k, i) for i, k in self.keys.items()]
+            heapq.heapify(self.heap)
+
+    def score(self, item: str, now: float | None = None) -> float:
+        """
+        Returns the current frecency of the item
+
+        Args:
+            item (str): file or tag
+            now (float | None, optional): time. Defaults to current time.
+
+        Returns:
+            float: frecency, 0 for unknown items
+        """
+        key = self.keys.get(item)
+        if key is None:
+            return 0.0
+        if now is None:
+            now = time.time()
+        return 2**(key - now / self.half_life)
+
+    def top(self, n: int) -> list[str]:
+        """
+        Returns the most frecent items
+
+        Args:
+            n (int): number of items
+
+        Returns:
+            list[str]: items, the most frecent first
+        """
+        return heapq.nlargest(n, self.keys, key=self.keys.get)
+
+
 class HintIndex:
     """
     Hint index for the target vault
     """
 
-    def __init__(self, ngram_order: int, max_ngrams: int,
-                 max_ratio_in_ngram: float):
+    def __init__(self,
+                 ngram_order: int,
+                 max_ngrams: int,
+                 max_ratio_in_ngram: float,
+                 frecency_half_life: float = 14 * 24 * 3600,
+                 frecency_max_items: int = 1000,
+                 save_path: Path | None = None,
+                 cache_size: int = 64,
+                 vault: str | None = None):
         """index constructor
 
         Args:
@@ -136,6 +878,14 @@ class HintIndex:
             max_ngrams (int): if number of ngrams is larger, will prune index
             max_ratio_in_ngram (float): removes too frequent ngrams, if they're 
             shared across max_ratio_in_ngram*100% of all the string in the index
+            frecency_half_life (float, optional): half-life of the user actions in seconds.
+                Defaults to 2 weeks.
+            frecency_max_items (int, optional): max files and tags in the frecency model of one user.
+                Defaults to 1000.
+            save_path (Path | None, optional): path to save frecency models. Defaults to None.
+            cache_size (int, optional): max hint requests to cache per user. Defaults to 64.
+            vault (str | None, optional): vault name. If set, the frecency models are saved
+                encrypted with the vault obfuscation key, as the text index. Defaults to None.
         """
         self.default_files_per_user: dict[str | None, deque[str]] = {}
         # most recent files that are shown to user
@@ -145,15 +895,33 @@ class HintIndex:
         # most popular tags for userf
 
         # indicies for autocomplete
-        self.string_file_index = NaiveStringIndex(ngram_order, max_ngrams,
+        self.string_file_index = ArrayStringIndex(ngram_order, max_ngrams,
                                                   max_ratio_in_ngram)
 
-        self.string_all_file_index = NaiveStringIndex(ngram_order, max_ngrams,
-                                                      max_ratio_in_ngram)
+        self.string_all_file_index = ArrayStringIndex(
+            ngram_order, max_ngrams, max_ratio_in_ngram)
 
-        self.string_tag_index = NaiveStringIndex(ngram_order, max_ngrams,
+        self.string_tag_index = ArrayStringIndex(ngram_order, max_ngrams,
                                                  max_ratio_in_ngram)
 
+        # prefix indices for autocomplete, ranked by graph centrality
+        self.file_prefix_index = PrefixIndex()
+        self.tag_prefix_index = PrefixIndex()
+
+        self.frecency_half_life = frecency_half_life
+        self.frecency_max_items = frecency_max_items
+        self.file_frecency: dict[str | None, FrecencyModel] = {}
+        self.tag_frecency: dict[str | None, FrecencyModel] = {}
+        # None is a model for all users
+        self.save_path = save_path
+        self.vault = vault
+        self.last_save_time = time.time()
+        self.dirty = False
+        self.cache_size = cache_size
+        self.sessions: dict[str | None, HintSession] = {}
+        self.default_versions: dict[str | None, int] = {}
+        # user -> version of default_files_per_user, increased each time they are changed
+
     def populate_default_files(self, user: str | None, files: list[str]):
         """
         Initializes the list of default_files_per_user
@@ -164,19 +932,264 @@ class HintIndex:
         """
         with _lock:
             self.default_files_per_user[user] = deque(files, MAX_HINT)
+            self.default_versions[user] = self.default_versions.get(user,
+                                                                    0) + 1
 
-    def update_file(self, fname: str, user: str | None = None):
+    def update_files(self, delta: FileIndexDelta):
         """
-        Updates a file in the default_files_per_user
+        Passes the added and removed files to the string indices of the files,
+        see ArrayStringIndex.apply_delta. If an index missed the previous changes,
+        it is updated with all the files by the file index and the graph
 
         Args:
-            fname (str): file name to add
+            delta (FileIndexDelta): changes from the file index
         """
+        if not delta.added and not delta.removed:
+            return
+        index = AppState.indices[self.vault]
+        name_to_path = index.get_name_to_path()
+        dir_names = {d.name for d in index.get_dirs()}
+        generation = index.names_generation
+        for string_index, md_only in [(self.string_all_file_index, False),
+                                      (self.string_file_index, True)]:
+            changes = []
+            for paths in [delta.added, delta.removed]:
+                paths = [
+                    p for p in paths if not md_only or p.suffix == '.md'
+                ]
+                changes.append({str(p.relative_to(index.path))
+                                for p in paths} | {p.name
+                                                   for p in paths})
+            added, removed = changes
+            # the name is kept while other files have it
+            removed = {
+                s
+                for s in removed if s not in name_to_path and (
+                    md_only or s not in dir_names)
+            }
+            string_index.apply_delta(added, removed, generation,
+                                     generation - 1)
+
+    def get_session(self, user: str | None) -> HintSession:
+        """
+        Returns the hint session of the user
+
+        Args:
+            user (str | None): user
+
+        Returns:
+            HintSession: session
+        """
+        with _lock:
+            if user not in self.sessions:
+                self.sessions[user] = HintSession(self.cache_size)
+            return self.sessions[user]
+
+    @staticmethod
+    def _model_state(models: dict[str | None, FrecencyModel],
+                     user: str | None) -> tuple | None:
+        """
+        Returns the state of the frecency model used for the user
+        """
+        owner = user if user in models else None
+        model = models.get(owner)
+        if model is None:
+            return None
+        return owner, model.version
+
+    def get_state(self, user: str | None) -> tuple:
+        """
+        Returns the state of the data used in the hints of the user.
+        If it was changed, the cached hints are outdated.
+        Actions of the other users change it only if the user has no frecency model yet
+
+        Args:
+            user (str | None): user
+
+        Returns:
+            tuple: state
+        """
+        with _lock:
+            user_state = (self._model_state(self.file_frecency, user),
+                          self._model_state(self.tag_frecency, user),
+                          self.default_versions.get(user, 0))
+        return (user_state, self.string_file_index.version,
+                self.string_all_file_index.version,
+                self.string_tag_index.version, self.file_prefix_index.version,
+                self.tag_prefix_index.version, tuple(self.default_tags))
+
+    def _record(self, models: dict[str | None, FrecencyModel], item: str,
+                user: str | None, event: str, now: float):
+        """
+        Updates frecency models of the user and of all users. Must be called under the lock
+
+        Args:
+            models (dict[str | None, FrecencyModel]): file or tag models
+            item (str): file or tag
+            user (str | None): user
+            event (str): action, key of FRECENCY_WEIGHTS
+            now (float): time of the action
+        """
+        weight = FRECENCY_WEIGHTS[event]
+        for u in {None, user}:
+            if u not in models:
+                models[u] = FrecencyModel(self.frecency_half_life,
+                                          self.frecency_max_items)
+            models[u].update(item, weight, now)
+        self.dirty = True
+
+    def update_file(self,
+                    fname: str,
+                    user: str | None = None,
+                    event: str = 'edit'):
+        """
+        Updates a file in the default_files_per_user and in the frecency models
+
+        Args:
+            fname (str): file name to add, w.r.t. vault
+            user (str | None, optional): user. Defaults to None.
+            event (str, optional): action with the file: "open", "edit" or "link". Defaults to "edit".
+        """
+        now = time.time()
+        with _lock:
+            for item in {fname, fname.split('/')[-1]}:
+                # both forms are used in the hints
+                self._record(self.file_frecency, item, user, event, now)
+            for u in {None, user}:
+                if fname in set(self.default_files_per_user[u]):
+                    self.default_files_per_user[u].remove(fname)
+                self.default_files_per_user[u].appendleft(fname)
+                self.default_versions[u] = self.default_versions.get(u, 0) + 1
+        self.save(force=False)
+
+    def update_tag(self, tag: str, user: str | None = None, event: str = 'link'):
+        """
+        Updates a tag in the frecency models
+
+        Args:
+            tag (str): tag without "#"
+            user (str | None, optional): user. Defaults to None.
+            event (str, optional): action with the tag. Defaults to "link".
+        """
+        with _lock:
+            self._record(self.tag_frecency, tag, user, event, time.time())
+        self.save(force=False)
+
+    def get_file_frecency(self, user: str | None) -> FrecencyModel | None:
+        """
+        Returns the file frecency model of the user, or of all users if the user has no actions yet
+
+        Args:
+            user (str | None): user
+
+        Returns:
+            FrecencyModel | None: model or None if there were no actions at all
+        """
+        return self.file_frecency.get(user, self.file_frecency.get(None))
+
+    def get_tag_frecency(self, user: str | None) -> FrecencyModel | None:
+        """
+        Returns the tag frecency model of the user, or of all users if the user has no actions yet
+
+        Args:
+            user (str | None): user
+
+        Returns:
+            FrecencyModel | None: model or None if there were no actions at all
+        """
+        return self.tag_frecency.get(user, self.tag_frecency.get(None))
+
+    def save(self, force: bool = True):
+        """
+        Saves the frecency models if they were changed
+
+        Args:
+            force (bool, optional): if not set, will save only if FRECENCY_SAVE_TIME
+                passed since the last save. Defaults to True.
+        """
+        if self.save_path is None or not self.dirty:
+            return
+        if not force and time.time() - self.last_save_time < FRECENCY_SAVE_TIME:
+            return
         with _lock:
-            if fname in set(self.default_files_per_user[None]):
-                self.default_files_per_user[None].remove(fname)
-            self.default_files_per_user[None].appendleft(fname)
-            if user is not None:
-                if fname in set(self.default_files_per_user[user]):
-                    self.default_files_per_user[user].remove(fname)
-                self.default_files_per_user[user].appendleft(fname)
+            data = [{
+                'user': user,
+                'kind': kind,
+                'keys': model.keys
+            } for kind, models in [('files', self.file_frecency),
+                                   ('tags', self.tag_frecency)]
+                    for user, model in models.items()]
+            content = json.dumps(data)
+            self.dirty = False
+            self.last_save_time = time.time()
+        try:
+            tmp_path = self.save_path.with_suffix('.tmp')
+            if self.vault is None:
+                tmp_path.write_text(content)
+            else:
+                # the note names must not leak from the obfuscated vaults
+                with obf_open(tmp_path,
+                              self.vault,
+                              'w',
+                              obfuscation_mode='obfuscate') as out:
+                    out.write(content)
+            tmp_path.replace(self.save_path)
+        except Exception as e:
+            logger.error(f'could not save frecency: {get_traceback(e)}')
+
+    def load(self):
+        """
+        Loads the frecency models saved by previous runs
+        """
+        if self.save_path is None or not self.save_path.exists():
+            return
+        try:
+            if self.vault is None:
+                content = self.save_path.read_text()
+            else:
+                with obf_open(self.save_path,
+                              self.vault,
+                              'r',
+                              obfuscation_mode='obfuscate') as inp:
+                    content = inp.read()
+            data = json.loads(content)
+            with _lock:
+                for record in data:
+                    models = self.file_frecency if record[
+                        'kind'] == 'files' else self.tag_frecency
+                    model = FrecencyModel(self.frecency_half_life,
+                                          self.frecency_max_items)
+                    keys = sorted(record['keys'].items(), key=lambda x: x[1])
+                    model.keys = dict(keys[-self.frecency_max_items:])
+                    model.heap = [(k, i) for i, k in model.keys.items()]
+                    heapq.heapify(model.heap)
+                    models[record['user']] = model
+        except Exception as e:
+            logger.error(f'could not load frecency from {self.save_path}: {e}')
+
+
+def init_hint_index(vault: str) -> HintIndex:
+    """
+    Creates a hint index for the vault and loads the frecency models
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        HintIndex: hint index
+    """
+    cfg = AppState.config.vaults[vault]
+    save_path = None
+    if AppState.config.service_dir is not None:
+        save_path = resolve_service_path(f'frecency_{vault}.json')
+    index = HintIndex(cfg.autocomplete_ngram_order,
+                      cfg.autocomplete_max_ngrams,
+                      cfg.autocomplete_max_ratio_in_key,
+                      cfg.autocomplete_frecency_half_life_days * 24 * 3600,
+                      cfg.autocomplete_frecency_max_items, save_path,
+                      cfg.autocomplete_cache_size, vault)
+    index.load()
+    AppState.hints[vault] = index
+    AppState.indices[vault].add_listener(index.update_files)
+    atexit.register(index.save)
+    return index
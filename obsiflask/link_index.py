@@ -0,0 +1,270 @@
+"""
+Reverse link index: for each link name, the notes that contain a wikilink with this name.
+
+The index stores unresolved names (the last part of the link without anchor and ".md"),
+so it does not depend on how the links are resolved and can be updated note by note.
+The found notes are then checked with FileIndex.resolve_wikilink.
+
+The index is used to rewrite backlinks when files are moved or renamed.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+
+from obsiflask.app_state import AppState
+from obsiflask.consts import wikilink
+from obsiflask.encrypt.obfuscate import obf_write_atomic
+from obsiflask.file_index import FileIndex, FileIndexDelta
+from obsiflask.utils import logger
+
+
+def get_link_key(name: str) -> str:
+    """
+    Returns the key of the link name in the index
+
+    Args:
+        name (str): link name or file name, e.g. "folder/note.md#header"
+
+    Returns:
+        str: key, e.g. "note"
+    """
+    name = name.split('#', 1)[0].strip().rsplit('/', 1)[-1].lower()
+    if name.endswith('.md'):
+        name = name[:-len('.md')]
+    return name
+
+
+class LinkIndex:
+    """
+    Reverse index of wikilinks for one vault
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.lock = Lock()
+        self.links: dict[Path, set[str]] = {}
+        # real path of note -> link keys
+        self.backlinks: dict[str, set[Path]] = {}
+        # link key -> real paths of notes
+        self.dirty: set[Path] = set()
+        self.initialized = False
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Marks changed notes for parsing
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.removed:
+                self._drop(path)
+                self.dirty.discard(path)
+            for path in delta.added | delta.modified:
+                if path.suffix == '.md':
+                    self.dirty.add(path)
+
+    def _drop(self, path: Path):
+        """
+        Removes the links of the note. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+        """
+        for key in self.links.pop(path, set()):
+            sources = self.backlinks.get(key)
+            if sources is not None:
+                sources.discard(path)
+                if not sources:
+                    del self.backlinks[key]
+
+    def _parse(self, path: Path):
+        """
+        Parses links of the note. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+        """
+        self._drop(path)
+        text = AppState.text_indices[self.vault].get_text(path)
+        if text is None:
+            return
+        keys = {get_link_key(m.group(1)) for m in wikilink.finditer(text)}
+        self.links[path] = keys
+        for key in keys:
+            self.backlinks.setdefault(key, set()).add(path)
+
+    def _prepare(self):
+        """
+        Parses the changed notes
+        """
+        with self.lock:
+            if not self.initialized:
+                self.dirty |= set(AppState.text_indices[self.vault].get_paths())
+                self.initialized = True
+            for path in list(self.dirty):
+                self._parse(path)
+            self.dirty.clear()
+
+    def get_sources(self, path: Path) -> set[Path]:
+        """
+        Returns notes that may link to the file: the link names match the file name,
+        but the links are not resolved
+
+        Args:
+            path (Path): real path of the file
+
+        Returns:
+            set[Path]: real paths of the notes
+        """
+        # the file index can call update(), so it is used before taking the lock
+        AppState.indices[self.vault].check_refresh()
+        self._prepare()
+        with self.lock:
+            return set(self.backlinks.get(get_link_key(path.name), set()))
+
+
+@dataclass
+class LinkRewrite:
+    """
+    Planned rewrite of the links in one note
+    """
+    real_path: Path
+    """
+    Full path of the note before the move
+    """
+    signature: tuple[int, int]
+    """
+    Signature of the note at planning time
+    """
+    text: str
+    """
+    Content of the note at planning time
+    """
+    links: list[tuple[int, int, Path, bool]] = field(default_factory=list)
+    """
+    Links to rewrite: span of the link name (without anchor and alias),
+    new real path of the target, and a flag if the name had ".md" extension
+    """
+
+
+def plan_backlink_rewrites(vault: str,
+                           moves: dict[Path, Path]) -> list[LinkRewrite]:
+    """
+    Finds the links to the moved files. Must be called before moving,
+    while the links are still resolved to the old paths.
+
+    Args:
+        vault (str): vault name
+        moves (dict[Path, Path]): old real path -> new real path for each moved file
+
+    Returns:
+        list[LinkRewrite]: rewrites for each note with backlinks
+    """
+    index: FileIndex = AppState.indices[vault]
+    link_index: LinkIndex = AppState.link_indices[vault]
+    text_index = AppState.text_indices[vault]
+    moved_by_rel = {
+        str(old.relative_to(index.path)): new
+        for old, new in moves.items()
+    }
+    sources = set()
+    for old in moves:
+        sources |= link_index.get_sources(old)
+    rewrites = []
+    for source in sorted(sources):
+        signature = FileIndex._get_signature(source)
+        text = text_index.get_text(source)
+        if text is None:
+            continue
+        rewrite = LinkRewrite(source, signature, text)
+        for m in wikilink.finditer(text):
+            name = m.group(1).split('#', 1)[0]
+            stripped = name.strip()
+            if not stripped or stripped.startswith(('http://', 'https://')):
+                continue
+            resolved = index.resolve_wikilink(stripped,
+                                              source,
+                                              True,
+                                              escape=False,
+                                              relative=False)
+            if resolved is None or resolved not in moved_by_rel:
+                continue
+            start = m.start(1) + (len(name) - len(name.lstrip()))
+            rewrite.links.append((start, start + len(stripped),
+                                  moved_by_rel[resolved],
+                                  stripped.endswith('.md')))
+        if rewrite.links:
+            rewrites.append(rewrite)
+    return rewrites
+
+
+def apply_backlink_rewrites(vault: str, rewrites: list[LinkRewrite],
+                            moves: dict[Path, Path]) -> list[Path]:
+    """
+    Rewrites the links to the new paths of the moved files.
+    Must be called after moving and refreshing the file index.
+    A link gets the short name of the target if it is unique in the vault,
+    otherwise the path w.r.t. vault. Anchors and aliases are kept.
+
+    Args:
+        vault (str): vault name
+        rewrites (list[LinkRewrite]): rewrites from plan_backlink_rewrites
+        moves (dict[Path, Path]): old real path -> new real path for each moved file
+
+    Returns:
+        list[Path]: new real paths of the changed notes
+    """
+    index: FileIndex = AppState.indices[vault]
+    name_to_path = index.get_name_to_path()
+    changed = []
+    for rewrite in rewrites:
+        path = moves.get(rewrite.real_path, rewrite.real_path)
+        if FileIndex._get_signature(path) != rewrite.signature:
+            logger.warning(
+                f'{path} was modified during the move, links are not updated')
+            continue
+        buf = []
+        offset = 0
+        for start, end, target, with_ext in rewrite.links:
+            if len(name_to_path.get(target.name, set())) == 1:
+                new_name = target.name
+            else:
+                new_name = str(target.relative_to(index.path))
+            if not with_ext and new_name.endswith('.md'):
+                new_name = new_name[:-len('.md')]
+            buf.append(rewrite.text[offset:start])
+            buf.append(new_name)
+            offset = end
+        buf.append(rewrite.text[offset:])
+        new_text = ''.join(buf)
+        if new_text == rewrite.text:
+            continue
+        try:
+            obf_write_atomic(path, vault, new_text)
+            changed.append(path)
+        except Exception as e:
+            logger.error(f'could not update links in {path}: {e}')
+    return changed
+
+
+def init_link_index(vault: str) -> LinkIndex:
+    """
+    Creates a link index for the vault and subscribes it for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        LinkIndex: link index
+    """
+    index = LinkIndex(vault)
+    AppState.link_indices[vault] = index
+    AppState.indices[vault].add_listener(index.update)
+    return index
@@ -24,12 +24,25 @@ from obsiflask.pages.messages import render_messages
 from obsiflask.pages.excalidraw import render_excalidraw
 from obsiflask.pages.folder import render_folder
 from obsiflask.pages.fileop import render_fileop, render_fastop
-from obsiflask.pages.base import render_base_view
+from obsiflask.pages.base import render_base_rows, render_base_view
 from obsiflask.graph import Graph
 from obsiflask.pages.graph import render_graph
 from obsiflask.pages.search import render_search
+from obsiflask.pages.stats import render_stats
+from obsiflask.pages.mentions import render_mentions
+from obsiflask.pages.replace import render_replace
 from obsiflask.pages.hint import get_hint
-from obsiflask.hint import HintIndex
+from obsiflask.hint import init_hint_index
+from obsiflask.search_cache import SearchCache
+from obsiflask.text_index import init_text_index
+from obsiflask.mentions import init_mention_index
+from obsiflask.link_index import init_link_index
+from obsiflask.outline_index import init_outline_index
+from obsiflask.property_index import init_property_index
+from obsiflask.bases.metadata_table import init_metadata_table
+from obsiflask.bases.cache import init_base_cache
+from obsiflask.bases.materialized import init_materialized_views
+from obsiflask.bases.formula_cache import init_formula_cache
 from obsiflask.auth import add_auth_to_app, check_rights
 from obsiflask.pages.auth import render_login, render_logout
 from obsiflask.pages.root import render_root
@@ -89,7 +102,18 @@ def logic_init(cfg: AppConfig):
         AppState.indices[vault] = FileIndex(cfg.vaults[vault].full_path,
                                             cfg.vaults[vault].template_dir,
                                             vault)
+        init_text_index(vault)
+        init_mention_index(vault)
+        init_link_index(vault)
+        init_outline_index(vault)
+        init_property_index(vault)
+        init_metadata_table(vault)
+        init_base_cache(vault)
+        init_formula_cache(vault)
+        init_materialized_views(vault)
         AppState.graphs[vault] = Graph(vault)
+        AppState.search_caches[vault] = SearchCache(
+            int(vaultcfg.search_cache_size_mb * 1024 * 1024))
         AppState.users_per_vault[vault] = set()
         # spellcheck config check
         if vaultcfg.spellcheck is not None and vaultcfg.spellcheck != 'default':
@@ -99,12 +123,7 @@ def logic_init(cfg: AppConfig):
                     (vaultcfg.spellcheck + '.aff')).exists()
 
     for vault in cfg.vaults:
-
-        AppState.hints[vault] = HintIndex(
-            vaultcfg.autocomplete_ngram_order,
-            vaultcfg.autocomplete_max_ngrams,
-            vaultcfg.autocomplete_max_ratio_in_key)
-
+        init_hint_index(vault)
         AppState.graphs[vault].build(dry=True, populate_hint_files=True)
     AppState.vault_alias = {}
     for vault in cfg.vaults:
@@ -241,6 +260,16 @@ def run(cfg: AppConfig | None = None,
             return real_path
         return render_base_view(vault, subpath, real_path)
 
+    @app.route('/base_rows/<vault>/<path:subpath>')
+    def base_rows(vault, subpath):
+        auth_check_resut = check_rights(vault)
+        if auth_check_resut:
+            return auth_check_resut
+        real_path = resolve_path(vault, subpath)
+        if isinstance(real_path, tuple):
+            return real_path
+        return render_base_rows(vault, subpath, real_path)
+
     @app.route('/renderer/<vault>')
     def renderer_root(vault):
         auth_check_resut = check_rights(vault)
@@ -287,7 +316,7 @@ def run(cfg: AppConfig | None = None,
             return auth_check_resut
         data = request.get_json()
         context = data.get('context')
-        return get_hint(vault, context)
+        return get_hint(vault, context, bool(data.get('frontmatter', False)))
 
     @app.route('/file/<vault>/<path:subpath>')
     def get_file(vault, subpath):
@@ -369,6 +398,36 @@ def run(cfg: AppConfig | None = None,
             return auth_check_resut
         return render_search(vault)
 
+    @app.route('/stats/<vault>')
+    def stats(vault):
+        auth_check_resut = check_rights(vault)
+        if auth_check_resut:
+            return auth_check_resut
+        vault_resolution_result = check_vault(vault)
+        if vault_resolution_result:
+            return vault_resolution_result
+        return render_stats(vault)
+
+    @app.route('/mentions/<vault>')
+    def mentions(vault):
+        auth_check_resut = check_rights(vault)
+        if auth_check_resut:
+            return auth_check_resut
+        vault_resolution_result = check_vault(vault)
+        if vault_resolution_result:
+            return vault_resolution_result
+        return render_mentions(vault)
+
+    @app.route('/replace/<vault>', methods=['GET', 'POST'])
+    def replace(vault):
+        auth_check_resut = check_rights(vault)
+        if auth_check_resut:
+            return auth_check_resut
+        vault_resolution_result = check_vault(vault)
+        if vault_resolution_result:
+            return vault_resolution_result
+        return render_replace(vault)
+
     @app.route('/bookmarks/<vault>', methods=['GET', 'POST'])
     def bookmarks(vault):
         auth_check_resut = check_rights(vault)
@@ -0,0 +1,339 @@
+"""
+Unlinked mentions: places where a note title appears in the text of another note
+without a wikilink.
+
+All the note titles are put into a single Aho–Corasick automaton,
+so each note is scanned once, independently of the number of titles.
+The automaton is rebuilt when notes are added or removed,
+changed notes are rescanned lazily on the next request.
+"""
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+
+from obsiflask.app_state import AppState
+from obsiflask.consts import wikilink
+from obsiflask.file_index import FileIndexDelta
+from obsiflask.utils import lower_text
+
+MIN_TITLE_LENGTH = 3
+"""
+Shorter titles are not searched: they produce too many false mentions
+"""
+re_md_link = re.compile(r'!?\[[^\]\n]*\]\([^)\n]*\)')
+"""
+Regex for markdown links
+"""
+
+
+@dataclass
+class Mention:
+    """
+    Unlinked mention of a note
+    """
+    title: str
+    """
+    Mentioned title as written in the text
+    """
+    target: str
+    """
+    Path of the mentioned note w.r.t. vault
+    """
+    start: int
+    """
+    Start offset in the note content
+    """
+    end: int
+    """
+    End offset in the note content
+    """
+    line: int
+    """
+    Line number, starting from 1
+    """
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick automaton for case-insensitive search of multiple patterns
+    """
+
+    def __init__(self, patterns: list[str]):
+        """
+        Constructor
+
+        Args:
+            patterns (list[str]): patterns to search
+        """
+        self.patterns = [p.lower() for p in patterns]
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list[int]] = [[]]
+        for p_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(p_id)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+                self.output[next_state] = self.output[next_state] + self.output[
+                    self.fail[next_state]]
+
+    def find(self, text: str) -> list[tuple[int, int, int]]:
+        """
+        Finds all occurrences of the patterns
+
+        Args:
+            text (str): text
+
+        Returns:
+            list[tuple[int, int, int]]: pattern ids, start and end offsets in the original text
+        """
+        result = []
+        state = 0
+        goto = self.goto
+        fail = self.fail
+        text, origin = lower_text(text)
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for p_id in self.output[state]:
+                start, end = pos + 1 - len(self.patterns[p_id]), pos + 1
+                if origin is not None:
+                    if (start and origin[start] == origin[start - 1]
+                        ) or origin[end] == origin[pos]:
+                        # the match splits a lowercased character
+                        continue
+                    start, end = origin[start], origin[end]
+                result.append((p_id, start, end))
+        return result
+
+
+class MentionIndex:
+    """
+    Unlinked mentions of the vault notes
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.lock = Lock()
+        self.names_generation = -1
+        self.automaton: AhoCorasick | None = None
+        self.titles: list[str] = []
+        self.title_paths: dict[str, list[Path]] = {}
+        # lowercased title -> real paths of the notes
+        self.mentions: dict[Path, list[Mention]] = {}
+        self.counts: Counter[str] = Counter()
+        # target w.r.t. vault -> number of unlinked mentions
+        self.dirty: set[Path] = set()
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Marks changed notes for rescanning
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.removed:
+                self._drop(path)
+                self.dirty.discard(path)
+            for path in delta.added | delta.modified:
+                if path.suffix == '.md':
+                    self.dirty.add(path)
+
+    def _drop(self, path: Path):
+        """
+        Removes mentions of the note from the counters. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+        """
+        for mention in self.mentions.pop(path, []):
+            self.counts[mention.target] -= 1
+            if self.counts[mention.target] <= 0:
+                del self.counts[mention.target]
+
+    def _rebuild(self, name_to_path: dict[str, set[Path]]):
+        """
+        Rebuilds the automaton over all the note titles and marks all the notes for rescanning.
+        Must be called under the lock
+
+        Args:
+            name_to_path (dict[str, set[Path]]): local file name -> folders, from the file index
+        """
+        self.title_paths = {}
+        for name, folders in name_to_path.items():
+            if not name.endswith('.md'):
+                continue
+            title = name[:-len('.md')]
+            if len(title.strip()) < MIN_TITLE_LENGTH:
+                continue
+            self.title_paths.setdefault(title.lower(), []).extend(
+                folder / name for folder in folders)
+        for paths in self.title_paths.values():
+            paths.sort()
+        self.titles = sorted(self.title_paths)
+        self.automaton = AhoCorasick(self.titles)
+        self.dirty |= set(AppState.text_indices[self.vault].get_paths())
+        self.dirty |= set(self.mentions)
+
+    def _resolve(self, title: str, path: Path) -> Path:
+        """
+        Resolves the title like a wikilink: the note in the same folder first
+
+        Args:
+            title (str): lowercased title
+            path (Path): real path of the mentioning note
+
+        Returns:
+            Path: real path of the mentioned note
+        """
+        candidates = self.title_paths[title]
+        for candidate in candidates:
+            if candidate.parent == path.parent:
+                return candidate
+        return candidates[0]
+
+    def _scan(self, path: Path):
+        """
+        Finds unlinked mentions in the note. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+        """
+        self._drop(path)
+        text = AppState.text_indices[self.vault].get_text(path)
+        if text is None or self.automaton is None:
+            return
+        vault_path = AppState.indices[self.vault].path
+        linked = [
+            m.span() for regex in [wikilink, re_md_link]
+            for m in regex.finditer(text)
+        ]
+        found = sorted(self.automaton.find(text),
+                       key=lambda f: (f[1], -(f[2] - f[1])))
+        mentions = []
+        last_end = 0
+        line = 1
+        line_pos = 0
+        for p_id, start, end in found:
+            if start < last_end:
+                # overlaps a longer title found before
+                continue
+            if start > 0 and (text[start - 1].isalnum()
+                              or text[start - 1] == '_'):
+                continue
+            if end < len(text) and (text[end].isalnum() or text[end] == '_'):
+                continue
+            if any(l_start < end and start < l_end
+                   for l_start, l_end in linked):
+                continue
+            target = self._resolve(self.titles[p_id], path)
+            if target == path:
+                continue
+            line += text.count('\n', line_pos, start)
+            line_pos = start
+            mentions.append(
+                Mention(text[start:end], str(target.relative_to(vault_path)),
+                        start, end, line))
+            last_end = end
+        if mentions:
+            self.mentions[path] = mentions
+            for mention in mentions:
+                self.counts[mention.target] += 1
+
+    def _prepare(self, paths: set[Path] | None = None):
+        """
+        Brings the index up to date
+
+        Args:
+            paths (set[Path] | None, optional): if set, rescans only these notes,
+                otherwise all the changed notes. Defaults to None.
+        """
+        index = AppState.indices[self.vault]
+        # file index can call update(), so it is used before taking the lock
+        name_to_path = index.get_name_to_path()
+        names_generation = index.names_generation
+        with self.lock:
+            if names_generation != self.names_generation:
+                self._rebuild(name_to_path)
+                self.names_generation = names_generation
+            to_scan = self.dirty if paths is None else self.dirty & paths
+            for path in list(to_scan):
+                self._scan(path)
+                self.dirty.discard(path)
+
+    def get_note_mentions(self, path: Path | str) -> list[Mention]:
+        """
+        Returns unlinked mentions in the note
+
+        Args:
+            path (Path | str): real path of the note
+
+        Returns:
+            list[Mention]: mentions ordered by offset
+        """
+        path = Path(path)
+        self._prepare({path})
+        with self.lock:
+            return list(self.mentions.get(path, []))
+
+    def get_report(self) -> tuple[list[tuple[str, int]], dict[str, list[Mention]]]:
+        """
+        Returns unlinked mentions of the whole vault
+
+        Returns:
+            tuple[list[tuple[str, int]], dict[str, list[Mention]]]:
+                mentioned notes with the number of mentions, most mentioned first,
+                and mentions for each note w.r.t. vault
+        """
+        self._prepare()
+        vault_path = AppState.indices[self.vault].path
+        with self.lock:
+            counts = sorted(self.counts.items(), key=lambda c: (-c[1], c[0]))
+            mentions = {
+                str(p.relative_to(vault_path)): list(m)
+                for p, m in sorted(self.mentions.items())
+            }
+        return counts, mentions
+
+
+def init_mention_index(vault: str) -> MentionIndex:
+    """
+    Creates a mention index for the vault and subscribes it for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        MentionIndex: mention index
+    """
+    index = MentionIndex(vault)
+    AppState.mention_indices[vault] = index
+    AppState.indices[vault].add_listener(index.update)
+    return index
@@ -0,0 +1,257 @@
+"""
+Outline index: headings and block ids (`^block-id`) of the notes.
+
+The outline of a note is parsed on the first request and is kept until the note is changed.
+It is used for "[[note#heading" autocomplete.
+
+The link anchors are validated against the outline: the headings are rendered
+with the renderer (see obsiflask.pages.renderer.render_heading), so the anchors
+match the heading ids of the page, including inline markup. The ids are kept until the note is changed
+"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+
+from obsiflask.app_state import AppState
+from obsiflask.file_index import FileIndexDelta
+from obsiflask.pages.renderer import heading_slug, render_heading
+
+re_heading = re.compile(r'^(#{1,6})[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$')
+"""
+Regex for ATX headings
+"""
+re_setext = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+"""
+Regex for the underline of setext headings
+"""
+re_block_id = re.compile(r'(?:^|\s)\^([\w-]+)[ \t]*$')
+"""
+Regex for block ids at the end of the line
+"""
+re_fence = re.compile(r'^\s*(```|~~~)')
+"""
+Regex for code fences
+"""
+re_list = re.compile(r'^\s*(?:[-*+>]|\d+[.)])(?:\s|$)')
+"""
+Regex for list items and quotes, they are not underlined as setext headings
+"""
+
+
+@dataclass
+class OutlineEntry:
+    """
+    Heading or block of the note
+    """
+    anchor: str
+    """
+    Text of the heading or block id with "^", as it is used in the links
+    """
+    level: int
+    """
+    Heading level, 0 for blocks
+    """
+    line: int
+    """
+    Line number, starting from 1
+    """
+
+
+def parse_outline(text: str) -> list[OutlineEntry]:
+    """
+    Extracts headings and block ids, ignoring frontmatter and code blocks
+
+    Args:
+        text (str): note content
+
+    Returns:
+        list[OutlineEntry]: entries in the order of the note
+    """
+    result = []
+    lines = text.split('\n')
+    start = 0
+    if lines and lines[0].strip() == '---':
+        for line_id in range(1, len(lines)):
+            if lines[line_id].strip() == '---':
+                start = line_id + 1
+                break
+    fence = None
+    paragraph = None
+    # first line of the current paragraph, "===" or "---" under it makes it a heading
+    for line_id in range(start, len(lines)):
+        line = lines[line_id]
+        found = re_fence.match(line)
+        if found:
+            paragraph = None
+            if fence is None:
+                fence = found.group(1)
+            elif fence == found.group(1):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        found = re_setext.match(line)
+        if found and paragraph is not None:
+            text = ' '.join(part.strip() for part in lines[paragraph:line_id])
+            while result and result[-1].line > paragraph:
+                # the block ids are a part of the heading
+                result.pop()
+            result.append(
+                OutlineEntry(text, 1 if found.group(1)[0] == '=' else 2,
+                             paragraph + 1))
+            paragraph = None
+            continue
+        found = re_heading.match(line)
+        if found:
+            paragraph = None
+            result.append(
+                OutlineEntry(found.group(2).strip(), len(found.group(1)),
+                             line_id + 1))
+            continue
+        if not line.strip() or re_list.match(line):
+            paragraph = None
+        elif paragraph is None:
+            paragraph = line_id
+        found = re_block_id.search(line)
+        if found:
+            result.append(OutlineEntry('^' + found.group(1), 0, line_id + 1))
+    return result
+
+
+def match_outline(entries: list[OutlineEntry], query: str,
+                  limit: int) -> list[OutlineEntry]:
+    """
+    Finds the entries for autocomplete: prefix matches first,
+    then substring matches, then fuzzy (subsequence) matches. The search is case-insensitive
+
+    Args:
+        entries (list[OutlineEntry]): outline of the note
+        query (str): entered part of the anchor
+        limit (int): max entries to return
+
+    Returns:
+        list[OutlineEntry]: found entries
+    """
+    query = query.lower()
+    prefix, substring, fuzzy = [], [], []
+    for entry in entries:
+        anchor = entry.anchor.lower()
+        if anchor.startswith(query):
+            prefix.append(entry)
+        elif query in anchor:
+            substring.append(entry)
+        else:
+            pos = 0
+            for char in query:
+                pos = anchor.find(char, pos) + 1
+                if pos == 0:
+                    break
+            else:
+                fuzzy.append(entry)
+    return (prefix + substring + fuzzy)[:limit]
+
+
+class OutlineIndex:
+    """
+    Outlines of the vault notes
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.lock = Lock()
+        self.outlines: dict[Path, list[OutlineEntry]] = {}
+        # real path -> outline
+        self.anchors: dict[Path, set[str]] = {}
+        # real path -> heading ids and block ids
+        self.dirty: set[Path] = set()
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Marks changed notes for parsing
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.removed:
+                self.outlines.pop(path, None)
+                self.anchors.pop(path, None)
+                self.dirty.discard(path)
+            for path in delta.modified:
+                if path in self.outlines:
+                    self.dirty.add(path)
+
+    def get_outline(self, path: Path) -> list[OutlineEntry]:
+        """
+        Returns the outline of the note
+
+        Args:
+            path (Path): real path of the note
+
+        Returns:
+            list[OutlineEntry]: headings and blocks
+        """
+        # the file index can call update(), so it is used before taking the lock
+        AppState.indices[self.vault].check_refresh()
+        with self.lock:
+            if path not in self.outlines or path in self.dirty:
+                self.dirty.discard(path)
+                self.anchors.pop(path, None)
+                text = None
+                if path.suffix == '.md':
+                    text = AppState.text_indices[self.vault].get_text(path)
+                self.outlines[path] = parse_outline(text) if text else []
+            return self.outlines[path]
+
+    def has_anchor(self, path: Path, anchor: str) -> bool:
+        """
+        Checks if the link anchor points to a heading or a block of the note.
+        Headings are compared by their ids on the rendered page
+
+        Args:
+            path (Path): real path of the note
+            anchor (str): heading text or block id with "^"
+
+        Returns:
+            bool: True if found
+        """
+        outline = self.get_outline(path)
+        with self.lock:
+            anchors = self.anchors.get(path)
+        if anchors is None:
+            # rendering resolves the links in the headings, so it is done without the lock
+            index = AppState.indices[self.vault]
+            anchors = {
+                e.anchor if e.level == 0 else heading_slug(
+                    render_heading(e.anchor, path, index))
+                for e in outline
+            }
+            with self.lock:
+                if self.outlines.get(path) is outline:
+                    self.anchors[path] = anchors
+        if anchor.startswith('^'):
+            return anchor in anchors
+        return heading_slug(anchor) in anchors
+
+
+def init_outline_index(vault: str) -> OutlineIndex:
+    """
+    Creates an outline index for the vault and subscribes it for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        OutlineIndex: outline index
+    """
+    index = OutlineIndex(vault)
+    AppState.outline_indices[vault] = index
+    AppState.indices[vault].add_listener(index.update)
+    return index
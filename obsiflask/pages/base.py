@@ -1,14 +1,20 @@
 """
 Base rendering logic
 """
+import json
 from pathlib import Path
 
-from flask import render_template, url_for, request
+from flask import Response, render_template, request, stream_with_context, url_for
 
 from obsiflask.app_state import AppState
 from obsiflask.bases.base_parser import parse_base
 from obsiflask.pages.index_tree import render_tree
 
+PAGE_SIZE = 100
+"""
+Number of rows rendered with the page. The rest of a table is streamed, cards are paginated
+"""
+
 
 def render_base_view(vault: str, subpath: str, real_path: str) -> str:
     """
@@ -48,7 +54,43 @@ def render_base_view(vault: str, subpath: str, real_path: str) -> str:
             url = url + '&raw=1'
         all_views.append((view, url))
 
-    result = base.views[key].make_view(vault, force_refresh=refresh)
+    try:
+        offset = int(request.args.get('offset') or 0)
+    except ValueError:
+        return 'Bad offset', 400
+    if offset < 0:
+        return 'Bad offset', 400
+    result, total = base.views[key].make_page(vault,
+                                              force_refresh=refresh,
+                                              offset=offset,
+                                              limit=PAGE_SIZE)
+    end = offset + len(result)
+    summary = None
+    if base.views[key].group_by is not None or base.views[key].summaries:
+        summary = base.views[key].summarize(vault, force_refresh=refresh)
+    # links to the pages of cards, and the stream for the rest of the table
+    raw_args = {'raw': 1} if raw else {}
+    pages = {}
+    stream_url = None
+    if offset > 0:
+        pages['prev'] = url_for('base',
+                                vault=vault,
+                                subpath=subpath,
+                                view=current_view,
+                                offset=max(offset - PAGE_SIZE, 0),
+                                **raw_args)
+    if end < total:
+        pages['next'] = url_for('base',
+                                vault=vault,
+                                subpath=subpath,
+                                view=current_view,
+                                offset=end,
+                                **raw_args)
+        stream_url = url_for('base_rows',
+                             vault=vault,
+                             subpath=subpath,
+                             view=current_view,
+                             offset=end)
     if base.views[key].type == 'cards':
         template_path = 'bases/card_view.html'
         if raw:
@@ -68,4 +110,55 @@ def render_base_view(vault: str, subpath: str, real_path: str) -> str:
                            vault=vault,
                            path=subpath,
                            current_view=current_view,
-                           all_views=all_views)
+                           all_views=all_views,
+                           total=total,
+                           pages=pages,
+                           stream_url=stream_url,
+                           summary=summary)
+
+
+def render_base_rows(vault: str, subpath: str, real_path: str) -> Response:
+    """
+    Streams the rows of the view as NDJSON (one json object per line).
+    The rows are computed by chunks while they are sent.
+
+    Query args:
+        view: view name, the first view by default
+        offset or cursor: number of rows to skip
+        limit: number of rows, all the rows by default
+        refresh: if set, the cached rows are ignored
+
+    The total number of rows is sent in the "X-Total-Count" header,
+    the cursor of the next page (if any) in the "X-Next-Cursor" header
+
+    Args:
+        vault (str): vault name
+        subpath (str): path to base
+        real_path (str): real path to base
+
+    Returns:
+        Response: streamed response
+    """
+    base = parse_base(real_path, vault)
+    view = request.args.get('view') or list(base.views.keys())[0]
+    if view not in base.views:
+        return f'Bad view: {view}', 400
+    try:
+        offset = int(
+            request.args.get('cursor') or request.args.get('offset') or 0)
+        limit = request.args.get('limit')
+        limit = int(limit) if limit else None
+    except ValueError:
+        return 'Bad offset or limit', 400
+    if offset < 0 or limit is not None and limit < 0:
+        return 'Bad offset or limit', 400
+    total, rows = base.views[view].stream_page(
+        vault, bool(request.args.get('refresh')), offset, limit)
+    headers = {'X-Total-Count': str(total)}
+    end = total if limit is None else min(total, offset + limit)
+    if end < total:
+        headers['X-Next-Cursor'] = str(end)
+    return Response(stream_with_context(
+        json.dumps(r, default=str) + '\n' for r in rows),
+                    mimetype='application/x-ndjson',
+                    headers=headers)
@@ -3,8 +3,11 @@ Autocomplete logic
 """
 import re
 import datetime
+import math
+import time
 from obsiflask.consts import DATE_FORMAT
-from obsiflask.hint import MAX_HINT
+from obsiflask.hint import MAX_HINT, FRECENCY_SEARCH_FACTOR, FrecencyModel
+from obsiflask.outline_index import match_outline
 from obsiflask.app_state import AppState
 from obsiflask.auth import get_user
 
@@ -38,6 +41,18 @@ embed_pattern = re.compile(r'[!]\[\[[^\]]*$')
 """
 Embedding pattern
 """
+property_key_pattern = re.compile(r'^([\w-]*)$')
+"""
+Pattern for the unfinished property name in the frontmatter
+"""
+property_value_pattern = re.compile(r'^([\w-]+):\s*(?:\[(?:.*,)?)?\s*([^,\[\]]*)$')
+"""
+Pattern like "key: unfinished value" or "key: [value1, unfinished value" in the frontmatter
+"""
+anchor_pattern = re.compile(r'\[\[([^\]|#]+)#([^\]|#]*)$')
+"""
+Pattern [[note#unfinished heading or [[note#^block
+"""
 
 
 def make_short(s: str) -> str:
@@ -55,6 +70,84 @@ def make_short(s: str) -> str:
     return s
 
 
+def rerank(results: list[tuple[str, int]],
+           model: FrecencyModel | None,
+           by_length: bool = True) -> list[tuple[str, int, float]]:
+    """
+    Ranks the index results by frecency, then by length difference
+
+    Args:
+        results (list[tuple[str, int]]): strings with length differences from the index
+        model (FrecencyModel | None): frecency model of the user
+        by_length (bool, optional): if not set, the order of the index (e.g. by centrality)
+            is kept for the strings with equal frecency. Defaults to True.
+
+    Returns:
+        list[tuple[str, int, float]]: top MAX_HINT strings with length differences and frecency
+    """
+    now = time.time()
+    results = [(r[0], r[1], model.score(r[0], now) if model else 0.0)
+               for r in results]
+    if not by_length:
+        return sorted(results, key=lambda r: -r[2])[:MAX_HINT]
+    return sorted(results, key=lambda r: (-r[2], r[1]))[:MAX_HINT]
+
+
+def search_index(vault: str,
+                 index_name: str,
+                 query: str,
+                 limit: int = MAX_HINT) -> tuple[list[tuple[str, int]], int]:
+    """
+    Searches in the string index of the vault, reusing the previous search of the user
+    when the query is typed further
+
+    Args:
+        vault (str): vault name
+        index_name (str): attribute of HintIndex, e.g. "string_file_index"
+        query (str): string to find
+        limit (int, optional): max number of results. Defaults to MAX_HINT.
+
+    Returns:
+        tuple[list[tuple[str, int]], int]: see ArrayStringIndex.search
+    """
+    hints = AppState.hints[vault]
+    session = hints.get_session(get_user()).get_search(index_name)
+    return getattr(hints, index_name).search(query, limit, session)
+
+
+def complete(
+    vault: str,
+    kind: str,
+    query: str,
+    limit: int = MAX_HINT * FRECENCY_SEARCH_FACTOR
+) -> tuple[list[tuple[str, int]], list[tuple[str, int]], int]:
+    """
+    Finds files or tags for the query: prefix matches from the prefix index first,
+    and fuzzy matches from the ngram index if there are not enough prefix matches
+
+    Args:
+        vault (str): vault name
+        kind (str): "file" or "tag"
+        query (str): entered text
+        limit (int, optional): max number of results of each index.
+            Defaults to MAX_HINT * FRECENCY_SEARCH_FACTOR.
+
+    Returns:
+        tuple[list[tuple[str, int]], list[tuple[str, int]], int]: tuple with three elements:
+            prefix matches with length differences, other fuzzy matches with length differences,
+            and the ngram score of the fuzzy matches
+    """
+    hints = AppState.hints[vault]
+    prefix_results = getattr(hints, f'{kind}_prefix_index').search(query, limit)
+    if len(prefix_results) >= MAX_HINT:
+        return prefix_results, [], 0
+    fuzzy_results, best_match = search_index(vault, f'string_{kind}_index',
+                                             query, limit)
+    found = {r[0] for r in prefix_results}
+    return prefix_results, [r for r in fuzzy_results
+                            if r[0] not in found], best_match
+
+
 def context_hint(vault: str, context: str) -> list[dict]:
     """
     Tries to show the user most probable hints depending on the context
@@ -70,15 +163,27 @@ def context_hint(vault: str, context: str) -> list[dict]:
     if found is None:
         return None
     found_text = found.group().lstrip('"')
-    file_results, file_best_match_score = AppState.hints[
-        vault].string_file_index.search(found_text)
-    file_results = [(f[0], file_best_match_score, f) for f in file_results]
-    tags_results, tag_best_match_score = AppState.hints[
-        vault].string_tag_index.search(found_text)
-    tags_results = [('#' + r[0], tag_best_match_score, r[1])
-                    for r in tags_results]
-    results = sorted(file_results + tags_results, key=lambda x:
-                     (-x[1], x[2]))[:MAX_HINT]
+    hints = AppState.hints[vault]
+    file_prefix, file_fuzzy, file_best_match_score = complete(
+        vault, 'file', found_text)
+    file_frecency = hints.get_file_frecency(get_user())
+    # for prefix matches, the centrality rank is used instead of the length difference
+    file_results = [(f[0], math.inf, f[2], rank) for rank, f in enumerate(
+        rerank(file_prefix, file_frecency, False))] + [
+            (f[0], file_best_match_score, f[2], f[1])
+            for f in rerank(file_fuzzy, file_frecency)
+        ]
+    tag_prefix, tag_fuzzy, tag_best_match_score = complete(
+        vault, 'tag', found_text)
+    tag_frecency = hints.get_tag_frecency(get_user())
+    tags_results = [('#' + r[0], math.inf, r[2], rank) for rank, r in enumerate(
+        rerank(tag_prefix, tag_frecency, False))] + [
+            ('#' + r[0], tag_best_match_score, r[2], r[1])
+            for r in rerank(tag_fuzzy, tag_frecency)
+        ]
+    # prefix match first, then ngram match, then frecency, then length difference
+    results = sorted(file_results + tags_results,
+                     key=lambda x: (-x[1], -x[2], x[3]))[:MAX_HINT]
     found_span = len(found_text)
 
     if len(results) == 0:
@@ -101,20 +206,27 @@ def hashtag_hint(vault: str, context: str) -> list[dict]:
     if found is None:
         return None
     found_text = found.group()
+    hints = AppState.hints[vault]
+    tag_frecency = hints.get_tag_frecency(get_user())
+    default_tags = hints.default_tags
+    if tag_frecency is not None:
+        default_tags = list(
+            dict.fromkeys(tag_frecency.top(MAX_HINT) + default_tags))
     if len(found_text) == 1:  # only '#'
         return [{
             'text': '#' + r,
             'erase': 1
-        } for r in AppState.hints[vault].default_tags[:MAX_HINT]]
+        } for r in default_tags[:MAX_HINT]]
 
-    tags_results, _ = AppState.hints[vault].string_tag_index.search(
-        found_text[1:])
+    tag_prefix, tag_fuzzy, _ = complete(vault, 'tag', found_text[1:])
+    tags_results = (rerank(tag_prefix, tag_frecency, False) +
+                    rerank(tag_fuzzy, tag_frecency))[:MAX_HINT]
     found_text_len = len(found_text)
     if len(tags_results) == 0:
         return [{
             'text': '#' + r,
             'erase': found_text_len
-        } for r in AppState.hints[vault].default_tags[:MAX_HINT]]
+        } for r in default_tags[:MAX_HINT]]
 
     return [{
         'text': '#' + r[0],
@@ -151,8 +263,9 @@ def taglist_hint(vault: str, context: str) -> list[dict]:
             'erase': 0
         } for r in AppState.hints[vault].default_tags[:MAX_HINT]]
 
-    tags_results, _ = AppState.hints[vault].string_tag_index.search(
-        found_text.strip("'"))
+    tag_prefix, tag_fuzzy, _ = complete(vault, 'tag', found_text.strip("'"),
+                                        MAX_HINT)
+    tags_results = (tag_prefix + tag_fuzzy)[:MAX_HINT]
     found_text_len = len(found_text)
     if len(tags_results) == 0:
         return [{
@@ -166,6 +279,37 @@ def taglist_hint(vault: str, context: str) -> list[dict]:
     } for r in tags_results]
 
 
+def anchor_hint(vault: str, context: str) -> list[dict]:
+    """
+    Tries to show the user headings and blocks of the note for the wikilink with anchor
+
+    Args:
+        vault (str): vault name
+        context (str): context of the hint
+
+    Returns:
+        list[dict]: resulting hints
+    """
+    found = anchor_pattern.search(context)
+    if found is None:
+        return None
+    index = AppState.indices[vault]
+    # the current note is unknown, so the link is resolved w.r.t. vault root
+    link = index.resolve_wikilink(found.group(1),
+                                  index.path / '_',
+                                  True,
+                                  escape=False,
+                                  relative=False)
+    if link is None or link.startswith(('http://', 'https://')):
+        return []
+    entries = AppState.outline_indices[vault].get_outline(index.path / link)
+    query = found.group(2)
+    return [{
+        'text': e.anchor + ']]',
+        'erase': len(query)
+    } for e in match_outline(entries, query, MAX_HINT)]
+
+
 def double_brackets_hint(vault: str, context: str) -> list[dict]:
     """
     Tries to show the user most probable hints for the wikilink autocomplete 
@@ -196,9 +340,10 @@ def double_brackets_hint(vault: str, context: str) -> list[dict]:
     if len(found_text) == 2:  # only '[['
         return [{'text': r + ']]', 'erase': 0} for r in default_files]
 
-    file_results, _ = AppState.hints[vault].string_file_index.search(
-        found_text[2:])
-    file_results = file_results[:MAX_HINT]
+    file_prefix, file_fuzzy, _ = complete(vault, 'file', found_text[2:])
+    file_frecency = AppState.hints[vault].get_file_frecency(get_user())
+    file_results = (rerank(file_prefix, file_frecency, False) +
+                    rerank(file_fuzzy, file_frecency))[:MAX_HINT]
     found_text_len = len(found_text) - 2
     if len(file_results) == 0:
         return [{
@@ -241,8 +386,8 @@ def embed_hint(vault: str, context: str) -> list[dict]:
     if len(found_text) == 3:  # only '![['
         return [{'text': r + ']]', 'erase': 0} for r in default_files]
 
-    file_results, _ = AppState.hints[vault].string_all_file_index.search(
-        found_text[3:])
+    file_results, _ = search_index(vault, 'string_all_file_index',
+                                   found_text[3:])
     file_results = file_results[:MAX_HINT]
     found_text_len = len(found_text) - 3
     if len(file_results) == 0:
@@ -285,13 +430,70 @@ def simple_hint(vault: str, erase_num: int = 0) -> list[dict]:
     return result
 
 
-def get_hint(vault: str, context: str) -> list[dict[str]]:
+def match_hints(candidates: list[str], query: str) -> list[str]:
+    """
+    Helper to filter hints: prefix matches first, then substring matches (case-insensitive)
+
+    Args:
+        candidates (list[str]): candidates, the most probable first
+        query (str): entered text
+
+    Returns:
+        list[str]: MAX_HINT hints at most
+    """
+    query = query.lower()
+    prefix = [c for c in candidates if c.lower().startswith(query)]
+    substring = [
+        c for c in candidates
+        if query in c.lower() and not c.lower().startswith(query)
+    ]
+    return (prefix + substring)[:MAX_HINT]
+
+
+def property_hint(vault: str, context: str) -> list[dict]:
+    """
+    Tries to show the user property names and values for the frontmatter
+
+    Args:
+        vault (str): vault name
+        context (str): context of the hint, must be inside the frontmatter
+
+    Returns:
+        list[dict]: resulting hints
+    """
+    line = context.rsplit('\n', 1)[-1]
+    index = AppState.property_indices[vault]
+    found = property_value_pattern.match(line)
+    if found is not None:
+        key, query = found.group(1), found.group(2)
+        if key == 'tags':
+            return None  # see taglist_hint
+        values = [str(v) for v, _ in index.get_values(key)]
+        return [{
+            'text': v,
+            'erase': len(query)
+        } for v in match_hints(values, query.strip())]
+    found = property_key_pattern.match(line)
+    if found is not None:
+        query = found.group(1)
+        keys = [k for k, _ in index.get_keys()]
+        return [{
+            'text': k + ': ',
+            'erase': len(query)
+        } for k in match_hints(keys, query)]
+    return None
+
+
+def get_hint(vault: str,
+             context: str,
+             frontmatter: bool = False) -> list[dict[str]]:
     """
     Main logic of autocomplete results providing
 
     Args:
         vault (str): vault name
         context (str): context of autocomplete
+        frontmatter (bool, optional): if set, the context is inside the frontmatter. Defaults to False.
 
     Returns:
         list[dict[str]]: list of dictionaries,
@@ -300,11 +502,23 @@ def get_hint(vault: str, context: str) -> list[dict[str]]:
             - "erase": number of chars to remove from the context
             - "short": short alias for the hint to show to user
     """
+    user = get_user()
+    session = AppState.hints[vault].get_session(user)
+    key = (context, frontmatter)
+    state = (AppState.hints[vault].get_state(user),
+             AppState.indices[vault].get_generation(),
+             datetime.date.today())
+    result = session.get(key, state)
+    if result is not None:
+        return result
     result = None
-    for hinter in [
-            hashtag_hint, embed_hint, double_brackets_hint, taglist_hint,
-            context_hint
-    ]:
+    hinters = [
+        anchor_hint, hashtag_hint, embed_hint, double_brackets_hint,
+        taglist_hint, context_hint
+    ]
+    if frontmatter:
+        hinters = [property_hint] + hinters
+    for hinter in hinters:
         result = hinter(vault, context)
         if result is not None:
             break
@@ -312,4 +526,5 @@ def get_hint(vault: str, context: str) -> list[dict[str]]:
         result = simple_hint(vault)
     for r in result:
         r['short'] = make_short(r['text'])
+    session.put(key, state, result)
     return result
@@ -0,0 +1,34 @@
+"""
+Rendering logic for the vault-wide report of unlinked mentions
+"""
+from dataclasses import asdict
+
+from flask import render_template, request, jsonify
+
+from obsiflask.app_state import AppState
+
+
+def render_mentions(vault: str) -> str:
+    """
+    Renders unlinked mentions of the vault notes
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        str: rendered html or json if "raw" parameter is set
+    """
+    counts, mentions = AppState.mention_indices[vault].get_report()
+    if request.args.get('raw'):
+        return jsonify({
+            'counts': dict(counts),
+            'mentions': {
+                path: [asdict(m) for m in note_mentions]
+                for path, note_mentions in mentions.items()
+            }
+        })
+    return render_template('mentions.html',
+                           vault=vault,
+                           home=AppState.config.vaults[vault].home_file,
+                           counts=counts,
+                           mentions=mentions)
@@ -3,20 +3,22 @@ Logic for markdown rendering
 """
 import json
 import re
+from itertools import count
 from pathlib import Path
 from threading import Lock
 from urllib import parse
 
 import mistune
-from flask import render_template, redirect, url_for
-import frontmatter
+from flask import render_template, redirect, url_for, request
 from markupsafe import Markup
 
 from obsiflask.app_state import AppState
 from obsiflask.file_index import FileIndex
 from obsiflask.utils import logger, get_traceback
 from obsiflask.consts import wikilink, re_tag_embed, hashtag
-from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.text_index import read_text
+from obsiflask import frontmatter_parser
+from obsiflask.mentions import Mention
 from obsiflask.encrypt.meld_decrypt import read_encoded_data
 from obsiflask.messages import add_message, type_to_int
 from obsiflask.auth import get_user
@@ -24,6 +26,21 @@ _lock = Lock()
 
 meld_code = re.compile('🔐β(.+?)🔐', re.MULTILINE)
 
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+"""
+Private-use characters that mark highlighted spans until the markdown is rendered
+"""
+MAX_HIGHLIGHTS = 100
+"""
+Maximal number of highlighted spans per page
+"""
+re_frontmatter = re.compile(r'\A---\s*\n.*?\n---\s*(?:\n|\Z)', re.DOTALL)
+re_md_link = re.compile(r'!?\[[^\]\n]*\]\([^)\n]*\)')
+re_html_tag = re.compile(r'<[^>\n]+>')
+re_block_prefix = re.compile(r'[ \t]*(?:(?:#{1,6}|[-*+>]|\d+[.)]|\[.\])[ \t]+)*')
+re_highlight = re.compile(f'{HIGHLIGHT_START}|{HIGHLIGHT_END}')
+
 def url_for_tag(vault: str, tag: str) -> str:
     """
     Generates an url for tags. 
@@ -57,6 +74,20 @@ def plugin_mermaid(md):
     md.renderer.block_code = block_code
 
 
+def heading_slug(text: str) -> str:
+    """
+    Returns the id of the rendered heading.
+    Lines of setext headings are joined with spaces, as in the outline index
+
+    Args:
+        text (str): rendered text of the heading
+
+    Returns:
+        str: id
+    """
+    return parse.quote(text.replace('\n', ' '))
+
+
 def plugin_heading_anchor(md):
     """Adds anchor and id to headers"""
 
@@ -64,9 +95,12 @@ def plugin_heading_anchor(md):
 
     if not hasattr(renderer, "heading_anchor_orig"):
         renderer.heading_anchor_orig = renderer.heading
+        renderer.heading_texts = []
+        # rendered headings, see render_heading
 
         def heading(text, level):
-            slug = parse.quote(text)
+            renderer.heading_texts.append(text)
+            slug = heading_slug(text)
             return f'<h{level} id="{slug}">{text} <a href="#{slug}" style="text-decoration:none; font-size:small" class="anchor">🔗</a></h{level}>\n'
 
         renderer.heading = heading
@@ -87,7 +121,7 @@ def parse_frontmatter(text: str, name: str, vault: str) -> str:
         str: processed file
     """
     try:
-        metadata, content = frontmatter.parse(text)
+        metadata, content = frontmatter_parser.parse(text)
 
         if len(metadata) > 0:
             buf = ['---\n', '### Properties\n']
@@ -109,7 +143,10 @@ def parse_frontmatter(text: str, name: str, vault: str) -> str:
         return text
 
 
-def make_link(link: re.Match, path: Path, index: FileIndex) -> str:
+def make_link(link: re.Match,
+              path: Path,
+              index: FileIndex,
+              validate_anchor: bool = True) -> str:
     """
     Resolves wiki links
 
@@ -117,6 +154,7 @@ def make_link(link: re.Match, path: Path, index: FileIndex) -> str:
         link (re.Match): found regex for wikilink
         path (Path): file path. needs for wikilink resolution
         index (FileIndex): file index
+        validate_anchor (bool, optional): if True, will drop the anchor missing in the note. Defaults to True.
 
     Returns:
         str: corrected link
@@ -133,7 +171,10 @@ def make_link(link: re.Match, path: Path, index: FileIndex) -> str:
         alias = alias.split('/')[-1]
     if '.md' in alias:
         alias = alias.replace('.md', '')
-    link = index.resolve_wikilink(name, path, True)
+    link = index.resolve_wikilink(name,
+                                  path,
+                                  True,
+                                  validate_anchor=validate_anchor)
 
     if link:
         return f'[{alias}]({link})'
@@ -232,7 +273,155 @@ def parse_hashtags(text, vault):
     return ''.join(buf)
 
 
-def preprocess(full_path: Path, index: FileIndex, vault: str) -> str:
+def parse_highlight(value: str | None) -> list[tuple[int, int]]:
+    """
+    Parses "highlight" request parameter
+
+    Args:
+        value (str | None): comma-separated spans: "start-end,start-end"
+
+    Returns:
+        list[tuple[int, int]]: spans, invalid ones are ignored
+    """
+    spans = []
+    if not value:
+        return spans
+    for part in value.split(',')[:MAX_HIGHLIGHTS]:
+        try:
+            start, end = part.split('-')
+            start, end = int(start), int(end)
+        except ValueError:
+            continue
+        if 0 <= start < end:
+            spans.append((start, end))
+    return spans
+
+
+def add_highlights(text: str, spans: list[tuple[int, int]]) -> str:
+    """
+    Marks the spans of the source text for highlighting.
+    Spans that touch links or html tags are extended to cover them,
+    hashtags and markdown block prefixes (headers, lists, quotes) are left outside, 
+    so the markup is not broken. Spans inside frontmatter are ignored.
+
+    Args:
+        text (str): source text
+        spans (list[tuple[int, int]]): spans to highlight
+
+    Returns:
+        str: text with highlight markers
+    """
+    protected = []
+    for regex in [wikilink, re_tag_embed, meld_code, re_md_link, re_html_tag]:
+        protected.extend(m.span() for m in regex.finditer(text))
+    excluded = [m.span() for m in hashtag.finditer(text)]
+    frontmatter_match = re_frontmatter.match(text)
+    frontmatter_end = frontmatter_match.end() if frontmatter_match else 0
+
+    merged = []
+    for start, end in sorted(spans):
+        start, end = min(start, len(text)), min(end, len(text))
+        if start >= end or start < frontmatter_end:
+            continue
+        changed = True
+        while changed:
+            changed = False
+            for p_start, p_end in protected:
+                if p_start < end and start < p_end and (p_start < start
+                                                        or p_end > end):
+                    start, end = min(start, p_start), max(end, p_end)
+                    changed = True
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    pieces = []
+    for start, end in merged:
+        # markers do not cross lines to keep the blocks of markdown valid
+        while start < end:
+            line_begin = text.rfind('\n', 0, start) + 1
+            line_end = text.find('\n', start)
+            if line_end < 0:
+                line_end = len(text)
+            prefix_end = re_block_prefix.match(text, line_begin).end()
+            piece = [(max(start, prefix_end), min(end, line_end))]
+            for e_start, e_end in excluded:
+                piece = [
+                    part for p_start, p_end in piece
+                    for part in [(p_start, min(p_end, e_start)),
+                                 (max(p_start, e_end), p_end)]
+                    if part[0] < part[1]
+                ]
+            pieces.extend(piece)
+            start = line_end + 1
+
+    buf = []
+    offset = 0
+    for start, end in pieces:
+        buf.append(text[offset:start])
+        buf.append(HIGHLIGHT_START + text[start:end] + HIGHLIGHT_END)
+        offset = end
+    buf.append(text[offset:])
+    return ''.join(buf)
+
+
+def apply_highlights(html: str) -> str:
+    """
+    Replaces highlight markers with html tags
+
+    Args:
+        html (str): rendered html
+
+    Returns:
+        str: html with <mark> tags, the first one has id "highlight-0"
+    """
+    counter = count()
+
+    def replace(m: re.Match) -> str:
+        if m.group(0) == HIGHLIGHT_END:
+            return '</mark>'
+        return f'<mark class="search-highlight" id="highlight-{next(counter)}">'
+
+    return re_highlight.sub(replace, html)
+
+
+MARKDOWN_PLUGINS = [
+    'table', 'strikethrough', 'task_lists', 'mark', plugin_mermaid,
+    plugin_heading_anchor, 'url', 'math'
+]
+"""
+Mistune plugins of the rendered notes
+"""
+
+
+def render_heading(text: str, path: Path, index: FileIndex) -> str:
+    """
+    Renders the heading text the same way as preprocess does,
+    so heading_slug of the result is the id of the heading on the page.
+    Links in the heading are not validated
+
+    Args:
+        text (str): heading text from the note source
+        path (Path): note path
+        index (FileIndex): file index
+
+    Returns:
+        str: rendered text of the heading
+    """
+    text = parse_hashtags(text, index.vault)
+    text = wikilink.sub(lambda m: make_link(m, path, index, False), text)
+    markdown = mistune.create_markdown(escape=False, plugins=MARKDOWN_PLUGINS)
+    markdown('# ' + text)
+    if not markdown.renderer.heading_texts:
+        return text
+    return markdown.renderer.heading_texts[0]
+
+
+def preprocess(full_path: Path,
+               index: FileIndex,
+               vault: str,
+               highlight: list[tuple[int, int]] | None = None) -> str:
     """
     An entrypoint for preprocessing markdown logic
 
@@ -240,20 +429,17 @@ def preprocess(full_path: Path, index: FileIndex, vault: str) -> str:
         full_path (Path): path to file
         index (FileIndex): file index
         vault (str): vault name
+        highlight (list[tuple[int, int]] | None, optional): spans of the source text to highlight. 
+            Defaults to None.
 
     Returns:
         str: preprocessed document
     """
     with _lock:
-        with obf_open(full_path, vault) as inp:
-            text = inp.read()
-    markdown = mistune.create_markdown(escape=False,
-                                       plugins=[
-                                           'table', 'strikethrough',
-                                           'task_lists', 'mark',
-                                           plugin_mermaid,
-                                           plugin_heading_anchor, 'url', 'math'
-                                       ])
+        text = read_text(full_path, vault)
+    if highlight:
+        text = add_highlights(text, highlight)
+    markdown = mistune.create_markdown(escape=False, plugins=MARKDOWN_PLUGINS)
     text = parse_hashtags(text, vault)
     text = parse_frontmatter(text, Path(full_path).name, vault)
     text = parse_encryption(text)
@@ -267,6 +453,8 @@ def preprocess(full_path: Path, index: FileIndex, vault: str) -> str:
         offset = m.span()[1]
     buf.append(text[offset:])
     html = markdown(''.join(buf))
+    if highlight:
+        html = apply_highlights(html)
     return html
 
 def preprocess_mdenc(path: str, real_path: str, vault: str)-> str:
@@ -286,6 +474,27 @@ def preprocess_mdenc(path: str, real_path: str, vault: str)-> str:
 
         
 
+def get_mentions(vault: str, real_path: Path) -> list[Mention]:
+    """
+    Returns unlinked mentions of other notes in the note
+
+    Args:
+        vault (str): vault name
+        real_path (Path): full path in the filesystem
+
+    Returns:
+        list[Mention]: mentions or empty list if the index is not available
+    """
+    index = AppState.mention_indices.get(vault)
+    if index is None:
+        return []
+    try:
+        return index.get_note_mentions(Path(real_path).resolve())
+    except Exception as e:
+        logger.error(f'could not get unlinked mentions for {real_path}: {e}')
+        return []
+
+
 def render_renderer(vault: str, path: str, real_path: Path) -> str:
     """
     Logic for rendering
@@ -315,11 +524,15 @@ def render_renderer(vault: str, path: str, real_path: Path) -> str:
                            curfile=path)
     elif not str(path).endswith('.md'):
         return redirect(url_for('get_file', vault=vault, subpath=path))
-    
+    AppState.hints[vault].update_file(str(path), get_user(), 'open')
     return render_template('renderer.html',
-                           markdown_text=preprocess(real_path,
-                                                    AppState.indices[vault],
-                                                    vault),
+                           markdown_text=preprocess(
+                               real_path,
+                               AppState.indices[vault],
+                               vault,
+                               highlight=parse_highlight(
+                                   request.args.get('highlight'))),
+                           mentions=get_mentions(vault, real_path),
                            path=path,
                            vault=vault,
                            is_editor=False,
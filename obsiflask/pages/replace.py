@@ -0,0 +1,65 @@
+"""
+The module provides a page for vault-wide find and replace
+"""
+from flask import render_template
+
+from obsiflask.app_state import AppState
+from obsiflask.auth import get_user
+from obsiflask.messages import add_message, type_to_int
+from obsiflask.replace import ReplaceForm, find_replacements, apply_replacements
+from obsiflask.utils import get_traceback
+
+
+def render_replace(vault: str) -> str:
+    """
+    Rendering logic: shows the preview of the replacement or applies it
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        str: Flask-rendered page
+    """
+    form = ReplaceForm()
+    changes = None
+    if form.validate_on_submit():
+        try:
+            generation = AppState.indices[vault].get_generation()
+            changes = find_replacements(vault, form.pattern.data,
+                                        form.replacement.data or '',
+                                        form.regex.data, form.ignore_case.data)
+            if form.apply.data:
+                if form.generation.data != str(generation):
+                    add_message(
+                        'The vault was changed after the preview. Check the preview again',
+                        type_to_int['warning'],
+                        vault,
+                        user=get_user())
+                else:
+                    written, skipped = apply_replacements(vault, changes)
+                    changes = None
+                    if skipped:
+                        add_message(
+                            f'Replaced in {len(written)} files, skipped {len(skipped)} files',
+                            type_to_int['warning'],
+                            vault,
+                            details='\n'.join(skipped),
+                            user=get_user())
+                    else:
+                        add_message(f'Replaced in {len(written)} files',
+                                    type_to_int['info'],
+                                    vault,
+                                    details='\n'.join(written),
+                                    user=get_user())
+            form.generation.data = str(generation)
+        except Exception as e:
+            add_message(f'Error during replacement: {e}',
+                        type_to_int['error'],
+                        vault,
+                        details=get_traceback(e),
+                        user=get_user())
+    return render_template('replace.html',
+                           form=form,
+                           changes=changes,
+                           vault=vault,
+                           home=AppState.config.vaults[vault].home_file)
@@ -10,12 +10,47 @@ from obsiflask.file_index import FileIndex
 from obsiflask.messages import add_message, type_to_int
 from obsiflask.app_state import AppState
 from obsiflask.auth import get_user
-from obsiflask.utils import get_traceback
+from obsiflask.utils import get_traceback, logger
 from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.consts import wikilink, hashtag
 
 _lock = Lock()
 
 
+def record_inserted_links(vault: str, path: Path, old_text: str | None,
+                          content: str):
+    """
+    Updates frecency of the files and tags that were linked in the new version of the note
+
+    Args:
+        vault (str): vault name
+        path (Path): real path of the note
+        old_text (str | None): content before saving
+        content (str): new content
+    """
+    old_text = old_text or ''
+    get_links = lambda text: {
+        m.group(1).split('#', 1)[0].strip()
+        for m in wikilink.finditer(text)
+    }
+    get_tags = lambda text: {m.group(1)[1:] for m in hashtag.finditer(text)}
+    index = AppState.indices[vault]
+    hints = AppState.hints[vault]
+    for name in get_links(content) - get_links(old_text):
+        if not name:
+            continue
+        resolved = index.resolve_wikilink(name,
+                                          path,
+                                          True,
+                                          escape=False,
+                                          relative=False)
+        if resolved is not None and not resolved.startswith(
+            ('http://', 'https://')):
+            hints.update_file(resolved, get_user(), 'link')
+    for tag in get_tags(content) - get_tags(old_text):
+        hints.update_tag(tag, get_user())
+
+
 def make_save(path: str, content: str, index: FileIndex,
               vault: str) -> tuple[str, int]:
     """
@@ -34,15 +69,24 @@ def make_save(path: str, content: str, index: FileIndex,
     parent = Path(path).parent
     with _lock:
         try:
-            exists = Path(path).exists()
             parent.mkdir(parents=True, exist_ok=True)
+            old_text = None
+            if path.suffix == '.md':
+                old_text = AppState.text_indices[vault].get_text(
+                    path.resolve())
             with obf_open(path, vault, 'w') as f:
                 f.write(content)
 
-            if not exists:
-                index.refresh()
+            index.apply_changes([path])
             AppState.hints[vault].update_file(
                 str(Path(path).resolve().relative_to(index.path)), get_user())
+            if path.suffix == '.md':
+                try:
+                    record_inserted_links(vault, path.resolve(), old_text,
+                                          content)
+                except Exception as e:
+                    logger.warning(
+                        f'could not update frecency for {path}: {e}')
             add_message(f'Saved file: {path.name}', 0, vault, user=get_user())
             return jsonify({"status": "ok"}), 200
         except Exception as e:
@@ -1,39 +1,218 @@
 """
 Module contains search logic
 """
-import os
 import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Generator
 
-from markupsafe import escape
+from markupsafe import escape, Markup
 import nltk
 from flask import render_template, request, stream_template
 
 from obsiflask.pages.index_tree import render_tree
 from obsiflask.app_state import AppState
-from obsiflask.utils import logger
 from obsiflask.graph import Graph
 from obsiflask.messages import add_message, type_to_int
 from obsiflask.bases.filter import FieldFilter
-from obsiflask.consts import MAX_FILE_SIZE_MARKDOWN
 from obsiflask.auth import get_user
-from obsiflask.utils import get_traceback
-from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.utils import get_traceback, lower_text
+from obsiflask.text_index import TextIndex, read_text
+from obsiflask.query import execute_query
 
 SEARCH_PREVIEW_CHARS = 100
 """
 This amount of chars will be shown as a context
 """
+SEARCH_MAX_MATCHES = 5
+"""
+Maximal number of matches per file in the text search
+"""
 re_non_words = re.compile('\W+')
 """
 non-alphabetical symbols for "ignore non-words" flag
 """
 
 
+@dataclass
+class SearchMatch:
+    """
+    Match of the text search
+    """
+    start: int
+    """
+    Start offset in the file content (in characters)
+    """
+    end: int
+    """
+    End offset in the file content (in characters)
+    """
+    line: int
+    """
+    Line number of the match start, starting from 1
+    """
+
+
+@dataclass
+class SearchHit:
+    """
+    Text search result for one file.
+    Only offsets are stored during the search, 
+    the snippets are extracted and escaped when the result is rendered
+    """
+    real_path: Path
+    """
+    Full path of the file
+    """
+    matches: list[SearchMatch]
+    """
+    Found matches, ordered by offset
+    """
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate size of the hit for the search cache
+        """
+        return len(str(self.real_path)) + 24 * len(self.matches)
+
+    def get_highlight(self) -> str:
+        """
+        Returns a value of "highlight" parameter for the renderer
+
+        Returns:
+            str: comma-separated spans: "start-end,start-end"
+        """
+        return ','.join(f'{m.start}-{m.end}' for m in self.matches)
+
+    def get_snippets(self, vault: str) -> list[Markup]:
+        """
+        Extracts escaped snippets around the matches
+
+        Args:
+            vault (str): vault name
+
+        Returns:
+            list[Markup]: snippets with the matches in bold
+        """
+        text = read_text(self.real_path, vault)
+        snippets = []
+        for m in self.matches:
+            # the file could be changed after the search
+            start = min(m.start, len(text))
+            end = min(max(start, m.end), len(text))
+            before = escape(text[max(0, start - SEARCH_PREVIEW_CHARS):start])
+            match = escape(text[start:end])
+            after = escape(text[end:end + SEARCH_PREVIEW_CHARS])
+            snippets.append(
+                Markup(f'<small class="text-muted">{m.line}:</small> '
+                       f'{before}<strong>{match}</strong>{after}'))
+        return snippets
+
+
+def normalize_text(
+        text: str, ignore_case: bool, ignore_non_words: bool
+) -> tuple[str, list[int], list[int], list[int] | None]:
+    """
+    Applies search flags to the text and remembers 
+    how to map the offsets back to the original text
+
+    Args:
+        text (str): text
+        ignore_case (bool): flag to ignore case
+        ignore_non_words (bool): flag to ignore non-word symbols
+
+    Returns:
+        tuple[str, list[int], list[int], list[int] | None]: normalized text, 
+            offsets of the replaced non-word runs in the normalized text, 
+            cumulative number of removed chars after each run
+            and the original offsets of the lowercased text (see lower_text)
+    """
+    origin = None
+    if ignore_case:
+        text, origin = lower_text(text)
+    run_starts = []
+    removed = []
+    if ignore_non_words:
+        buf = []
+        offset = 0
+        total = 0
+        new_len = 0
+        for m in re_non_words.finditer(text):
+            buf.append(text[offset:m.start()])
+            new_len += m.start() - offset
+            buf.append(' ')
+            run_starts.append(new_len)
+            new_len += 1
+            total += m.end() - m.start() - 1
+            removed.append(total)
+            offset = m.end()
+        buf.append(text[offset:])
+        text = ''.join(buf)
+    return text, run_starts, removed, origin
+
+
+def to_original_offset(pos: int,
+                       run_starts: list[int],
+                       removed: list[int],
+                       origin: list[int] | None = None) -> int:
+    """
+    Maps offset in the normalized text into the original text offset
+
+    Args:
+        pos (int): offset in the normalized text
+        run_starts (list[int]): see normalize_text
+        removed (list[int]): see normalize_text
+        origin (list[int] | None, optional): see normalize_text. Defaults to None.
+
+    Returns:
+        int: offset in the original text
+    """
+    runs = bisect_left(run_starts, pos)
+    if runs > 0:
+        pos += removed[runs - 1]
+    if origin is not None:
+        pos = origin[min(pos, len(origin) - 1)]
+    return pos
+
+
+def make_matches(spans: list[tuple[int, int]],
+                 text: str,
+                 run_starts: list[int],
+                 removed: list[int],
+                 origin: list[int] | None = None) -> list[SearchMatch]:
+    """
+    Converts spans in the normalized text into matches
+
+    Args:
+        spans (list[tuple[int, int]]): sorted spans in the normalized text
+        text (str): original text
+        run_starts (list[int]): see normalize_text
+        removed (list[int]): see normalize_text
+        origin (list[int] | None, optional): see normalize_text. Defaults to None.
+
+    Returns:
+        list[SearchMatch]: matches with original offsets and line numbers
+    """
+    matches = []
+    line = 1
+    last_pos = 0
+    for start, end in spans:
+        start = min(to_original_offset(start, run_starts, removed, origin),
+                    len(text))
+        end = min(to_original_offset(end, run_starts, removed, origin),
+                  len(text))
+        line += text.count('\n', last_pos, start)
+        last_pos = start
+        matches.append(SearchMatch(start, end, line))
+    return matches
+
+
 def generate_formula_check_results(
     formula: str,
     vault: str,
-) -> Generator[tuple[str, str], None, None]:
+) -> Generator[tuple[str, str], None, bool | None]:
     """
     Returns a generator of results after the formula check
 
@@ -43,6 +222,9 @@ def generate_formula_check_results(
 
     Yields:
         [tuple[str, str], None, None]: a generator of results: filename and empty string (no context)
+
+    Returns:
+        bool | None: False if the search failed and the results are incomplete
     """
     try:
         filter = FieldFilter(formula)
@@ -57,12 +239,42 @@ def generate_formula_check_results(
                     vault,
                     details=get_traceback(e),
                     user=get_user())
+        return False
+
+
+def generate_query_check_results(
+    query: str,
+    vault: str,
+) -> Generator[tuple[str, str], None, bool | None]:
+    """
+    Returns a generator of results for the combined query, see obsiflask.query
+
+    Args:
+        query (str): combined query
+        vault (str): vault name
+
+    Yields:
+        Generator[tuple[str, str], None, None]: a generator of results: filename and empty string (no context)
+
+    Returns:
+        bool | None: False if the search failed and the results are incomplete
+    """
+    try:
+        for path in execute_query(query, vault):
+            yield path, ""
+    except Exception as e:
+        add_message('Error during query search',
+                    type_to_int['error'],
+                    vault,
+                    details=get_traceback(e),
+                    user=get_user())
+        return False
 
 
 def generate_tags_check_results(
     tag: str,
     vault: str,
-) -> Generator[tuple[str, str], None, None]:
+) -> Generator[tuple[str, str], None, bool | None]:
     """
     Returns a generator of results after the search by tag
 
@@ -72,6 +284,9 @@ def generate_tags_check_results(
 
     Yields:
         Generator[tuple[str, str], None, None]: a generator of results: filename and empty string (no context)
+
+    Returns:
+        bool | None: False if the search failed and the results are incomplete
     """
     try:
         query = tag.lstrip('#').strip()
@@ -92,13 +307,14 @@ def generate_tags_check_results(
                     vault,
                     details=get_traceback(e),
                     user=get_user())
+        return False
 
 
 def generate_links_check_results(
         query: str,
         vault: str,
         forward: bool = True,
-        local: bool = True) -> Generator[tuple[str, str], None, None]:
+        local: bool = True) -> Generator[tuple[str, str], None, bool | None]:
     """Returns a generator of results after the search by link (mention)
 
     Args:
@@ -109,6 +325,9 @@ def generate_links_check_results(
 
     Yields:
         Generator[tuple[str, str], None, None]: a generator of results: filename and empty string (no context)
+
+    Returns:
+        bool | None: False if the search failed and the results are incomplete
     """
 
     ids_to_search = set()
@@ -138,6 +357,7 @@ def generate_links_check_results(
                     vault,
                     details=get_traceback(e),
                     user=get_user())
+        return False
 
 
 def generate_text_check_results(
@@ -149,7 +369,8 @@ def generate_text_check_results(
     only_md: bool = True,
     fuzzy_window_coef: float = 2.0,
     inclusion_percent: float = 0.75,
-) -> Generator[tuple[str, str], None, None]:
+    max_matches: int = SEARCH_MAX_MATCHES,
+) -> Generator[tuple[str, SearchHit], None, bool | None]:
     """
     Returns a generator of results after the text search
 
@@ -165,9 +386,14 @@ def generate_text_check_results(
             Defaults to 2.0.
         inclusion_percent (float, optional): percentage of words in a window to match during fuzzy search. 
             Defaults to 0.75.
+        max_matches (int, optional): maximal number of matches per file. Defaults to SEARCH_MAX_MATCHES.
 
     Yields:
-        Generator[tuple[str, str], None, None]: a generator of results: filename and a context string 
+        Generator[tuple[str, SearchHit], None, None]: a generator of results: filename and found matches
+
+    Returns:
+        bool | None: False if the search failed or some files could not be read,
+            so the results are incomplete
     """
     assert mode in [
         'exact',
@@ -175,7 +401,9 @@ def generate_text_check_results(
         'fuzzy',
     ]
 
-    graph: Graph = AppState.graphs[vault]
+    text_index: TextIndex = AppState.text_indices[vault]
+    vault_path = AppState.indices[vault].path
+    complete = True
 
     try:
         if ignore_case:
@@ -186,29 +414,33 @@ def generate_text_check_results(
         if mode == 'regex':
             query_re = re.compile(query)
 
-        graph_results = graph.build(True)
-        for file in graph_results.files:
-            if only_md and file.vault_path.suffix != '.md':
+        AppState.indices[vault].check_refresh()
+        paths = text_index.get_paths()
+        if mode == 'exact' and not ignore_non_words:
+            candidates = text_index.candidates(query)
+            if candidates is not None:
+                paths = [p for p in paths if p in candidates]
+        for path in paths:
+            if only_md and path.suffix != '.md':
                 continue
-            if os.path.getsize(file.real_path) > MAX_FILE_SIZE_MARKDOWN:
-                logger.warning(
-                    f'skipping {file.vault_path} due to size limit {MAX_FILE_SIZE_MARKDOWN/1024/1024} MB'
-                )
-            with obf_open(file.real_path, vault) as inp:
-                text = inp.read()
-                if ignore_case:
-                    text = text.lower()
-                if ignore_non_words:
-                    text = re_non_words.sub(' ', text)
-                if mode == 'regex':
-                    res = compare_regex(query_re, text)
-                if mode == 'exact':
-                    res = compare_exact(query, text)
-                if mode == 'fuzzy':
-                    res = compare_fuzzy(query, text, fuzzy_window_coef,
-                                        inclusion_percent)
-                if res:
-                    yield str(file.vault_path), res
+            text = text_index.get_text(path)
+            if text is None:
+                # deleted or unreadable
+                complete = False
+                continue
+            norm_text, run_starts, removed, origin = normalize_text(
+                text, ignore_case, ignore_non_words)
+            if mode == 'regex':
+                spans = compare_regex(query_re, norm_text, max_matches)
+            if mode == 'exact':
+                spans = compare_exact(query, norm_text, max_matches)
+            if mode == 'fuzzy':
+                spans = compare_fuzzy(query, norm_text, fuzzy_window_coef,
+                                      inclusion_percent, max_matches)
+            if spans:
+                yield str(path.relative_to(vault_path)), SearchHit(
+                    path,
+                    make_matches(spans, text, run_starts, removed, origin))
 
     except Exception as e:
         add_message('Error during text search',
@@ -216,79 +448,124 @@ def generate_text_check_results(
                     vault,
                     details=get_traceback(e),
                     user=get_user())
+        return False
+    return complete
 
 
 def compare_fuzzy(query: str, text: str, fuzzy_window_coef: float,
-                  inclusion_percent: float) -> str | None:
+                  inclusion_percent: float,
+                  max_matches: int = SEARCH_MAX_MATCHES) -> list[tuple[int, int]]:
     """
     Fuzzy comparison function.
     Takes the window of size len(query) (in words) * fuzzy_window_coef.
-    Returns result if in this window we can find (inclusion_percent * 100) % of query tokens
+    Returns result if in this window we can find (inclusion_percent * 100) % of query tokens.
+    The found windows do not overlap.
 
     Args:
         query (str):  query string
         text (str): text
         fuzzy_window_coef (float): window size coefficient
         inclusion_percent (float): percentage of tokens to detect match
+        max_matches (int, optional): maximal number of matches. Defaults to SEARCH_MAX_MATCHES.
 
     Returns:
-        str | None: matched context  or None if not found
+        list[tuple[int, int]]: spans of the matched windows
     """
     tokenizer = nltk.tokenize.WordPunctTokenizer()
     query = set(tokenizer.tokenize(query))
     text_tokenization = list(tokenizer.span_tokenize(text))
     window_size = max(1, int(fuzzy_window_coef * len(query)))
-    for i in range(len(text_tokenization)):
+    spans = []
+    i = 0
+    while i < len(text_tokenization) and len(spans) < max_matches:
         window = text_tokenization[i:i + window_size]
         text_tokens = set([text[w[0]:w[1]] for w in window])
         if (len(text_tokens & query)) / (max(1,
                                              len(query))) >= inclusion_percent:
-            min_pos = max(0, window[0][0] - SEARCH_PREVIEW_CHARS)
-            max_pos = window[-1][1] + SEARCH_PREVIEW_CHARS
-            before = escape(text[min_pos:window[0][0]])
-            match = text[window[0][0]:window[-1][1]]
-            after = escape(text[window[-1][1]:max_pos])
-            return f'{before}<strong>{match}</strong>{after}'
+            spans.append((window[0][0], window[-1][1]))
+            i += len(window)
+        else:
+            i += 1
+    return spans
 
 
-def compare_exact(query: str, text: str) -> str | None:
+def compare_exact(query: str,
+                  text: str,
+                  max_matches: int = SEARCH_MAX_MATCHES) -> list[tuple[int, int]]:
     """Exact comparison function.
 
     Args:
         query (str):  query string
         text (str): text
+        max_matches (int, optional): maximal number of matches. Defaults to SEARCH_MAX_MATCHES.
 
     Returns:
-        str | None: matched context  or None if not found
+        list[tuple[int, int]]: spans of the matches
     """
-    if query not in text:
-        return None
-    index = text.index(query)
-    min_pos = max(0, index - SEARCH_PREVIEW_CHARS)
-    max_pos = index + len(query) + SEARCH_PREVIEW_CHARS
-    return f'{escape(text[min_pos:index])}<strong>{escape(query)}</strong>{escape(text[index+len(query):max_pos])}'
+    spans = []
+    index = text.find(query)
+    while index >= 0 and len(spans) < max_matches:
+        spans.append((index, index + len(query)))
+        index = text.find(query, index + max(1, len(query)))
+    return spans
 
 
-def compare_regex(query_re: re.Pattern, text: str) -> str | None:
-    """Rege comparison function.
+def compare_regex(query_re: re.Pattern,
+                  text: str,
+                  max_matches: int = SEARCH_MAX_MATCHES) -> list[tuple[int, int]]:
+    """Regex comparison function.
 
     Args:
         query_re (re.Pattern):  regex from query string
         text (str): text
+        max_matches (int, optional): maximal number of matches. Defaults to SEARCH_MAX_MATCHES.
 
     Returns:
-        str | None: matched context or None if not found
+        list[tuple[int, int]]: spans of the matches
     """
-    found = query_re.search(text)
-    if found:
-        span = found.span()
-        min_pos = max(0, span[0] - SEARCH_PREVIEW_CHARS)
-        max_pos = span[1] + SEARCH_PREVIEW_CHARS
-        before = escape(text[min_pos:span[0]])
-        match = escape(text[span[0]:span[1]])
-        after = escape(text[span[1]:max_pos])
-        return f'{before}<strong>{match}</strong>{after}'
-    return None
+    spans = []
+    for found in query_re.finditer(text):
+        spans.append(found.span())
+        if len(spans) >= max_matches:
+            break
+    return spans
+
+
+def make_search_key(query: str, mode: str, ignore_case: bool,
+                    ignore_non_words: bool, fuzzy_window: float,
+                    fuzzy_ratio: float, local_link: bool) -> tuple:
+    """
+    Makes a key for the search cache.
+    Only the flags that affect the results for the mode are used,
+    so equivalent searches share the same entry.
+    Note that results do not depend on the user: 
+    the access is checked per vault, and the cache is per vault as well.
+
+    Args:
+        query (str): search query
+        mode (str): search mode
+        ignore_case (bool): flag to ignore case
+        ignore_non_words (bool): flag to ignore non-word symbols
+        fuzzy_window (float): fuzzy search window coefficient
+        fuzzy_ratio (float): fuzzy search inclusion ratio
+        local_link (bool): flag for local link search
+
+    Returns:
+        tuple: cache key
+    """
+    query = query.strip()
+    if mode == 'tags':
+        return (mode, query.lstrip('#').strip())
+    if mode in ['forward', 'backward']:
+        return (mode, query.lstrip('./'), local_link)
+    if mode in ['formula', 'query']:
+        return (mode, query)
+    if ignore_case:
+        query = query.lower()
+    if mode == 'fuzzy':
+        return (mode, query, ignore_case, ignore_non_words, fuzzy_window,
+                fuzzy_ratio)
+    return (mode, query, ignore_case, ignore_non_words)
 
 
 def render_search(vault: str) -> str | Generator[str, None, None]:
@@ -305,7 +582,8 @@ def render_search(vault: str) -> str | Generator[str, None, None]:
     query = request.args.get("q")
     mode = request.args.get('mode') or 'exact'
     if mode not in [
-            'exact', 'regex', 'tags', 'fuzzy', 'forward', 'backward', 'formula'
+            'exact', 'regex', 'tags', 'fuzzy', 'forward', 'backward',
+            'formula', 'query'
     ]:
         add_message(f'could not parse mode: {mode}',
                     type_to_int['error'],
@@ -341,7 +619,17 @@ def render_search(vault: str) -> str | Generator[str, None, None]:
     results = []
     if query:
         render_func = stream_template
-        if mode == 'tags':
+        cache = AppState.search_caches[vault]
+        cache_key = make_search_key(query, mode, ignore_case,
+                                    ignore_non_words, fuzzy_window,
+                                    fuzzy_ratio, local_link)
+        generation = AppState.indices[vault].get_generation()
+        cached = cache.get(cache_key, generation)
+        if mode in ['exact', 'regex', 'fuzzy']:
+            need_context = True
+        if cached is not None:
+            results = cached
+        elif mode == 'tags':
             results = generate_tags_check_results(query, vault)
         elif mode in ['forward', 'backward']:
             results = generate_links_check_results(query,
@@ -350,6 +638,8 @@ def render_search(vault: str) -> str | Generator[str, None, None]:
                                                    local=local_link)
         elif mode == 'formula':
             results = generate_formula_check_results(query, vault)
+        elif mode == 'query':
+            results = generate_query_check_results(query, vault)
         else:
             results = generate_text_check_results(
                 query,
@@ -359,7 +649,8 @@ def render_search(vault: str) -> str | Generator[str, None, None]:
                 inclusion_percent=fuzzy_ratio,
                 ignore_case=ignore_case,
                 ignore_non_words=ignore_non_words)
-            need_context = True
+        if cached is None:
+            results = cache.wrap(cache_key, generation, results)
 
     return render_func('search.html',
                        vault=vault,
@@ -0,0 +1,34 @@
+"""
+The module provides service statistics for the vault: cache counters, etc.
+"""
+from flask import jsonify
+
+from obsiflask.app_state import AppState
+from obsiflask.bases.cache import BaseCache
+
+
+def get_stats(vault: str) -> dict:
+    """
+    Gathers statistics for the vault
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        dict: dictionary with statistics
+    """
+    return {
+        'search_cache': AppState.search_caches[vault].stats(),
+        'base_cache': BaseCache.stats(vault),
+        'formula_cache': AppState.formula_caches[vault].stats()
+    }
+
+
+def render_stats(vault: str):
+    """
+    Returns statistics in json format
+
+    Args:
+        vault (str): vault name
+    """
+    return jsonify(get_stats(vault))
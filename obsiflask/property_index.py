@@ -0,0 +1,271 @@
+"""
+Property index: frontmatter keys and values of the vault notes.
+
+For each key the index stores the notes with each scalar value and
+with each element of list values, so the equality and "contains" predicates
+of Bases filters and search queries are answered without reading the notes.
+The frequencies of keys and values are used for autocomplete in the frontmatter.
+"""
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+from typing import Any, Hashable
+
+from obsiflask.app_state import AppState
+from obsiflask.file_index import FileIndexDelta
+from obsiflask.frontmatter_parser import parse_metadata
+from obsiflask.utils import logger
+
+SCALAR_TYPES = (str, int, float, bool)
+"""
+Types of the values that are indexed
+"""
+
+
+class PropertyIndex:
+    """
+    Frontmatter properties of the notes for one vault
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.lock = Lock()
+        self.ids: dict[Path, int] = {}
+        self.paths: list[Path | None] = []
+        # file id -> real path, None for removed notes
+        self.free_ids: list[int] = []
+        # ids of the removed notes to reuse
+        self.values: dict[str, dict[Hashable, set[int]]] = {}
+        # key -> scalar value -> file ids
+        self.elements: dict[str, dict[Hashable, set[int]]] = {}
+        # key -> element of list value -> file ids
+        self.keys: Counter[str] = Counter()
+        # key -> number of notes
+        self.complex_keys: Counter[str] = Counter()
+        # key -> number of notes, where the value cannot be indexed (e.g. dict)
+        self.doc_props: dict[int, list[tuple[str, str, Hashable]]] = {}
+        # file id -> ("value" | "element" | "complex" | "key", key, value), to remove the note
+        self.dirty: set[Path] = set()
+        self.initialized = False
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Marks changed notes for parsing
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.removed:
+                self._drop(path)
+                file_id = self.ids.pop(path, None)
+                if file_id is not None:
+                    self.paths[file_id] = None
+                    self.free_ids.append(file_id)
+                self.dirty.discard(path)
+            for path in delta.added | delta.modified:
+                if path.suffix == '.md':
+                    self.dirty.add(path)
+
+    def _drop(self, path: Path):
+        """
+        Removes the properties of the note. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+        """
+        file_id = self.ids.get(path)
+        if file_id is None:
+            return
+        for kind, key, value in self.doc_props.pop(file_id, []):
+            if kind == 'key':
+                self.keys[key] -= 1
+                if self.keys[key] <= 0:
+                    del self.keys[key]
+            elif kind == 'complex':
+                self.complex_keys[key] -= 1
+                if self.complex_keys[key] <= 0:
+                    del self.complex_keys[key]
+            else:
+                postings = self.values if kind == 'value' else self.elements
+                ids = postings[key][value]
+                ids.discard(file_id)
+                if not ids:
+                    del postings[key][value]
+                    if not postings[key]:
+                        del postings[key]
+
+    def _add(self, path: Path, props: dict[str, Any]):
+        """
+        Indexes the properties of the note. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+            props (dict[str, Any]): frontmatter
+        """
+        file_id = self.ids.get(path)
+        if file_id is None:
+            if self.free_ids:
+                file_id = self.free_ids.pop()
+                self.paths[file_id] = path
+            else:
+                file_id = len(self.paths)
+                self.paths.append(path)
+            self.ids[path] = file_id
+        records = []
+        for key, value in props.items():
+            key = str(key)
+            records.append(('key', key, None))
+            if isinstance(value, SCALAR_TYPES):
+                records.append(('value', key, value))
+            elif isinstance(value, list) and all(
+                    isinstance(v, SCALAR_TYPES) for v in value):
+                records.extend(('element', key, v) for v in set(value))
+            elif value is not None:
+                records.append(('complex', key, None))
+        for kind, key, value in records:
+            if kind == 'key':
+                self.keys[key] += 1
+            elif kind == 'complex':
+                self.complex_keys[key] += 1
+            else:
+                postings = self.values if kind == 'value' else self.elements
+                postings.setdefault(key, {}).setdefault(value,
+                                                        set()).add(file_id)
+        self.doc_props[file_id] = records
+
+    def _parse(self, path: Path):
+        """
+        Parses the frontmatter of the note. Must be called under the lock
+
+        Args:
+            path (Path): real path of the note
+        """
+        self._drop(path)
+        text = AppState.text_indices[self.vault].get_text(path)
+        if text is None:
+            return
+        try:
+            props = parse_metadata(text)
+        except Exception as e:
+            logger.debug(f'could not parse properties of {path}: {e}')
+            props = {}
+        self._add(path, props)
+
+    def _prepare(self):
+        """
+        Parses the changed notes
+        """
+        # the file index can call update(), so it is used before taking the lock
+        AppState.indices[self.vault].check_refresh()
+        with self.lock:
+            if not self.initialized:
+                self.dirty |= set(AppState.text_indices[self.vault].get_paths())
+                self.initialized = True
+            for path in list(self.dirty):
+                self._parse(path)
+            self.dirty.clear()
+
+    def _to_paths(self, ids: set[int]) -> set[Path]:
+        """
+        Converts file ids into paths. Must be called under the lock
+        """
+        return {self.paths[i] for i in ids}
+
+    def equal(self, key: str, value: Any) -> set[Path] | None:
+        """
+        Finds notes where the property is equal to the value
+
+        Args:
+            key (str): property name
+            value (Any): value
+
+        Returns:
+            set[Path] | None: real paths of the notes or None if the index cannot answer:
+                for empty values (missing properties are equal to "") and non-scalar values
+        """
+        if not isinstance(value, SCALAR_TYPES) or value == '':
+            return None
+        self._prepare()
+        with self.lock:
+            return self._to_paths(self.values.get(key, {}).get(value, set()))
+
+    def contains(self, key: str, value: Any) -> set[Path] | None:
+        """
+        Finds notes where the property contains the value:
+        list properties with the element, and string properties with the substring
+
+        Args:
+            key (str): property name
+            value (Any): element or substring
+
+        Returns:
+            set[Path] | None: real paths of the notes or None if the index cannot answer
+        """
+        if not isinstance(value, SCALAR_TYPES) or value == '':
+            return None
+        self._prepare()
+        with self.lock:
+            if self.complex_keys.get(key):
+                return None
+            ids = set(self.elements.get(key, {}).get(value, set()))
+            for v, v_ids in self.values.get(key, {}).items():
+                if isinstance(v, str):
+                    if not isinstance(value, str):
+                        return None  # the check would raise an error
+                    if value in v:
+                        ids |= v_ids
+                elif v_ids:
+                    return None  # "in" is not defined for numbers
+            return self._to_paths(ids)
+
+    def get_keys(self) -> list[tuple[str, int]]:
+        """
+        Returns property names with the number of notes
+
+        Returns:
+            list[tuple[str, int]]: names, most frequent first
+        """
+        self._prepare()
+        with self.lock:
+            return sorted(self.keys.items(), key=lambda x: (-x[1], x[0]))
+
+    def get_values(self, key: str) -> list[tuple[Any, int]]:
+        """
+        Returns values of the property (and elements of the list values) with the number of notes
+
+        Args:
+            key (str): property name
+
+        Returns:
+            list[tuple[Any, int]]: values, most frequent first
+        """
+        self._prepare()
+        counts = Counter()
+        with self.lock:
+            for postings in [self.values, self.elements]:
+                for value, ids in postings.get(key, {}).items():
+                    counts[value] += len(ids)
+        return sorted(counts.items(), key=lambda x: (-x[1], str(x[0])))
+
+
+def init_property_index(vault: str) -> PropertyIndex:
+    """
+    Creates a property index for the vault and subscribes it for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        PropertyIndex: property index
+    """
+    index = PropertyIndex(vault)
+    AppState.property_indices[vault] = index
+    AppState.indices[vault].add_listener(index.update)
+    return index
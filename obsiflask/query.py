@@ -0,0 +1,514 @@
+"""
+Combined search queries.
+
+The query language extends the Bases formula grammar (see obsiflask.bases.grammar)
+with the search predicates:
+    - #tag: notes with the tag
+    - text("some text"): notes containing the text (case-insensitive)
+    - linksto("note"): notes that link to the note
+    - linkedfrom("note"): notes that the note links to
+Equality and "contains" for frontmatter properties (e.g. status == "done")
+are answered by the property index.
+The predicates can be combined with the Bases expressions by "and", "or", "!", e.g.
+    text("deploy") and #ops and file.folder == "runbooks"
+
+The query is parsed into a tree of predicates.
+The planner evaluates the most selective indexed predicates first (tags, paths, text trigrams)
+and checks the remaining predicates only for the surviving candidates.
+"""
+import ast
+from pathlib import Path
+from typing import Callable, Generator, Any
+
+from lark import Lark, Token, v_args
+
+from obsiflask.app_state import AppState
+from obsiflask.bases.file_info import FileInfo
+from obsiflask.bases.grammar import FilterTransformer, grammar
+from obsiflask.graph import GraphRepr
+from obsiflask.text_index import read_text
+
+query_grammar = grammar + r"""
+%extend factor: TAG -> tag_
+
+TAG: /#[\w\/-]+/
+"""
+"""
+Bases grammar with hashtags
+"""
+
+PATH_FIELDS = {'path', 'folder', 'name', 'ext'}
+"""
+file.* fields that can be computed without reading the file
+"""
+
+
+class QueryContext:
+    """
+    Lazily gathered vault data shared by the predicates during one query
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self._graph: GraphRepr | None = None
+        self._tags: dict[str, set[Path]] | None = None
+        self._files: dict[Path, FileInfo] | None = None
+
+    @property
+    def graph(self) -> GraphRepr:
+        """
+        Graph of the vault
+        """
+        if self._graph is None:
+            self._graph = AppState.graphs[self.vault].build(True)
+        return self._graph
+
+    @property
+    def files(self) -> dict[Path, FileInfo]:
+        """
+        Notes of the vault: real path -> file info
+        """
+        if self._files is None:
+            self._files = {f.real_path: f for f in self.graph.files}
+        return self._files
+
+    @property
+    def tags(self) -> dict[str, set[Path]]:
+        """
+        Tag index: tag -> real paths
+        """
+        if self._tags is None:
+            self._tags = {}
+            for f in self.graph.files:
+                for tag in f.get_prop(['file', 'tags']):
+                    self._tags.setdefault(tag, set()).add(f.real_path)
+        return self._tags
+
+    def find_notes(self, name: str) -> set[int]:
+        """
+        Finds note ids in the graph by the path or local name
+
+        Args:
+            name (str): path w.r.t. vault or local name, with or without ".md"
+
+        Returns:
+            set[int]: note ids
+        """
+        name = name.lstrip('./')
+        result = set()
+        for f_id, f in enumerate(self.graph.files):
+            for path_version in [name, name + '.md']:
+                if str(f.vault_path) == path_version or str(
+                        f.vault_path.name) == path_version:
+                    result.add(f_id)
+        return result
+
+
+class QueryNode:
+    """
+    Abstract node of the query tree
+    """
+    cost: int = 0
+    """
+    Relative cost of the check for one file, used to order the predicates
+    """
+    exact: bool = True
+    """
+    If set, the candidates of the node contain only the files that satisfy the node
+    """
+
+    def candidates(self, ctx: QueryContext) -> set[Path] | None:
+        """
+        Returns files that can satisfy the node using indices
+
+        Args:
+            ctx (QueryContext): query context
+
+        Returns:
+            set[Path] | None: real paths or None if the node cannot be answered by indices
+        """
+        return None
+
+    def check(self, file: FileInfo, ctx: QueryContext) -> bool:
+        """
+        Checks the file
+
+        Args:
+            file (FileInfo): file to check
+            ctx (QueryContext): query context
+
+        Returns:
+            bool: True if the file satisfies the node
+        """
+        raise NotImplementedError()
+
+
+class AndNode(QueryNode):
+    """
+    Conjunction of predicates
+    """
+
+    def __init__(self, children: list[QueryNode]):
+        self.children = children
+        self.cost = max(c.cost for c in children)
+
+    def check(self, file, ctx):
+        for c in sorted(self.children, key=lambda c: c.cost):
+            if not c.check(file, ctx):
+                return False
+        return True
+
+
+class OrNode(QueryNode):
+    """
+    Disjunction of predicates
+    """
+
+    def __init__(self, children: list[QueryNode]):
+        self.children = children
+        self.cost = max(c.cost for c in children)
+
+    def check(self, file, ctx):
+        for c in sorted(self.children, key=lambda c: c.cost):
+            if c.check(file, ctx):
+                return True
+        return False
+
+
+class NotNode(QueryNode):
+    """
+    Negation of predicate
+    """
+
+    def __init__(self, child: QueryNode):
+        self.child = child
+        self.cost = child.cost
+
+    def check(self, file, ctx):
+        return not self.child.check(file, ctx)
+
+
+class TagPredicate(QueryNode):
+    """
+    Note has a tag
+    """
+    cost = 1
+
+    def __init__(self, tag: str):
+        self.tag = tag.lstrip('#').strip()
+
+    def candidates(self, ctx):
+        return set(ctx.tags.get(self.tag, set()))
+
+    def check(self, file, ctx):
+        return self.tag in file.get_prop(['file', 'tags'])
+
+
+class PathPredicate(QueryNode):
+    """
+    Equality of file.path, file.folder, file.name or file.ext.
+    Can be checked without reading the file
+    """
+    cost = 0
+
+    def __init__(self, field: str, value: Any):
+        self.field = field
+        self.value = value
+
+    def candidates(self, ctx):
+        return {p for p, f in ctx.files.items() if self.check(f, ctx)}
+
+    def check(self, file, ctx):
+        return file.get_prop(['file', self.field]) == self.value
+
+
+class LinkPredicate(QueryNode):
+    """
+    Note links to the target (forward=False) or
+    is linked from the target (forward=True)
+    """
+    cost = 1
+
+    def __init__(self, target: str, forward: bool):
+        self.target = target
+        self.forward = forward
+        self._candidates: set[Path] | None = None
+
+    def candidates(self, ctx):
+        if self._candidates is not None:
+            return self._candidates
+        targets = ctx.find_notes(self.target)
+        result = set()
+        for edge in ctx.graph.edges:
+            if self.forward:
+                vertex, vertex2 = edge
+            else:
+                vertex2, vertex = edge
+            if vertex in targets and vertex2 < len(ctx.graph.files):
+                result.add(ctx.graph.files[vertex2].real_path)
+        self._candidates = result
+        return result
+
+    def check(self, file, ctx):
+        return file.real_path in self.candidates(ctx)
+
+
+class TextPredicate(QueryNode):
+    """
+    Note contains the text (case-insensitive)
+    """
+    cost = 3
+    exact = False  # trigrams give only the candidates
+
+    def __init__(self, text: str):
+        self.text = text.lower()
+
+    def candidates(self, ctx):
+        return AppState.text_indices[ctx.vault].candidates(self.text)
+
+    def check(self, file, ctx):
+        return self.text in read_text(file.real_path, ctx.vault).lower()
+
+
+class PropertyPredicate(QueryNode):
+    """
+    Frontmatter property is equal to the value or contains it,
+    answered by the property index when possible
+    """
+    cost = 2
+
+    def __init__(self, key: str, value: Any, contains: bool,
+                 func: Callable[[FileInfo], Any]):
+        self.key = key
+        self.value = value
+        self.contains = contains
+        self.func = func
+
+    def candidates(self, ctx):
+        index = AppState.property_indices[ctx.vault]
+        if self.contains:
+            return index.contains(self.key, self.value)
+        return index.equal(self.key, self.value)
+
+    def check(self, file, ctx):
+        return bool(self.func(file))
+
+
+class FormulaPredicate(QueryNode):
+    """
+    Bases formula
+    """
+    cost = 2
+
+    def __init__(self, func: Callable[[FileInfo], Any]):
+        self.func = func
+
+    def check(self, file, ctx):
+        return bool(self.func(file))
+
+
+class _Attr:
+    """
+    Callable for attribute access that remembers the attribute names
+    """
+
+    def __init__(self, names: tuple[str]):
+        self.names = names
+
+    def __call__(self, ctx):
+        return ctx.get_prop(self.names)
+
+
+class _Const:
+    """
+    Callable for constants that remembers the value
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self, ctx):
+        return self.value
+
+
+def _as_node(expr: QueryNode | Callable) -> QueryNode:
+    """
+    Wraps Bases formulas into a predicate node
+    """
+    if isinstance(expr, QueryNode):
+        return expr
+    return FormulaPredicate(expr)
+
+
+@v_args(inline=True)
+class QueryTransformer(FilterTransformer):
+    """
+    Transforms a parsed query into the tree of predicates.
+    Bases expressions inside are transformed with FilterTransformer
+    """
+
+    def attr(self, *attr):
+        return _Attr(tuple(str(a) for a in attr))
+
+    def number(self, tok):
+        return _Const(float(tok) if "." in tok else int(tok))
+
+    def string(self, tok):
+        return _Const(ast.literal_eval(tok))
+
+    def start(self, expr):
+        return _as_node(expr)
+
+    def tag_(self, tok):
+        return TagPredicate(str(tok))
+
+    def method(self, *args):
+        names = [
+            str(a) for a in args if isinstance(a, Token) and a.type == 'NAME'
+        ]
+        if len(names) == 1 and names[0] in ['text', 'linksto', 'linkedfrom']:
+            values = []
+            for a in args:
+                if a is not None and not isinstance(a, Token):
+                    values.extend(a.children)
+            if len(values) != 1 or not isinstance(values[0], _Const):
+                raise ValueError(f'{names[0]} requires 1 constant argument')
+            value = str(values[0].value)
+            if names[0] == 'text':
+                return TextPredicate(value)
+            return LinkPredicate(value, forward=names[0] == 'linkedfrom')
+        func = super().method(*args)
+        if len(names) == 2 and names[1] == 'contains' and names[0] != 'file':
+            values = [
+                v for a in args if a is not None and not isinstance(a, Token)
+                for v in a.children
+            ]
+            if len(values) == 1 and isinstance(values[0], _Const):
+                return PropertyPredicate(names[0], values[0].value, True,
+                                         func)
+        return func
+
+    def binop(self, left, op, right):
+        if isinstance(left, QueryNode) or isinstance(right, QueryNode):
+            raise ValueError('search predicates cannot be compared')
+        if str(op) == '==':
+            if isinstance(right, _Attr):
+                left, right = right, left
+            if (isinstance(left, _Attr) and isinstance(right, _Const)
+                    and len(left.names) == 2 and left.names[0] == 'file'
+                    and left.names[1] in PATH_FIELDS):
+                return PathPredicate(left.names[1], right.value)
+            if (isinstance(left, _Attr) and isinstance(right, _Const)
+                    and len(left.names) == 1 and left.names[0] != 'file'):
+                return PropertyPredicate(left.names[0], right.value, False,
+                                         super().binop(left, op, right))
+        return super().binop(left, op, right)
+
+    def and_(self, a, b):
+        if isinstance(a, QueryNode) or isinstance(b, QueryNode):
+            children = []
+            for c in [_as_node(a), _as_node(b)]:
+                children.extend(c.children if isinstance(c, AndNode) else [c])
+            return AndNode(children)
+        return super().and_(a, b)
+
+    def or_(self, a, b):
+        if isinstance(a, QueryNode) or isinstance(b, QueryNode):
+            children = []
+            for c in [_as_node(a), _as_node(b)]:
+                children.extend(c.children if isinstance(c, OrNode) else [c])
+            return OrNode(children)
+        return super().or_(a, b)
+
+    def not_(self, func):
+        if isinstance(func, QueryNode):
+            return NotNode(func)
+        return super().not_(func)
+
+
+_parser = Lark(query_grammar, start="start", parser="lalr")
+
+
+def parse_query(query: str) -> QueryNode:
+    """
+    Parses the query into the tree of predicates
+
+    Args:
+        query (str): query
+
+    Returns:
+        QueryNode: root of the tree
+    """
+    return _as_node(QueryTransformer().transform(_parser.parse(query)))
+
+
+def plan(node: QueryNode,
+         ctx: QueryContext) -> tuple[set[Path] | None, list[QueryNode]]:
+    """
+    Plans the query evaluation.
+    For conjunctions, intersects the candidates of indexed predicates starting from the most selective one.
+    The predicates that are not answered exactly by the indices are returned as residuals
+
+    Args:
+        node (QueryNode): query node
+        ctx (QueryContext): query context
+
+    Returns:
+        tuple[set[Path] | None, list[QueryNode]]: candidates (None if all the files must be checked)
+            and the list of predicates to check for each candidate
+    """
+    if isinstance(node, AndNode):
+        plans = [plan(c, ctx) for c in node.children]
+        candidates = None
+        residuals = []
+        for c, r in sorted(plans,
+                           key=lambda p: float('inf')
+                           if p[0] is None else len(p[0])):
+            if c is not None:
+                candidates = c if candidates is None else candidates & c
+            residuals.extend(r)
+        return candidates, sorted(residuals, key=lambda r: r.cost)
+    if isinstance(node, OrNode):
+        plans = [plan(c, ctx) for c in node.children]
+        if any(c is None for c, _ in plans):
+            return None, [node]
+        candidates = set().union(*[c for c, _ in plans])
+        if any(r for _, r in plans):
+            return candidates, [node]
+        return candidates, []
+    if isinstance(node, NotNode):
+        return None, [node]
+    candidates = node.candidates(ctx)
+    if candidates is not None and node.exact:
+        return candidates, []
+    return candidates, [node]
+
+
+def execute_query(query: str, vault: str) -> Generator[str, None, None]:
+    """
+    Evaluates the query
+
+    Args:
+        query (str): query
+        vault (str): vault name
+
+    Yields:
+        Generator[str, None, None]: paths of the found notes w.r.t. vault
+    """
+    root = parse_query(query)
+    ctx = QueryContext(vault)
+    candidates, residuals = plan(root, ctx)
+    if candidates is None:
+        candidates = ctx.files.keys()
+    for path in sorted(candidates):
+        file = ctx.files.get(path)
+        if file is None:
+            continue
+        if all(r.check(file, ctx) for r in residuals):
+            yield str(file.vault_path)
@@ -0,0 +1,195 @@
+"""
+Vault-wide find and replace.
+
+Candidate notes are selected with the text index (trigrams for exact search),
+so only the notes that may contain the pattern are processed.
+The replacement is computed in two steps: a dry run that builds the changes with diffs for preview,
+and applying, which writes the changed notes in parallel and
+passes all of them to the file index as a single change batch.
+"""
+import difflib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from flask_wtf import FlaskForm
+from wtforms import StringField, BooleanField, HiddenField, SubmitField
+from wtforms.validators import DataRequired
+
+from obsiflask.app_state import AppState
+from obsiflask.encrypt.obfuscate import obf_write_atomic
+from obsiflask.file_index import FileIndex
+from obsiflask.text_index import TextIndex
+from obsiflask.utils import logger
+
+REPLACE_WORKERS = 8
+"""
+Number of threads to write the files
+"""
+DIFF_CONTEXT_LINES = 1
+"""
+Number of context lines in the preview diff
+"""
+
+
+class ReplaceForm(FlaskForm):
+    """
+    A form for find and replace
+    """
+    pattern = StringField('Find', validators=[DataRequired()])
+    replacement = StringField('Replace with')
+    regex = BooleanField('Regex', default=False)
+    ignore_case = BooleanField('Ignore case', default=False)
+    generation = HiddenField()
+    """
+    Generation of the file index, for which the preview was shown
+    """
+    preview = SubmitField('Preview')
+    apply = SubmitField('Apply')
+
+
+@dataclass
+class FileChange:
+    """
+    Replacement in one note
+    """
+    real_path: Path
+    """
+    Full path of the note
+    """
+    path: str
+    """
+    Path w.r.t. vault
+    """
+    signature: tuple[int, int]
+    """
+    Signature of the file, for which the change was computed
+    """
+    old_text: str
+    """
+    Current content
+    """
+    new_text: str
+    """
+    Content after the replacement
+    """
+    count: int
+    """
+    Number of replacements
+    """
+
+    def get_diff(self) -> str:
+        """
+        Returns a unified diff of the change
+
+        Returns:
+            str: diff
+        """
+        return ''.join(
+            difflib.unified_diff(self.old_text.splitlines(keepends=True),
+                                 self.new_text.splitlines(keepends=True),
+                                 fromfile=self.path,
+                                 tofile=self.path,
+                                 n=DIFF_CONTEXT_LINES))
+
+
+def find_replacements(vault: str,
+                      pattern: str,
+                      replacement: str,
+                      regex: bool = False,
+                      ignore_case: bool = False) -> list[FileChange]:
+    """
+    Computes replacements without changing the files (dry run)
+
+    Args:
+        vault (str): vault name
+        pattern (str): text or regex to find
+        replacement (str): replacement. For regex, groups can be referenced as in re.sub
+        regex (bool, optional): if set, pattern is a regular expression. Defaults to False.
+        ignore_case (bool, optional): flag to ignore case. Defaults to False.
+
+    Returns:
+        list[FileChange]: changes for the notes that contain the pattern, sorted by path
+    """
+    if pattern == '':
+        raise ValueError('Empty pattern')
+    text_index: TextIndex = AppState.text_indices[vault]
+    vault_path = AppState.indices[vault].path
+    flags = re.IGNORECASE if ignore_case else 0
+    if regex:
+        compiled = re.compile(pattern, flags)
+        candidates = None
+    else:
+        compiled = re.compile(re.escape(pattern), flags)
+        # escaping the replacement, so it is used as is
+        replacement = replacement.replace('\\', '\\\\')
+        candidates = text_index.candidates(pattern)
+    AppState.indices[vault].check_refresh()
+    changes = []
+    for path in text_index.get_paths():
+        if candidates is not None and path not in candidates:
+            continue
+        signature = FileIndex._get_signature(path)
+        text = text_index.get_text(path)
+        if text is None:
+            continue
+        new_text, count = compiled.subn(replacement, text)
+        if count > 0 and new_text != text:
+            changes.append(
+                FileChange(path, str(path.relative_to(vault_path)),
+                           signature, text, new_text, count))
+    return changes
+
+
+def _write_change(vault: str, change: FileChange) -> bool:
+    """
+    Writes one change if the file was not modified since the dry run
+
+    Args:
+        vault (str): vault name
+        change (FileChange): change
+
+    Returns:
+        bool: True if the file was written
+    """
+    if FileIndex._get_signature(change.real_path) != change.signature:
+        logger.warning(
+            f'{change.path} was modified after the preview, skipping replacement'
+        )
+        return False
+    obf_write_atomic(change.real_path, vault, change.new_text)
+    return True
+
+
+def apply_replacements(vault: str,
+                       changes: list[FileChange]) -> tuple[list[str], list[str]]:
+    """
+    Writes the changes in parallel and notifies the file index once for all of them
+
+    Args:
+        vault (str): vault name
+        changes (list[FileChange]): changes from find_replacements
+
+    Returns:
+        tuple[list[str], list[str]]: paths of changed notes and
+            paths of notes skipped because of concurrent modifications or errors
+    """
+    written = []
+    skipped = []
+    with ThreadPoolExecutor(max_workers=REPLACE_WORKERS) as pool:
+        futures = [(change, pool.submit(_write_change, vault, change))
+                   for change in changes]
+        for change, future in futures:
+            try:
+                ok = future.result()
+            except Exception as e:
+                logger.error(f'could not write {change.path}: {e}')
+                ok = False
+            if ok:
+                written.append(change)
+            else:
+                skipped.append(change)
+    if written:
+        AppState.indices[vault].apply_changes([c.real_path for c in written])
+    return [c.path for c in written], [c.path for c in skipped]
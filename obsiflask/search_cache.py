@@ -0,0 +1,154 @@
+"""
+LRU cache for search results.
+Each vault has its own cache, the entries are tagged with the generation of the vault file index,
+so the results are dropped as soon as the vault is changed.
+Note that the file index notices the changes made outside the app only when it is refreshed
+(see VaultConfig.file_index_update_time), so until then the cached results can be stale
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Generator, Iterable
+
+
+class SearchCache:
+    """
+    Memory-bounded LRU cache for search results
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Constructor
+
+        Args:
+            max_bytes (int): maximal total size of the cached results (approximate, in bytes)
+        """
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, tuple[list[tuple[str, str]],
+                                               int]] = OrderedDict()
+        self.generation = -1
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def result_size(results: list[tuple[str, Any]]) -> int:
+        """
+        Approximate size of results
+
+        Args:
+            results (list[tuple[str, Any]]): list of search results: 
+                file name and a context string or an object with "nbytes" property
+
+        Returns:
+            int: size in bytes
+        """
+        return sum(
+            len(path) +
+            (len(context) if isinstance(context, str) else context.nbytes)
+            for path, context in results)
+
+    def _check_generation(self, generation: int):
+        """
+        Drops all the entries if the generation was changed.
+        Must be called under the lock
+
+        Args:
+            generation (int): current generation of the vault
+        """
+        if generation != self.generation:
+            self.entries.clear()
+            self.total_bytes = 0
+            self.generation = generation
+
+    def get(self, key: tuple,
+            generation: int) -> list[tuple[str, str]] | None:
+        """
+        Returns cached results
+
+        Args:
+            key (tuple): search parameters
+            generation (int): current generation of the vault
+
+        Returns:
+            list[tuple[str, str]] | None: results or None if not found
+        """
+        with self.lock:
+            self._check_generation(generation)
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+
+    def put(self, key: tuple, generation: int,
+            results: list[tuple[str, str]]):
+        """
+        Saves results into the cache, evicting least recently used entries if needed
+
+        Args:
+            key (tuple): search parameters
+            generation (int): generation of the vault, for which the results were computed
+            results (list[tuple[str, str]]): results to save
+        """
+        size = self.result_size(results)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self._check_generation(generation)
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (results, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+
+    def wrap(
+        self, key: tuple, generation: int, results: Iterable[tuple[str, str]]
+    ) -> Generator[tuple[str, str], None, None]:
+        """
+        Passes the results through and saves them if the iteration was finished.
+        Search generators report their errors themselves and return False,
+        such results are not saved
+
+        Args:
+            key (tuple): search parameters
+            generation (int): generation of the vault
+            results (Iterable[tuple[str, str]]): results to pass
+
+        Yields:
+            Generator[tuple[str, str], None, None]: same results
+        """
+        buf = []
+        results = iter(results)
+        while True:
+            try:
+                r = next(results)
+            except StopIteration as stop:
+                if stop.value is not False:
+                    self.put(key, generation, buf)
+                return
+            buf.append(r)
+            yield r
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns cache counters
+
+        Returns:
+            dict[str, int]: counters
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'generation': self.generation
+            }
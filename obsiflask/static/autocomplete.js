@@ -1,10 +1,10 @@
 const cm = easyMDE.codemirror;
 const menu = document.getElementById("autocomplete");
-async function fetchSuggestions(context) {
+async function fetchSuggestions(context, frontmatter = false) {
   const resp = await fetch(url_autocomplete, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ context })
+    body: JSON.stringify({ context, frontmatter })
   });
   return await resp.json(); // [{text: "...", erase: N}, ...]
 }
@@ -81,6 +81,15 @@ function insertCompletion(cm, suggestion) {
   cm.focus();
 }
 
+function isInFrontmatter(lineNumber) {
+  // the frontmatter starts at the first line and is closed by "---"
+  if (lineNumber === 0 || cm.getLine(0).trim() !== "---") return false;
+  for (let i = 1; i < lineNumber; i++) {
+    if (cm.getLine(i).trim() === "---") return false;
+  }
+  return true;
+}
+
 async function triggerAutocomplete() {
   const cursor = cm.getCursor();
   let context = cm.getLine(cursor.line).substring(0, cursor.ch);
@@ -89,7 +98,7 @@ async function triggerAutocomplete() {
   }
   context = context.slice(-256);
   const coords = cm.cursorCoords(cursor, "page");
-  const suggestions = await fetchSuggestions(context);
+  const suggestions = await fetchSuggestions(context, isInFrontmatter(cursor.line));
   if (suggestions.length > 0) showSuggestions(suggestions, coords.left, coords.bottom, s => insertCompletion(cm, s));
 }
 
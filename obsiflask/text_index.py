@@ -0,0 +1,486 @@
+"""
+Full-text index of the vault notes.
+Keeps trigram postings of markdown notes (including obfuscated ones) in memory,
+so search and replace read only the candidate files instead of all the notes.
+The texts are not kept: the candidates are read again to verify the matches.
+
+Each note gets an integer id, the postings are sets of ids.
+The postings of removed or changed notes are not cleaned up right away:
+the ids of these notes are skipped, and the postings are compacted
+when the number of such entries exceeds the number of the actual ones.
+
+The index is saved into the service_dir. Since the trigrams reveal the content of the notes,
+it is encrypted with the vault obfuscation key, like obfuscated binary files.
+"""
+import atexit
+import json
+import time
+import zlib
+from pathlib import Path
+from threading import Lock
+from typing import Iterable
+
+from obsiflask.app_state import AppState
+from obsiflask.consts import MAX_FILE_SIZE_MARKDOWN
+from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.file_index import FileIndex, FileIndexDelta
+from obsiflask.frontmatter_parser import FRONTMATTER_BOUNDARY
+from obsiflask.utils import logger, resolve_service_path, get_traceback
+
+TRIGRAM_ORDER = 3
+"""
+Order of ngrams used for candidate selection
+"""
+INDEX_VERSION = 1
+"""
+Version of the saved index format
+"""
+MIN_STALE_POSTINGS = 10000
+"""
+Postings are not compacted while they have less entries of the removed notes
+"""
+
+
+def get_trigrams(text: str) -> set[str]:
+    """
+    Returns a set of lowercased trigrams of the text
+
+    Args:
+        text (str): text
+
+    Returns:
+        set[str]: trigrams
+    """
+    text = text.lower()
+    return set(
+        map(''.join, zip(*[text[i:] for i in range(TRIGRAM_ORDER)])))
+
+
+class TextIndex:
+    """
+    In-memory trigram index of the notes for one vault
+    """
+
+    def __init__(self, vault: str):
+        """
+        Constructor
+
+        Args:
+            vault (str): vault name
+        """
+        self.vault = vault
+        self.ids: dict[Path, int] = {}
+        # real path -> file id
+        self.docs: dict[int, tuple[Path, tuple[int, int], int]] = {}
+        # file id -> real path, signature and number of trigrams
+        self.postings: dict[str, set[int]] = {}
+        # trigram -> file ids, including the ids of removed notes
+        self.next_id = 0
+        self.size = 0
+        # number of the entries in the postings for the indexed notes
+        self.stale = 0
+        # number of the entries in the postings for the removed notes
+        self.lock = Lock()
+        self.last_save_time = time.time()
+        self.dirty = False
+        self.save_path = self.get_save_path()
+        self.key = AppState.config.vaults[vault].obfuscation_key
+        self.save_time = AppState.config.vaults[vault].text_index_save_time
+
+    @staticmethod
+    def is_indexed(path: Path) -> bool:
+        """
+        Checks if the file should be indexed
+
+        Args:
+            path (Path): real path
+
+        Returns:
+            bool: True for markdown notes
+        """
+        return path.suffix == '.md'
+
+    def get_save_path(self) -> Path | None:
+        """
+        Path to save index.
+
+        Returns:
+            Path | None: path to save the index or None if service_dir is not set
+        """
+        if AppState.config.service_dir is None:
+            return None
+        return resolve_service_path(f'text_index_{self.vault}.bin')
+
+    def _get_signature(self, path: Path) -> tuple[int, int] | None:
+        """
+        Returns the signature of the indexed note. Must be called under the lock
+
+        Args:
+            path (Path): real path
+
+        Returns:
+            tuple[int, int] | None: signature or None if the note is not indexed
+        """
+        file_id = self.ids.get(path)
+        if file_id is None:
+            return None
+        return self.docs[file_id][1]
+
+    def _add_doc(self, path: Path, signature: tuple[int, int], text: str):
+        """
+        Adds a document into the index. Must be called under the lock
+
+        Args:
+            path (Path): real path
+            signature (tuple[int, int]): signature of the file
+            text (str): file content
+        """
+        self._remove_doc(path)
+        file_id = self.next_id
+        self.next_id += 1
+        trigrams = get_trigrams(text)
+        for trigram in trigrams:
+            if trigram not in self.postings:
+                self.postings[trigram] = set()
+            self.postings[trigram].add(file_id)
+        self.ids[path] = file_id
+        self.docs[file_id] = (path, signature, len(trigrams))
+        self.size += len(trigrams)
+        self.dirty = True
+
+    def _remove_doc(self, path: Path):
+        """
+        Removes a document from the index. Must be called under the lock.
+        Its postings are left until the compaction
+
+        Args:
+            path (Path): real path
+        """
+        file_id = self.ids.pop(path, None)
+        if file_id is None:
+            return
+        _, _, count = self.docs.pop(file_id)
+        self.size -= count
+        self.stale += count
+        self.dirty = True
+        if self.stale > max(self.size, MIN_STALE_POSTINGS):
+            self._compact()
+
+    def _compact(self):
+        """
+        Removes the ids of the removed notes from the postings. Must be called under the lock
+        """
+        for trigram, ids in list(self.postings.items()):
+            ids = {i for i in ids if i in self.docs}
+            if ids:
+                self.postings[trigram] = ids
+            else:
+                del self.postings[trigram]
+        self.stale = 0
+
+    def _read(self, path: Path, signature: tuple[int, int]) -> str | None:
+        """
+        Reads the file
+
+        Args:
+            path (Path): real path
+            signature (tuple[int, int]): signature of the file
+
+        Returns:
+            str | None: file content or None if the file cannot be indexed
+        """
+        if signature[1] > MAX_FILE_SIZE_MARKDOWN:
+            logger.warning(
+                f'skipping {path} in text index due to size limit {MAX_FILE_SIZE_MARKDOWN/1024/1024} MB'
+            )
+            return None
+        try:
+            with obf_open(path, self.vault) as inp:
+                return inp.read()
+        except Exception as e:
+            logger.warning(f'could not add {path} into text index: {e}')
+            return None
+
+    def _index(self, path: Path, signature: tuple[int, int],
+               text: str | None):
+        """
+        Puts the read file into the index. Must be called under the lock
+
+        Args:
+            path (Path): real path
+            signature (tuple[int, int]): signature of the file, for which the text was read
+            text (str | None): content or None if the file cannot be indexed
+        """
+        if text is None:
+            self._remove_doc(path)
+        elif self._get_signature(path) != signature:
+            self._add_doc(path, signature, text)
+
+    def update(self, delta: FileIndexDelta):
+        """
+        Applies changes of the vault.
+        Files with the same signature as in the index are not read
+
+        Args:
+            delta (FileIndexDelta): changes from the file index
+        """
+        with self.lock:
+            for path in delta.removed:
+                self._remove_doc(path)
+            to_read = []
+            for path in delta.added | delta.modified:
+                if not self.is_indexed(path):
+                    continue
+                signature = FileIndex._get_signature(path)
+                if self._get_signature(path) != signature:
+                    to_read.append((path, signature))
+        for path, signature in to_read:
+            text = self._read(path, signature)
+            with self.lock:
+                self._index(path, signature, text)
+        self.save(force=False)
+
+    def get_text(self, path: Path | str) -> str | None:
+        """
+        Reads the content of the note.
+        If the file was changed after indexing, updates its postings.
+
+        Args:
+            path (Path | str): real path
+
+        Returns:
+            str | None: content or None if the file is not indexed
+        """
+        path = Path(path)
+        if not self.is_indexed(path):
+            return None
+        signature = FileIndex._get_signature(path)
+        text = None if signature[0] < 0 else self._read(path, signature)
+        with self.lock:
+            self._index(path, signature, text)
+        return text
+
+    def get_paths(self) -> list[Path]:
+        """
+        Returns all the indexed files
+
+        Returns:
+            list[Path]: real paths
+        """
+        with self.lock:
+            return sorted(self.ids)
+
+    def candidates(self, query: str) -> set[Path] | None:
+        """
+        Returns files that may contain the query (case-insensitive)
+
+        Args:
+            query (str): text to find
+
+        Returns:
+            set[Path] | None: candidate paths or None if the query is too short to use the index
+        """
+        trigrams = get_trigrams(query)
+        if len(trigrams) == 0:
+            return None
+        with self.lock:
+            result = None
+            for trigram in sorted(trigrams,
+                                  key=lambda t: len(self.postings.get(t, ()))):
+                ids = self.postings.get(trigram)
+                if not ids:
+                    return set()
+                if result is None:
+                    result = set(ids)
+                else:
+                    result &= ids
+                if len(result) == 0:
+                    break
+            return {self.docs[i][0] for i in result if i in self.docs}
+
+    def save(self, force: bool = True):
+        """
+        Saves the index in encrypted form if it was changed
+
+        Args:
+            force (bool, optional): if not set, will save only if text_index_save_time 
+                passed since the last save. Defaults to True.
+        """
+        path = self.save_path
+        if path is None or not self.dirty:
+            return
+        if not force and time.time() - self.last_save_time < self.save_time:
+            return
+        with self.lock:
+            if self.stale > 0:
+                self._compact()
+            data = {
+                'version': INDEX_VERSION,
+                'docs': {
+                    str(p): [s[0], s[1], i]
+                    for i, (p, s, _) in self.docs.items()
+                },
+                'postings': {t: sorted(ids)
+                             for t, ids in self.postings.items()}
+            }
+            self.dirty = False
+            self.last_save_time = time.time()
+        content = zlib.compress(json.dumps(data).encode('utf-8'))
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            with obf_open(tmp_path,
+                          self.vault,
+                          'wb',
+                          obfuscation_mode='obfuscate',
+                          key=self.key) as out:
+                out.write(content)
+            tmp_path.replace(path)
+        except Exception as e:
+            logger.error(
+                f'could not save text index for {self.vault}: {get_traceback(e)}'
+            )
+
+    def load(self):
+        """
+        Loads the index saved by previous runs.
+        The notes that were removed or changed since then are dropped right away,
+        the changed ones are indexed again during the first update
+        """
+        path = self.save_path
+        if path is None or not path.exists():
+            return
+        try:
+            with obf_open(path,
+                          self.vault,
+                          'rb',
+                          obfuscation_mode='obfuscate',
+                          key=self.key) as inp:
+                data = json.loads(zlib.decompress(inp.read()))
+            if data['version'] != INDEX_VERSION:
+                logger.warning(
+                    f'unsupported text index version: {data["version"]}')
+                return
+            with self.lock:
+                counts = {}
+                for trigram, ids in data['postings'].items():
+                    self.postings[trigram] = set(ids)
+                    for i in ids:
+                        counts[i] = counts.get(i, 0) + 1
+                for p, (mtime, size, i) in data['docs'].items():
+                    self.ids[Path(p)] = i
+                    self.docs[i] = (Path(p), (mtime, size), counts.get(i, 0))
+                    self.size += counts.get(i, 0)
+                    self.next_id = max(self.next_id, i + 1)
+                self.dirty = False
+                for p in list(self.ids):
+                    if FileIndex._get_signature(p) != self._get_signature(p):
+                        self._remove_doc(p)
+            logger.info(
+                f'loaded {len(self.docs)} documents into text index of {self.vault}'
+            )
+        except Exception as e:
+            logger.error(
+                f'could not load text index for {self.vault}. Ignoring it: {e}'
+            )
+
+
+def init_text_index(vault: str) -> TextIndex:
+    """
+    Creates a text index for the vault, loads it, and subscribes it
+    for the file index updates
+
+    Args:
+        vault (str): vault name
+
+    Returns:
+        TextIndex: text index
+    """
+    index = TextIndex(vault)
+    index.load()
+    AppState.text_indices[vault] = index
+    AppState.indices[vault].add_listener(index.update)
+    atexit.register(index.save)
+    return index
+
+
+def read_text(path: Path | str, vault: str) -> str:
+    """
+    Reads the note using the text index if possible
+
+    Args:
+        path (Path | str): real path
+        vault (str): vault name
+
+    Returns:
+        str: content of the file
+    """
+    index = AppState.text_indices.get(vault)
+    if index is not None:
+        text = index.get_text(path)
+        if text is not None:
+            return text
+    with obf_open(path, vault) as inp:
+        return inp.read()
+
+
+def _iter_lines(text: str) -> Iterable[str]:
+    """
+    Iterates over the lines of the text with line endings without splitting the whole text
+    """
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start)
+        end = len(text) if end < 0 else end + 1
+        yield text[start:end]
+        start = end
+
+
+def _header_lines(lines: Iterable[str]) -> list[str] | None:
+    """
+    Takes the lines of the YAML frontmatter block, including the boundaries
+
+    Args:
+        lines (Iterable[str]): lines of the note with line endings
+
+    Returns:
+        list[str] | None: lines of the block, [] if the note has no frontmatter,
+            None if the note starts with a frontmatter of other format (TOML or JSON)
+    """
+    result = []
+    for line in lines:
+        if not result and not line.strip():
+            # python-frontmatter strips the text
+            continue
+        result.append(line)
+        if len(result) == 1:
+            if FRONTMATTER_BOUNDARY.match(line.rstrip('\r\n')) is None:
+                if line.lstrip().startswith(('+++', '{')):
+                    return None
+                return []
+        elif FRONTMATTER_BOUNDARY.match(line.rstrip('\r\n')):
+            break
+    return result
+
+
+def read_header(path: Path | str, vault: str) -> str:
+    """
+    Reads only the frontmatter block of the note: the file is read up to the closing "---".
+    Obfuscated notes are decoded completely, notes with non-YAML frontmatter are returned completely
+
+    Args:
+        path (Path | str): real path
+        vault (str): vault name
+
+    Returns:
+        str: frontmatter block (or the whole note), "" if the note has no frontmatter
+    """
+    if AppState.config.vaults[vault].obfuscation_suffix in Path(path).suffixes:
+        # obfuscated files are decoded completely
+        text = read_text(path, vault)
+        lines = _header_lines(_iter_lines(text))
+        return text if lines is None else ''.join(lines)
+    with open(path) as inp:
+        lines = _header_lines(inp)
+    if lines is None:
+        return read_text(path, vault)
+    return ''.join(lines)
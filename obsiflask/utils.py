@@ -105,3 +105,28 @@ def get_traceback(e: Exception) -> str:
     """
     return "".join(traceback.TracebackException.from_exception(e).format())
 
+
+def lower_text(text: str) -> tuple[str, list[int] | None]:
+    """
+    Lowercases the text. Some characters become several characters
+    (e.g. "İ"), so in this case the original offsets are remembered per character
+
+    Args:
+        text (str): text
+
+    Returns:
+        tuple[str, list[int] | None]: lowercased text and the original offset of each of its characters
+            (plus the length of the text), None if the lowercasing keeps the offsets
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        # lower() never shortens the characters, so each of them is kept in place
+        return lowered, None
+    buf = []
+    origin = []
+    for i, c in enumerate(text):
+        c = c.lower()
+        buf.append(c)
+        origin.extend([i] * len(c))
+    origin.append(len(text))
+    return ''.join(buf), origin
@@ -0,0 +1,147 @@
+"""
+Benchmark of the autocomplete indices: build time, memory and search latency.
+
+Usage:
+    python -m tests.benchmarks.bench_hint --strings 20000 --queries 2000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from obsiflask.hint import ArrayStringIndex, PrefixIndex
+from tests.benchmarks.naive_index import NaiveStringIndex
+
+WORDS = [
+    'project', 'meeting', 'notes', 'daily', 'weekly', 'review', 'plan',
+    'idea', 'draft', 'archive', 'research', 'paper', 'book', 'recipe',
+    'travel', 'budget', 'health', 'journal', 'reading', 'todo'
+]
+
+
+def make_strings(n: int, seed: int = 0) -> set[str]:
+    """
+    Generates file names that look like vault paths
+
+    Args:
+        n (int): number of strings
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        set[str]: strings
+    """
+    rng = random.Random(seed)
+    result = set()
+    while len(result) < n:
+        folder = rng.choice(WORDS)
+        name = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        result.add(f'{folder}/{name} {rng.randint(0, 9999)}.md')
+    return result
+
+
+def make_queries(strings: set[str], n: int, seed: int = 1) -> list[str]:
+    """
+    Generates queries as prefixes of different length, as the user types them
+
+    Args:
+        strings (set[str]): indexed strings
+        n (int): number of queries
+        seed (int, optional): random seed. Defaults to 1.
+
+    Returns:
+        list[str]: queries
+    """
+    rng = random.Random(seed)
+    strings = sorted(strings)
+    queries = []
+    for _ in range(n):
+        s = rng.choice(strings)
+        start = rng.randint(0, len(s) // 2)
+        queries.append(s[start:start + rng.randint(3, 12)])
+    return queries
+
+
+def run(index_cls, strings: set[str], queries: list[str], ngram_order: int,
+        max_ngrams: int, max_ratio: float) -> dict:
+    """
+    Measures one index implementation
+
+    Returns:
+        dict: build time (s), memory of the index (MB), mean and p95 search latency (ms)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = index_cls(ngram_order, max_ngrams, max_ratio)
+    index.update_index(strings)
+    build_time = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'build_s': build_time,
+        'memory_mb': memory / 1024 / 1024,
+        'mean_ms': sum(latencies) / len(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95)]
+    }
+
+
+def run_prefix(strings: set[str], queries: list[str]) -> dict:
+    """
+    Measures the prefix index with random scores, the queries are cut to 1-4 chars
+
+    Returns:
+        dict: build time (s), memory of the index (MB), mean and p95 search latency (ms)
+    """
+    rng = random.Random(3)
+    scores = {s: float(rng.randint(0, 10)) for s in strings}
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = PrefixIndex()
+    index.update_index(scores)
+    build_time = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies = []
+    for q in queries:
+        q = q[:rng.randint(1, 4)]
+        start = time.perf_counter()
+        index.search(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'build_s': build_time,
+        'memory_mb': memory / 1024 / 1024,
+        'mean_ms': sum(latencies) / len(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strings', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--ngram-order', type=int, default=3)
+    parser.add_argument('--max-ngrams', type=int, default=100000)
+    parser.add_argument('--max-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+    strings = make_strings(args.strings)
+    queries = make_queries(strings, args.queries)
+    print(f'{"index":<20}{"build, s":>10}{"memory, MB":>12}'
+          f'{"mean, ms":>10}{"p95, ms":>10}')
+    for index_cls in [NaiveStringIndex, ArrayStringIndex]:
+        r = run(index_cls, strings, queries, args.ngram_order,
+                args.max_ngrams, args.max_ratio)
+        print(f'{index_cls.__name__:<20}{r["build_s"]:>10.3f}'
+              f'{r["memory_mb"]:>12.2f}{r["mean_ms"]:>10.3f}{r["p95_ms"]:>10.3f}')
+    r = run_prefix(strings, queries)
+    print(f'{"PrefixIndex":<20}{r["build_s"]:>10.3f}'
+          f'{r["memory_mb"]:>12.2f}{r["mean_ms"]:>10.3f}{r["p95_ms"]:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
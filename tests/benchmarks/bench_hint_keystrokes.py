@@ -0,0 +1,115 @@
+"""
+Keystroke-replay benchmark of the autocomplete: the editor requests hints after each typed char,
+so the latency of get_hint is measured on the sequences of growing contexts.
+Compares the hints without sessions (each request is computed from scratch)
+and with the per-user hint sessions (reused ngram counts and LRU of the recent requests).
+
+Usage:
+    python -m tests.benchmarks.bench_hint_keystrokes --files 5000 --words 200
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.hint import HintSession
+from obsiflask.main import run
+from obsiflask.pages.hint import get_hint
+from tests.benchmarks.bench_hint import make_strings
+
+
+def make_vault(path: Path, n: int):
+    """
+    Creates notes with the names that look like vault paths
+
+    Args:
+        path (Path): vault path
+        n (int): number of notes
+    """
+    for i, name in enumerate(sorted(make_strings(n))):
+        file = path / name
+        file.parent.mkdir(exist_ok=True)
+        file.write_text(f'note {i} #tag{i % 100}')
+
+
+def make_replay(names: list[str], n: int, seed: int = 2) -> list[str]:
+    """
+    Generates contexts as the user types links and words char by char.
+    Some words are erased and typed again
+
+    Args:
+        names (list[str]): note names
+        n (int): number of typed words
+        seed (int, optional): random seed. Defaults to 2.
+
+    Returns:
+        list[str]: contexts in the order of requests
+    """
+    rng = random.Random(seed)
+    contexts = []
+    for _ in range(n):
+        name = rng.choice(names)
+        prefix = rng.choice(['some text [[', 'some text '])
+        word = name[:rng.randint(4, len(name))]
+        typed = [prefix + word[:i] for i in range(1, len(word) + 1)]
+        contexts.extend(typed)
+        if rng.random() < 0.3:
+            # backspace and retype
+            contexts.extend(typed[::-1][1:4][::-1] + typed[-3:])
+    return contexts
+
+
+def replay(vault: str, contexts: list[str]) -> list[float]:
+    """
+    Requests hints for the contexts
+
+    Returns:
+        list[float]: latencies in ms
+    """
+    latencies = []
+    for context in contexts:
+        start = time.perf_counter()
+        get_hint(vault, context)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=200)
+    parser.add_argument('--max-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        make_vault(Path(tmp), args.files)
+        config = AppConfig(
+            vaults={
+                'vault':
+                VaultConfig(tmp,
+                            autocomplete_ngram_order=3,
+                            autocomplete_max_ratio_in_key=args.max_ratio)
+            })
+        app = run(config, True)
+        names = sorted(AppState.hints['vault'].string_file_index.strings)
+        contexts = make_replay(names, args.words)
+        hints = AppState.hints['vault']
+        print(f'{len(contexts)} requests')
+        print(f'{"mode":<20}{"mean, ms":>10}{"p50, ms":>10}{"p99, ms":>10}')
+        with app.test_request_context():
+            get_session = hints.get_session
+            for mode in ['no session', 'session']:
+                if mode == 'no session':
+                    hints.get_session = lambda user: HintSession(0)
+                else:
+                    hints.get_session = get_session
+                latencies = sorted(replay('vault', contexts))
+                print(f'{mode:<20}{sum(latencies) / len(latencies):>10.3f}'
+                      f'{latencies[len(latencies) // 2]:>10.3f}'
+                      f'{latencies[int(len(latencies) * 0.99)]:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
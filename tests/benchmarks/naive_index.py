@@ -0,0 +1,239 @@
+"""
+Naive ngram index: the baseline for the autocomplete index benchmarks and tests.
+Not used by the app, see obsiflask.hint.ArrayStringIndex
+"""
+from threading import RLock
+
+from obsiflask.hint import MAX_HINT
+from obsiflask.utils import logger
+
+
+class NaiveStringIndex:
+    """
+    Fuzzy index based on ngrams
+    """
+
+    def __init__(self, ngram_order: int, max_ngrams: int,
+                 max_ratio_in_ngram: float):
+        """
+        Constructor
+
+        Args:
+            ngram_order (int): ngram order to use
+            max_ngrams (int): if number of ngrams is larger, will prune index
+            max_ratio_in_ngram (float): removes too frequent ngrams, if they're 
+            shared across max_ratio_in_ngram*100% of all the string in the index
+        """
+        self.ngram_order = ngram_order
+        assert ngram_order >= 2
+        self.max_prop_in_dict = max_ratio_in_ngram
+        assert max_ratio_in_ngram > 0
+        self.max_ngrams = max_ngrams
+        assert max_ngrams > 0
+        self.current_state: int = -1
+        # generation of the strings, see update_index
+        self.ngrams_to_strings: dict[str, set[str]] = None
+        self.strings: set[str] = set()
+        self.blacklist: set[str] = set()
+        # too frequent ngrams or pruned ngrams
+        self.rebuild_size = 0
+        # number of strings after the last full rebuild
+        self.removed_since_rebuild = 0
+        self.lock = RLock()
+
+    def get_ngrams(self, s: str) -> set[str]:
+        """
+        Returns ngrams of the string
+
+        Args:
+            s (str): string
+
+        Returns:
+            set[str]: ngrams
+        """
+        return {
+            s[ngram_id:ngram_id + self.ngram_order]
+            for ngram_id in range(len(s) - self.ngram_order + 1)
+        }
+
+    def prune(self, max_ngrams: int):
+        """
+        Keeps only max_ngrams rarest ngrams, others are blacklisted
+
+        Args:
+            max_ngrams (int): number of ngrams to keep
+        """
+        if len(self.ngrams_to_strings) <= max_ngrams:
+            return
+        sorted_keys = sorted(
+            self.ngrams_to_strings.keys(),
+            key=lambda x: len(self.ngrams_to_strings[x]))[max_ngrams:]
+        for k in sorted_keys:
+            logger.debug(f'Pruning {k} from ngram index')
+            del self.ngrams_to_strings[k]
+            self.blacklist.add(k)
+
+    def _index(self, strings: list[str]):
+        """
+        Adds ngrams of the strings that are already in self.strings
+
+        Args:
+            strings (list[str]): strings to index
+        """
+        total = len(self.strings)
+        for k in strings:
+            for ngram in self.get_ngrams(k):
+                if ngram in self.blacklist:
+                    continue
+                if ngram not in self.ngrams_to_strings:
+                    self.ngrams_to_strings[ngram] = set()
+                self.ngrams_to_strings[ngram].add(k)
+                if len(self.ngrams_to_strings[ngram]
+                       ) / total > self.max_prop_in_dict:
+                    self.blacklist.add(ngram)
+                    del self.ngrams_to_strings[ngram]
+                    logger.debug(f'Pruning {ngram} from ngram index')
+                if len(self.ngrams_to_strings) > 2 * self.max_ngrams:
+                    self.prune(self.max_ngrams)
+        self.prune(self.max_ngrams)
+
+    def rebuild(self, strings: set[str]):
+        """
+        Rebuilds index from scratch
+
+        Args:
+            strings (set[str]): strings to index
+        """
+        with self.lock:
+            self.ngrams_to_strings = {}
+            self.blacklist = set()
+            self.strings = set(strings)
+            self.rebuild_size = len(self.strings)
+            self.removed_since_rebuild = 0
+            self._index(list(self.strings))
+        if len(self.blacklist) > 0:
+            logger.info(
+                f'Pruned {len(self.blacklist)} ngrams during index building')
+
+    def add(self, strings: set[str]):
+        """
+        Adds strings into the index.
+        The ngrams that were blacklisted before are not restored,
+        so the index is rebuilt when its size is doubled
+
+        Args:
+            strings (set[str]): strings to add
+        """
+        with self.lock:
+            new_strings = [k for k in strings if k not in self.strings]
+            if not new_strings:
+                return
+            if self.ngrams_to_strings is None or len(self.strings) + len(
+                    new_strings) > 2 * self.rebuild_size:
+                self.rebuild(self.strings | set(new_strings))
+                return
+            self.strings.update(new_strings)
+            self._index(new_strings)
+
+    def remove(self, strings: set[str]):
+        """
+        Removes strings from the index.
+        Since blacklisted ngrams can become rare after removal,
+        the index is rebuilt when a half of strings is removed
+
+        Args:
+            strings (set[str]): strings to remove
+        """
+        with self.lock:
+            if self.ngrams_to_strings is None:
+                return
+            for k in strings:
+                if k not in self.strings:
+                    continue
+                self.strings.discard(k)
+                self.removed_since_rebuild += 1
+                for ngram in self.get_ngrams(k):
+                    ngram_strings = self.ngrams_to_strings.get(ngram)
+                    if ngram_strings is None:
+                        continue
+                    ngram_strings.discard(k)
+                    if len(ngram_strings) == 0:
+                        del self.ngrams_to_strings[ngram]
+            if self.removed_since_rebuild > self.rebuild_size / 2:
+                self.rebuild(self.strings)
+
+    def update_index(self, strings: set[str], generation: int | None = None):
+        """
+        Updates index with new strings: only the difference with the current strings is indexed.
+        If nothing was changed, does nothing
+
+        Args:
+            strings (set[str]): new strings
+            generation (int | None, optional): generation of the strings (e.g. from FileIndex).
+                If it equals to the generation of the index, the strings are not compared at all.
+                Defaults to None.
+        """
+        with self.lock:
+            if generation is not None and generation == self.current_state:
+                return
+            if self.ngrams_to_strings is None:
+                self.rebuild(strings)
+            else:
+                to_remove = self.strings - strings
+                to_add = strings - self.strings
+                if not to_remove and not to_add:
+                    if generation is not None:
+                        self.current_state = generation
+                    return
+                if (self.removed_since_rebuild + len(to_remove) >
+                        self.rebuild_size / 2
+                        or len(strings) > 2 * self.rebuild_size):
+                    # the same conditions as in add/remove, but the index is rebuilt once
+                    self.rebuild(strings)
+                else:
+                    self.remove(to_remove)
+                    self.add(to_add)
+            if generation is not None:
+                self.current_state = generation
+            else:
+                self.current_state += 1
+
+    def search(self,
+               q: str,
+               limit: int = MAX_HINT) -> tuple[list[tuple[str, str]], float]:
+        """
+        Search in the index.
+        Returns only the results with the best match, 
+        sorted by the difference between the length of the query string and
+        the matches string
+
+        Args:
+            q (str): string to find
+            limit (int, optional): max number of results. Defaults to MAX_HINT.
+
+        Returns:
+            tuple[list[tuple[str, str]], float]: tuple with two elements:
+                the first is a list of found matches, for each there is also provided a difference
+                of length between the query string and the collection string
+                the second is the ratio of ngrams that were found in the string
+        """
+        q = q.strip()
+        if len(q) < self.ngram_order:
+            return [], 0
+        candidates = {}
+        with self.lock:
+            if self.ngrams_to_strings is None:
+                return [], 0
+            for ngram_id in range(len(q) - self.ngram_order + 1):
+                ngram = q[ngram_id:ngram_id + self.ngram_order]
+                for c in self.ngrams_to_strings.get(ngram, []):
+                    if c not in candidates:
+                        candidates[c] = 0
+                    candidates[c] += 1
+        if len(candidates) == 0:
+            return [], 0
+        best_match = max(candidates.values())
+        top_candidates = [(c, abs(len(q) - len(c)))
+                          for c, v in candidates.items() if v == best_match]
+        top_candidates = sorted(top_candidates, key=lambda x: x[1])[:limit]
+        return top_candidates, best_match
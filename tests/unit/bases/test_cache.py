@@ -1,22 +1,31 @@
 import time
+from pathlib import Path
+
 import pytest
 
 from obsiflask.bases.cache import BaseCache
 from obsiflask.app_state import AppState
+from obsiflask.file_index import FileIndexDelta
 
 
 class DummyVaultConfig:
-    def __init__(self, cache_time):
-        self.base_config = type("BC", (), {"cache_time": cache_time})
+    def __init__(self, cache_time, cache_size_mb=16):
+        self.base_config = type("BC", (), {
+            "cache_time": cache_time,
+            "cache_size_mb": cache_size_mb
+        })
 
 
 @pytest.fixture(autouse=True)
 def clean_cache(monkeypatch):
     #  clean cache before each test
-    BaseCache.cache.clear()
+    BaseCache.clear()
+    BaseCache.counters.clear()
+    config = AppState.config
     AppState.config = type("Config", (), {"vaults": {}})
     yield
-    BaseCache.cache.clear()
+    BaseCache.clear()
+    AppState.config = config
 
 
 def test_add_and_get_from_cache(monkeypatch):
@@ -63,3 +72,58 @@ def test_prune_keeps_valid(monkeypatch):
 
     assert hit is True
     assert res == "res1"
+
+
+def test_lru_budget():
+    AppState.config.vaults["v1"] = DummyVaultConfig(cache_time=60,
+                                                    cache_size_mb=30 / 2**20)
+    BaseCache.add_to_cache("v1", "path1", "viewA", "a" * 10)
+    BaseCache.add_to_cache("v1", "path1", "viewB", "b" * 10)
+    BaseCache.get_from_cache("v1", "path1", "viewA")
+    BaseCache.add_to_cache("v1", "path1", "viewC", "c" * 10)
+    assert BaseCache.get_from_cache("v1", "path1", "viewB") == (None, False)
+    assert BaseCache.get_from_cache("v1", "path1", "viewA")[1]
+    assert BaseCache.get_from_cache("v1", "path1", "viewC")[1]
+    BaseCache.add_to_cache("v1", "path1", "viewD", "d" * 100)
+    assert BaseCache.get_from_cache("v1", "path1", "viewD") == (None, False)
+    stats = BaseCache.stats("v1")
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 3
+    assert stats['misses'] == 2
+    assert stats['entries'] == 2
+    assert stats['bytes'] == 24
+
+
+def test_invalidation():
+    AppState.config.vaults["v1"] = DummyVaultConfig(cache_time=60)
+    AppState.config.vaults["v2"] = DummyVaultConfig(cache_time=60)
+    checked = []
+
+    def matches(paths):
+        checked.append(paths)
+        return Path('new') in paths
+
+    BaseCache.add_to_cache("v1", "base", "viewA", "res", {Path('a')}, matches)
+    BaseCache.add_to_cache("v1", "base", "viewB", "res", {Path('b')}, matches)
+    BaseCache.add_to_cache("v1", "base", "viewC", "res")
+    BaseCache.add_to_cache("v2", "base", "viewA", "res")
+    delta = FileIndexDelta(0)
+    delta.modified = {Path('a'), Path('c')}
+    BaseCache.update("v1", delta)
+    assert not BaseCache.get_from_cache("v1", "base", "viewA")[1]
+    assert not BaseCache.get_from_cache("v1", "base", "viewC")[1]
+    assert BaseCache.get_from_cache("v1", "base", "viewB")[1]
+    assert checked == [{Path('a'), Path('c')}]
+    delta.modified = {Path('new')}
+    BaseCache.update("v1", delta)
+    assert not BaseCache.get_from_cache("v1", "base", "viewB")[1]
+    assert ("v2", "base", "viewA") in BaseCache.cache
+    delta.modified = {Path('base')}
+    BaseCache.add_to_cache("v1", "base", "viewB", "res", {Path('b')}, matches)
+    BaseCache.update("v1", delta)
+    assert not BaseCache.get_from_cache("v1", "base", "viewB")[1]
+    BaseCache.add_to_cache("v1", "base", "viewB", "res", {Path('b')}, matches)
+    delta = FileIndexDelta(0)
+    delta.added = {Path('x')}
+    BaseCache.update("v1", delta)
+    assert not BaseCache.get_from_cache("v1", "base", "viewB")[1]
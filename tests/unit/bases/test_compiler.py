@@ -0,0 +1,91 @@
+import pytest
+from lark import Tree
+
+from obsiflask.bases.compiler import (CONTENT_COST, compile_filter,
+                                      compile_formula, fold_constants,
+                                      get_cost, reorder_predicates)
+from obsiflask.bases.filter import FieldFilter
+from obsiflask.bases.grammar import parser
+
+
+class Ctx:
+    """
+    File stub that records the requested properties
+    """
+
+    def __init__(self, **props):
+        self.props = props
+        self.requested = []
+
+    def get_prop(self, names):
+        name = '.'.join(names)
+        self.requested.append(name)
+        return self.props.get(name, '')
+
+
+@pytest.mark.parametrize('expr, value', [('1 + 2 * 3', 7), ('"a" == "a"', True),
+                                         ('!(2 > 1)', False), ('-(1 + 1)', -2)])
+def test_fold_constants(expr, value):
+    tree = fold_constants(parser.parse(expr))
+    assert tree == Tree('const', [value])
+    assert compile_formula(expr).func(Ctx()) == value
+
+
+def test_fold_keeps_errors():
+    tree = fold_constants(parser.parse('1 / 0'))
+    assert tree.data == 'div_'
+    with pytest.raises(ZeroDivisionError):
+        compile_formula('1 / 0').func(Ctx())
+
+
+def test_fold_and_or():
+    assert fold_constants(parser.parse('1 == 1 and x')) == Tree('attr', ['x'])
+    assert fold_constants(parser.parse('1 == 2 and x')) == Tree('const', [False])
+    assert fold_constants(parser.parse('1 == 1 or x')) == Tree('const', [True])
+
+
+def test_cost():
+    assert get_cost(parser.parse('file.name == "a"')) == 0
+    assert get_cost(parser.parse('file.size > 1')) == 1
+    assert get_cost(parser.parse('status == "a"')) == 2
+    assert get_cost(parser.parse('file.hasTag("a")')) == CONTENT_COST
+    assert get_cost(parser.parse('file.tags.contains("a")')) == CONTENT_COST
+    assert get_cost(parser.parse('file.folder.startsWith("a")')) == 0
+
+
+def test_content_follows_cost():
+    for expr in ['file.hasTag("a")', 'file.links', 'x > 1 or file.tags']:
+        assert compile_filter(expr).content
+        assert compile_filter(expr).cost == CONTENT_COST
+    for expr in ['file.name == "a"', 'file.size > 1', 'x > 1']:
+        assert not compile_filter(expr).content
+        assert compile_filter(expr).cost < CONTENT_COST
+
+
+def test_reorder_predicates():
+    tree = reorder_predicates(
+        parser.parse('status == "done" and file.size > 1 and file.ext == "md"'))
+    assert tree == parser.parse(
+        'file.ext == "md" and file.size > 1 and status == "done"')
+
+
+def test_filter_short_circuit():
+    ff = FieldFilter('status == "done" and file.ext == "md"')
+    ctx = Ctx(**{'file.ext': 'png', 'status': 'done'})
+    assert not ff.check(ctx)
+    assert ctx.requested == ['file.ext']
+    ctx = Ctx(**{'file.ext': 'md', 'status': 'done'})
+    assert ff.check(ctx)
+    assert ff.cost == 2
+
+
+def test_formula_is_not_reordered():
+    ctx = Ctx(**{'file.ext': 'md', 'status': 'done'})
+    assert compile_formula('status == "done" and file.ext').func(ctx) == 'md'
+    assert ctx.requested == ['status', 'file.ext']
+
+
+def test_cache():
+    assert compile_filter('x == 1') is compile_filter('x == 1')
+    assert FieldFilter('x == 1').func is FieldFilter('x == 1').func
+    assert compile_filter('bad (').exception is not None
@@ -62,6 +62,17 @@ def test_get_internal_data_reads_links_and_tags(tmp_path):
     assert fi.read is True
 
 
+def test_frontmatter_reads_only_header(tmp_path):
+    file = make_file(tmp_path,
+                     "---\nstatus: done\ntags: [a]\n---\nhello [[page]] #b")
+    fi = FileInfo(file, "v1")
+    assert fi.get_prop(['status']) == 'done'
+    assert fi.header_read and not fi.read
+    assert set(fi.get_prop(['file', 'tags'])) == {'a', 'b'}
+    assert fi.read
+    assert fi.frontmatter == {'status': 'done', 'tags': ['a']}
+
+
 def test_get_internal_data_non_md_sets_read(tmp_path):
     file = make_file(tmp_path, "binarydata", "bin.txt")
     fi = FileInfo(file, "v1")
@@ -36,14 +36,14 @@ def test_filter_and_all_true(dummy_file):
 
 def test_filter_and_one_false(dummy_file):
     f1 = TrivialFilter()
-    f2 = MagicMock()
+    f2 = MagicMock(cost=2)
     f2.check.return_value = False
     f_and = FilterAnd([f1, f2])
     assert f_and.check(dummy_file) is False
 
 
 def test_filter_or_one_true(dummy_file):
-    f1 = MagicMock()
+    f1 = MagicMock(cost=2)
     f1.check.return_value = False
     f2 = TrivialFilter()
     f_or = FilterOr([f1, f2])
@@ -51,9 +51,9 @@ def test_filter_or_one_true(dummy_file):
 
 
 def test_filter_or_all_false(dummy_file):
-    f1 = MagicMock()
+    f1 = MagicMock(cost=2)
     f1.check.return_value = False
-    f2 = MagicMock()
+    f2 = MagicMock(cost=2)
     f2.check.return_value = False
     f_or = FilterOr([f1, f2])
     assert f_or.check(dummy_file) is False
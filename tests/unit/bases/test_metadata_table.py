@@ -0,0 +1,458 @@
+import random
+from threading import Thread
+
+import pytest
+
+from obsiflask.app_state import AppState
+from obsiflask.bases.base_parser import parse_base
+from obsiflask.bases.cache import BaseCache
+from obsiflask.bases.filter import FieldFilter
+from obsiflask.bases.grammar import parser
+from obsiflask.bases.materialized import MaterializedView
+from obsiflask.bases.vectorized import NotVectorized, compile_tree
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.main import run
+
+
+@pytest.fixture
+def app(tmp_path):
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    config.vaults['vault1'].base_config.error_on_field_parse = False
+    AppState.messages[('vault1', None)] = []
+    (tmp_path / 'dir').mkdir()
+    (tmp_path / 'a.md').write_text(
+        '---\nstatus: done\npriority: 1\ntags: [work]\n---\n[[b]] #x')
+    (tmp_path / 'dir' / 'b.md').write_text(
+        '---\nstatus: draft\npriority: 3\n---\ntext')
+    (tmp_path / 'dir' / 'c.md').write_text('no properties')
+    (tmp_path / 'img.png').write_text('binary')
+    app = run(config, True)
+    AppState.indices['vault1'].refresh()
+    return app
+
+
+def test_frame_columns(app, tmp_path):
+    frame = AppState.metadata_tables['vault1'].get_frame()
+    assert len(frame) == 4
+    row = frame.loc[tmp_path / 'a.md']
+    assert row['file.name'] == 'a.md'
+    assert row['file.folder'] == '.'
+    assert row['file.ext'] == 'md'
+    assert set(row['file.tags']) == {'x', 'work'}
+    assert row['file.links'] == {'dir/b.md'}
+    assert row['priority'] == 1
+    assert frame.loc[tmp_path / 'dir' / 'c.md', 'status'] == ''
+
+
+def test_frame_is_updated_incrementally(app, tmp_path):
+    table = AppState.metadata_tables['vault1']
+    table.get_frame()
+    info = table.get_infos([tmp_path / 'dir' / 'b.md'])[0]
+    (tmp_path / 'a.md').write_text('---\nstatus: archived\n---\n')
+    (tmp_path / 'dir' / 'c.md').unlink()
+    AppState.indices['vault1'].refresh()
+    frame = table.get_frame()
+    assert frame.loc[tmp_path / 'a.md', 'status'] == 'archived'
+    assert tmp_path / 'dir' / 'c.md' not in frame.index
+    # unchanged files are not read again
+    assert table.get_infos([tmp_path / 'dir' / 'b.md'])[0] is info
+
+
+@pytest.mark.parametrize('expr', [
+    'status == "done"', 'priority > 1', 'priority + 1 == 2',
+    'file.name.startsWith("b")', 'file.folder == "dir" and priority < 3',
+    '!(status == "done") or file.ext == "png"', 'file.hasTag("work")',
+    'status.contains("ra")', 'missing == ""', 'file.tags.contains("x")'
+])
+def test_vectorized_filter_matches_row_wise(app, expr):
+    table = AppState.metadata_tables['vault1']
+    frame = table.get_frame()
+    ff = FieldFilter(expr)
+    infos = table.get_infos(list(frame.index))
+    try:
+        row_wise = [bool(ff.check(f)) for f in infos]
+    except TypeError:
+        with pytest.raises(TypeError):
+            ff.mask(frame)
+        return
+    assert list(ff.mask(frame)) == row_wise
+
+
+def test_not_vectorized():
+    with pytest.raises(NotVectorized):
+        compile_tree(parser.parse('file.unknownMethod()'))
+
+
+def test_base_view(app, tmp_path):
+    (tmp_path / 'base.base').write_text("""
+filters:
+  and:
+    - file.ext == "md"
+formulas:
+  double: priority * 2
+views:
+  - type: table
+    name: view
+    order: [file.path, status, formula.double]
+    sort:
+      - property: formula.double
+        direction: DESC
+""")
+    base = parse_base(str(tmp_path / 'base.base'), 'vault1')
+    assert 'double' in base.vector_formulas
+    with app.test_request_context():
+        result = base.views['view'].make_view('vault1', force_refresh=True)
+    assert result == [{
+        'file_path': 'dir/b.md',
+        'status': 'draft',
+        'formula_double': 6
+    }, {
+        'file_path': 'a.md',
+        'status': 'done',
+        'formula_double': 2
+    }, {
+        'file_path': 'dir/c.md',
+        'status': '',
+        'formula_double': ''
+    }]
+
+
+def test_path_predicates_pushdown(app, tmp_path):
+    table = AppState.metadata_tables['vault1']
+    frame = table.get_path_frame()
+    assert set(frame['file.name']) == {'a.md', 'b.md', 'c.md', 'img.png'}
+    assert not table.infos  # nothing is read
+    ff = FieldFilter('file.folder == "dir" and file.name.startsWith("b")')
+    assert ff.plan('vault1') == ({tmp_path / 'dir' / 'b.md'}, True)
+    ff = FieldFilter('file.ext == "md" and status.startsWith("d")')
+    candidates, exact = ff.plan('vault1')
+    assert len(candidates) == 3 and not exact
+    frame = table.get_frame(candidates)
+    assert set(table.infos) == candidates
+    assert set(frame.index[ff.mask(frame)]) == {
+        tmp_path / 'a.md', tmp_path / 'dir' / 'b.md'
+    }
+
+
+def test_path_frame_update(app, tmp_path):
+    table = AppState.metadata_tables['vault1']
+    table.get_path_frame()
+    (tmp_path / 'new.md').write_text('new')
+    (tmp_path / 'img.png').unlink()
+    AppState.indices['vault1'].refresh()
+    assert set(table.get_path_frame()['file.path']) == {
+        'a.md', 'dir/b.md', 'dir/c.md', 'new.md'
+    }
+
+
+def test_view_cache_invalidation(app, tmp_path):
+    (tmp_path / 'base.base').write_text("""
+filters:
+  and:
+    - status == "done"
+views:
+  - type: table
+    name: view
+    order: [file.path]
+""")
+    AppState.indices['vault1'].refresh()
+    base = parse_base(str(tmp_path / 'base.base'), 'vault1')
+    view = base.views['view']
+    with app.test_request_context():
+        assert view.make_view('vault1', False) == [{'file_path': 'a.md'}]
+        # not matched before and after the change: the view is cached
+        (tmp_path / 'dir' / 'c.md').write_text('still no properties')
+        AppState.indices['vault1'].refresh()
+        hits = BaseCache.stats('vault1')['hits']
+        view.make_view('vault1', False)
+        assert BaseCache.stats('vault1')['hits'] == hits + 1
+        # becomes matched
+        (tmp_path / 'dir' / 'c.md').write_text('---\nstatus: done\n---\n')
+        AppState.indices['vault1'].refresh()
+        assert view.make_view('vault1', False) == [{
+            'file_path': 'a.md'
+        }, {
+            'file_path': 'dir/c.md'
+        }]
+        # matched file is changed
+        (tmp_path / 'a.md').write_text('---\nstatus: draft\n---\n')
+        AppState.indices['vault1'].refresh()
+        assert view.make_view('vault1', False) == [{'file_path': 'dir/c.md'}]
+
+
+def test_materialized_view(app, tmp_path):
+    (tmp_path / 'base.base').write_text("""
+materialized: true
+filters:
+  and:
+    - file.ext == "md"
+formulas:
+  double: priority * 2
+views:
+  - type: table
+    name: view
+    order: [file.path, status, formula.double]
+    sort:
+      - property: file.path
+        direction: ASC
+""")
+    AppState.indices['vault1'].refresh()
+    base = parse_base(str(tmp_path / 'base.base'), 'vault1')
+    view = base.views['view']
+    materialized = AppState.materialized_views['vault1']
+    # the views are refreshed by the test, not by the thread
+    materialized.thread = Thread()
+    with app.test_request_context():
+        result = view.make_view('vault1', False)
+    assert [r['file_path'] for r in result] == ['a.md', 'dir/b.md', 'dir/c.md']
+    mview = materialized.views[(view.base_path, 'view')]
+    table = AppState.metadata_tables['vault1']
+    (tmp_path / 'dir' / 'b.md').write_text('---\nstatus: done\npriority: 5\n---')
+    (tmp_path / 'dir' / 'c.md').write_text('---\nstatus: new\n---')
+    AppState.indices['vault1'].refresh()
+    info = table.get_infos([tmp_path / 'a.md'])[0]
+    # the last result is served, the refresh is left for the thread
+    with app.test_request_context():
+        assert view.make_view('vault1', False) is result
+    assert mview.dirty and materialized.event.is_set()
+    with app.test_request_context():
+        materialized.refresh()
+    assert not mview.dirty
+    # only the changed files are read
+    assert table.get_infos([tmp_path / 'a.md'])[0] is info
+    assert mview.result == [{
+        'file_path': 'a.md',
+        'status': 'done',
+        'formula_double': 2
+    }, {
+        'file_path': 'dir/b.md',
+        'status': 'done',
+        'formula_double': 10
+    }, {
+        'file_path': 'dir/c.md',
+        'status': 'new',
+        'formula_double': ''
+    }]
+    # new files are merged as well
+    (tmp_path / 'd.md').write_text('new')
+    AppState.indices['vault1'].refresh()
+    assert not mview.full
+    with app.test_request_context():
+        materialized.refresh()
+        assert [r['file_path'] for r in view.make_view('vault1', False)
+                ] == ['a.md', 'd.md', 'dir/b.md', 'dir/c.md']
+    # the base is parsed again after the change
+    (tmp_path / 'base.base').write_text((tmp_path / 'base.base').read_text() +
+                                        '\n')
+    AppState.indices['vault1'].refresh()
+    assert (view.base_path, 'view') not in materialized.views
+
+
+def test_materialized_merge(app, tmp_path):
+    (tmp_path / 'base.base').write_text("""
+materialized: true
+filters:
+  and:
+    - file.ext == "md"
+views:
+  - type: table
+    name: view
+    order: [file.path, priority]
+    sort:
+      - property: priority
+        direction: DESC
+""")
+    AppState.indices['vault1'].refresh()
+    view = parse_base(str(tmp_path / 'base.base'), 'vault1').views['view']
+    materialized = AppState.materialized_views['vault1']
+    materialized.thread = Thread()
+    rng = random.Random(0)
+    with app.test_request_context():
+        view.make_view('vault1', False)
+        mview = materialized.views[(view.base_path, 'view')]
+        for step in range(30):
+            path = tmp_path / f'n{rng.randint(0, 8)}.md'
+            if path.exists() and rng.random() < 0.3:
+                path.unlink()
+            else:
+                # ties, missing values and strings in the sorting column
+                priority = rng.choice(['1', '2', '', 'high'])
+                path.write_text(f'---\npriority: {priority}\nstep: {step}\n---')
+            AppState.indices['vault1'].refresh()
+            materialized.refresh()
+            full = MaterializedView(view, 'vault1')
+            full.refresh()
+            assert mview.result == full.result
+
+
+def test_view_pages(app, tmp_path):
+    for i in range(10):
+        (tmp_path / 'dir' / f'n{i}.md').write_text(
+            f'---\npriority: {i % 4}\n---\n')
+    (tmp_path / 'base.base').write_text("""
+filters:
+  and:
+    - file.folder == "dir"
+views:
+  - type: table
+    name: view
+    order: [file.path, priority]
+    sort:
+      - property: priority
+        direction: DESC
+  - type: table
+    name: unsorted
+    order: [priority, file.path]
+  - type: table
+    name: limited
+    limit: 3
+    order: [file.path]
+    sort:
+      - property: file.path
+        direction: ASC
+""")
+    AppState.indices['vault1'].refresh()
+    base = parse_base(str(tmp_path / 'base.base'), 'vault1')
+    view = base.views['view']
+    with app.test_request_context():
+        full = view.make_view('vault1', True)
+        rows, total = view.make_page('vault1', True, 2, 4)
+        assert total == 12
+        assert rows == full[2:6]
+        total, stream = view.stream_page('vault1', True, 0, None, 5)
+        assert list(stream) == full
+        # the pages follow the order of the full view, including the ties
+        for name in ['view', 'unsorted']:
+            full = base.views[name].make_view('vault1', True)
+            pages = []
+            for offset in range(0, 12, 5):
+                pages += base.views[name].make_page('vault1', True, offset,
+                                                    5)[0]
+            assert pages == full
+        assert view.make_page('vault1', False, 20, 5) == ([], 12)
+        assert base.views['limited'].make_view('vault1', True) == [{
+            'file_path': 'dir/b.md'
+        }, {
+            'file_path': 'dir/c.md'
+        }, {
+            'file_path': 'dir/n0.md'
+        }]
+        assert base.views['limited'].make_page('vault1', True, 2, 5) == ([{
+            'file_path': 'dir/n0.md'
+        }], 3)
+
+
+def test_formula_cache(app, tmp_path):
+    cache = AppState.formula_caches['vault1']
+    table = AppState.metadata_tables['vault1']
+    calls = []
+
+    def formula(info):
+        calls.append(info.real_path)
+        return info.get_prop(['status'])
+
+    paths = [tmp_path / 'a.md', tmp_path / 'dir' / 'b.md']
+    infos = table.get_infos(paths)
+    assert [cache.evaluate('status', formula, f)
+            for f in infos] == ['done', 'draft']
+    assert [cache.evaluate('status', formula, f)
+            for f in infos] == ['done', 'draft']
+    assert calls == paths
+    # only the changed file is computed again
+    (tmp_path / 'a.md').write_text('---\nstatus: archived\n---\n')
+    AppState.indices['vault1'].refresh()
+    infos = table.get_infos(paths)
+    assert [cache.evaluate('status', formula, f)
+            for f in infos] == ['archived', 'draft']
+    assert calls == paths + [tmp_path / 'a.md']
+    # bounded by the config
+    AppState.config.vaults['vault1'].base_config.formula_cache_size = 1
+    cache.evaluate('other', formula, infos[0])
+    assert cache.stats()['entries'] == 1
+
+
+def test_view_groups(app, tmp_path):
+    (tmp_path / 'base.base').write_text("""
+filters:
+  and:
+    - file.ext == "md"
+views:
+  - type: table
+    name: view
+    order: [file.path, priority]
+    groupBy:
+      property: status
+      direction: DESC
+    summaries:
+      priority: Sum
+      status: Unique
+    sort:
+      - property: file.path
+        direction: ASC
+""")
+    (tmp_path / 'd.md').write_text('---\nstatus: done\npriority: 4\n---\n')
+    AppState.indices['vault1'].refresh()
+    base = parse_base(str(tmp_path / 'base.base'), 'vault1')
+    view = base.views['view']
+    with app.test_request_context():
+        rows = view.make_view('vault1', True)
+        assert [(r['_group'], r['file_path']) for r in rows] == [
+            ('draft', 'dir/b.md'), ('done', 'a.md'), ('done', 'd.md'),
+            ('', 'dir/c.md')
+        ]
+        rows, total = view.make_page('vault1', True, 1, 2)
+        assert [r['file_path'] for r in rows] == ['a.md', 'd.md']
+        summary = view.summarize('vault1', True)
+    assert summary['summaries'] == {'priority': 8.0, 'status': 2}
+    assert summary['groups'] == [{
+        'key': 'draft',
+        'count': 1,
+        'summaries': {
+            'priority': 3.0,
+            'status': 1
+        }
+    }, {
+        'key': 'done',
+        'count': 2,
+        'summaries': {
+            'priority': 5.0,
+            'status': 1
+        }
+    }, {
+        'key': '',
+        'count': 1,
+        'summaries': {
+            'priority': 0.0,
+            'status': 0
+        }
+    }]
+
+
+def test_frontmatter_only_view(app, tmp_path):
+    (tmp_path / 'base.base').write_text("""
+filters:
+  and:
+    - status == "done"
+views:
+  - type: table
+    name: props
+    order: [file.path, priority]
+  - type: table
+    name: tags
+    order: [file.path, file.tags]
+""")
+    AppState.indices['vault1'].refresh()
+    base = parse_base(str(tmp_path / 'base.base'), 'vault1')
+    table = AppState.metadata_tables['vault1']
+    with app.test_request_context():
+        assert base.views['props'].make_view('vault1', True) == [{
+            'file_path': 'a.md',
+            'priority': 1
+        }]
+        # only the frontmatter blocks are read
+        assert not table.content
+        assert all(info.header_read and not info.read
+                   for info in table.infos.values())
+        rows = base.views['tags'].make_view('vault1', True)
+    assert 'work' in rows[0]['file_tags'] and 'x' in rows[0]['file_tags']
+    assert table.content == {tmp_path / 'a.md'}
@@ -1,9 +1,11 @@
+import numpy as np
+import pandas as pd
 import pytest
 from unittest.mock import patch
 
-from obsiflask.bases.view import View, convert_field
+from obsiflask.bases.view import View, aggregate, convert_field, top_k
 from obsiflask.bases.file_info import FileInfo
-from obsiflask.bases.filter import TrivialFilter
+from obsiflask.bases.filter import FieldFilter, TrivialFilter
 from obsiflask.bases.cache import BaseCache
 from obsiflask.app_state import AppState
 from obsiflask.config import AppConfig, VaultConfig
@@ -42,6 +44,17 @@ def test_view_gather_files(dummy_file):
     assert f.vault_path.name == "test.md"
 
 
+def test_view_needs_content():
+    v = View(formulas=[], properties={}, base_path="base")
+    v.filter = FieldFilter('file.hasTag("a")')
+    v.global_filter = TrivialFilter()
+    assert v.needs_content()
+    v.filter = FieldFilter('file.ext == "md"')
+    assert not v.needs_content()
+    v.order = ['file.tags']
+    assert v.needs_content()
+
+
 def test_view_make_view_basic(dummy_file):
     # Simple formula the returns file name
     def formula(f):
@@ -117,3 +130,21 @@ def test_view_make_view_cards_cover(dummy_file):
     result = v.make_view("vault1", force_refresh=True)
     # Проверяем, что COVER_KEY добавлен в финальный порядок
     assert result is not None
+
+
+@pytest.mark.parametrize('k', [0, 1, 3, 5, 10])
+def test_top_k(k):
+    values = np.array([3., 1., 2., 1., 3., 2., 1., 0.])
+    assert list(top_k(values, k)) == list(
+        np.argsort(values, kind='stable')[:k])
+
+
+@pytest.mark.parametrize('name, expected', [('Sum', [4, 5]), ('Average', [2, 5]),
+                                            ('Min', [1, 5]), ('Max', [3, 5]),
+                                            ('Range', [2, 0]), ('Empty', [0, 2]),
+                                            ('Filled', [2, 1]), ('Unique', [2, 1]),
+                                            ('Checked', [0, 0])])
+def test_aggregate(name, expected):
+    values = pd.Series([1, 3, 5, '', float('nan')], dtype=object)
+    codes = np.array([0, 0, 1, 1, 1])
+    assert list(aggregate(values, codes, name)) == expected
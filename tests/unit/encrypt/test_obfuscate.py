@@ -1,4 +1,12 @@
-from obsiflask.encrypt.obfuscate import obf_open
+import os
+from base64 import b64decode
+
+from obsiflask.app_state import AppState
+from obsiflask.encrypt import obfuscate
+from obsiflask.encrypt.obfuscate import (obf_open, make_key,
+                                         repeating_key_xor_encrypt,
+                                         repeating_key_xor_decrypt,
+                                         SALT_LENGTH)
 
 
 def test_obf_open_no_obfuscate(tmp_path):
@@ -50,3 +58,62 @@ def test_hardcoded_text(tmp_path):
         )
     with obf_open(tmp_path / "out.md", '', 'r', 'obfuscate', key='key') as inp:
         assert inp.read() == 'test'
+
+
+def test_hardcoded_text_longer_than_key(tmp_path):
+    # generated with the original byte-by-byte implementation
+    with open(tmp_path / 'out.md', 'wb') as out:
+        out.write(
+            b64decode(
+                'T0JGAAABAgMEBQYHCAkKCwwNDg/OeEBmkeTft4UUPmfgayUvrkUwfxXjuD1TyAI+dRrg7JzLsZEuLmNhdIE/eh3LgvgMm4Tr5LELzKR3yIKj63XtgTYRNvmMvdXgcG3J7Dw9MrBNdX7lrPZsA6BqXBd/hL8yx+aJMzBrJHWCm4SrawkbsEA6NWhu'
+            ))
+    with obf_open(tmp_path / "out.md", '', 'r', 'obfuscate', key='key') as inp:
+        assert inp.read() == 'Привет, world! ' * 5 + '#tag [[link]]'
+
+
+def test_vectorized_xor_matches_reference():
+    key = make_key('key', b'0' * SALT_LENGTH)
+    for length in [0, 1, 31, 32, 33, 1000]:
+        data = os.urandom(length)
+        reference = bytes([b ^ key[i % len(key)] for i, b in enumerate(data)])
+        assert repeating_key_xor_encrypt(data, key) == reference
+        assert repeating_key_xor_decrypt(reference, key) == data
+
+
+def test_large_text_roundtrip(tmp_path):
+    content = 'line of the note\n' * 300_000  # ~5 MB
+    with obf_open(tmp_path / "big.md", '', 'w', 'obfuscate', key='key') as out:
+        out.write(content)
+    with obf_open(tmp_path / "big.md", '', 'r', 'obfuscate', key='key') as inp:
+        assert inp.read() == content
+
+
+def test_derived_keys_are_cached(tmp_path, monkeypatch):
+    AppState.obfuscate_keys.clear()
+    calls = []
+    original = obfuscate.make_key
+
+    def counting_make_key(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(obfuscate, 'make_key', counting_make_key)
+    with obf_open(tmp_path / "out.md", '', 'w', 'obfuscate', key='key') as out:
+        out.write('test')
+    for _ in range(3):
+        with obf_open(tmp_path / "out.md", '', 'r', 'obfuscate',
+                      key='key') as inp:
+            assert inp.read() == 'test'
+    assert len(calls) == 1
+    obfuscate.get_key('other', b'0' * SALT_LENGTH)
+    assert len(calls) == 2
+
+
+def test_derived_keys_cache_is_bounded(monkeypatch):
+    AppState.obfuscate_keys.clear()
+    monkeypatch.setattr(obfuscate, 'MAX_CACHED_KEYS', 2)
+    monkeypatch.setattr(obfuscate, 'make_key', lambda p, s: p.encode() + s)
+    for i in range(5):
+        assert obfuscate.get_key('key', bytes([i])) == b'key' + bytes([i])
+    assert list(AppState.obfuscate_keys) == [('key', bytes([3])),
+                                             ('key', bytes([4]))]
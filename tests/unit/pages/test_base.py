@@ -1,7 +1,9 @@
+import json
+
 import pytest
 from unittest.mock import patch, MagicMock
 
-from obsiflask.pages.base import render_base_view
+from obsiflask.pages.base import PAGE_SIZE, render_base_view
 from obsiflask.bases.base_parser import Base, View
 from obsiflask.app_state import AppState
 from obsiflask.config import AppConfig, VaultConfig
@@ -44,7 +46,7 @@ def test_render_base_view_table(dummy_base, app):
             view = View([], {}, "base_path")
             view.type = "table"
             view.name = "test_view"
-            view.make_view = MagicMock(return_value=[{"col1": 1}])
+            view.make_page = MagicMock(return_value=([{"col1": 1}], 1))
             base = Base(dummy_base)
             base.views = {"test_view": view}
 
@@ -56,7 +58,10 @@ def test_render_base_view_table(dummy_base, app):
             result = render_base_view(vault, subpath, dummy_base)
             assert result == "HTML_OUTPUT"
             mock_render_template.assert_called_once()
-            view.make_view.assert_called_once_with(vault, force_refresh=False)
+            view.make_page.assert_called_once_with(vault,
+                                                   force_refresh=False,
+                                                   offset=0,
+                                                   limit=PAGE_SIZE)
 
 
 def test_render_base_view_bad_view(dummy_base, app):
@@ -74,3 +79,69 @@ def test_render_base_view_bad_view(dummy_base, app):
 
             result = render_base_view(vault, subpath, dummy_base)
             assert result[1] == 400
+
+
+def test_base_rows_stream(app, tmp_path):
+    for i in range(5):
+        (tmp_path / f'{i}.md').write_text(f'---\nrank: {i}\n---\n')
+    (tmp_path / 'base.base').write_text("""
+filters:
+  and:
+    - file.ext == "md"
+views:
+  - type: table
+    name: ranks
+    order: [file.path, rank]
+    sort:
+      - property: rank
+        direction: DESC
+""")
+    AppState.indices['vault1'].refresh()
+    client = app.test_client()
+    response = client.get('/base_rows/vault1/base.base?offset=1&limit=3')
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['X-Total-Count'] == '5'
+    assert response.headers['X-Next-Cursor'] == '4'
+    rows = [json.loads(l) for l in response.text.splitlines()]
+    assert rows == [{
+        'file_path': f'{i}.md',
+        'rank': i
+    } for i in [3, 2, 1]]
+    response = client.get('/base_rows/vault1/base.base?cursor=4')
+    assert 'X-Next-Cursor' not in response.headers
+    assert [json.loads(l)['rank'] for l in response.text.splitlines()] == [0]
+    assert client.get('/base_rows/vault1/base.base?view=bad').status_code == 400
+    for args in ['offset=-1', 'cursor=-2', 'limit=-3', 'limit=x']:
+        assert client.get(
+            f'/base_rows/vault1/base.base?{args}').status_code == 400
+    assert client.get('/base/vault1/base.base?offset=-1').status_code == 400
+
+
+@pytest.mark.parametrize('view_type', ['table', 'cards'])
+def test_render_grouped_view(app, tmp_path, view_type):
+    for i in range(4):
+        (tmp_path / f'{i}.md').write_text(
+            f'---\nkind: k{i % 2}\nrank: {i}\n---\n')
+    (tmp_path / 'base.base').write_text(f"""
+filters:
+  and:
+    - file.ext == "md"
+views:
+  - type: {view_type}
+    name: grouped
+    order: [file.path, rank]
+    groupBy:
+      property: kind
+      direction: ASC
+    summaries:
+      rank: Max
+""")
+    AppState.indices['vault1'].refresh()
+    client = app.test_client()
+    response = client.get('/base/vault1/base.base')
+    assert response.status_code == 200
+    text = response.text
+    if view_type == 'table':
+        assert '"groups": [{"count": 2, "key": "k0", "summaries": {"rank": 2}}' in text
+    else:
+        assert text.index('k0') < text.index('0.md') < text.index('2.md') < text.index('k1')
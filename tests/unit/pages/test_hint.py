@@ -5,6 +5,7 @@ from obsiflask.app_state import AppState
 from obsiflask.config import AppConfig, VaultConfig, AuthConfig
 from obsiflask.auth import register_user, get_users
 from obsiflask.main import run
+from obsiflask.pages.save import make_save
 
 
 
@@ -229,3 +230,90 @@ def test_context_hints(app):
         assert r['erase'] == 9
     assert len(result) == 1
     assert set([result[0]['text']]) == {'#anothertag'}
+
+
+def test_frecency_ranking(app):
+    result = get_hint('vault', '#')
+    AppState.hints['vault'].update_tag('mylongtag')
+    result = get_hint('vault', '#')
+    assert result[0]['text'] == '#mylongtag'
+    result = get_hint('vault', 'test')
+    first = result[0]['text']
+    other = 'test2.md' if first == 'test.md' else 'test.md'
+    AppState.hints['vault'].update_file('dir/' + other, event='open')
+    result = get_hint('vault', 'test')
+    assert result[0]['text'] == other
+
+
+def test_frecency_from_save(app, tmp_path):
+    with app.app_context():
+        _, code = make_save(tmp_path / 'dir' / 'test.md',
+                            'hello [[test2]] #newtag',
+                            AppState.indices['vault'], 'vault')
+    assert code == 200
+    hints = AppState.hints['vault']
+    # the link has a larger weight than the edit of the note itself
+    assert hints.get_file_frecency(None).top(1) in [['dir/test2.md'],
+                                                    ['test2.md']]
+    assert hints.get_tag_frecency(None).top(1) == ['newtag']
+
+
+def test_anchor_hints(app, tmp_path):
+    (tmp_path / 'dir' / 'test.md').write_text(
+        '# Introduction\n## Setup\nsome text ^block-1\n')
+    AppState.indices['vault'].refresh()
+    result = get_hint('vault', 'see [[test#')
+    assert [r['text'] for r in result
+            ] == ['Introduction]]', 'Setup]]', '^block-1]]']
+    result = get_hint('vault', 'see [[dir/test.md#set')
+    assert result[0]['text'] == 'Setup]]'
+    assert result[0]['erase'] == 3
+    result = get_hint('vault', 'see [[test#^bl')
+    assert [r['text'] for r in result] == ['^block-1]]']
+
+
+def test_property_hints(app, tmp_path):
+    (tmp_path / 'dir' / 'p1.md').write_text(
+        '---\nstatus: done\npriority: 1\nlabels: [work, home]\n---\n')
+    (tmp_path / 'dir' / 'p2.md').write_text('---\nstatus: draft\n---\n')
+    (tmp_path / 'dir' / 'p3.md').write_text('---\nstatus: done\n---\n')
+    AppState.indices['vault'].refresh()
+    result = get_hint('vault', '---\nsta', frontmatter=True)
+    assert [r['text'] for r in result] == ['status: ']
+    assert result[0]['erase'] == 3
+    result = get_hint('vault', '---\nstatus: d', frontmatter=True)
+    assert [r['text'] for r in result] == ['done', 'draft']
+    result = get_hint('vault', '---\nlabels: [work, ho', frontmatter=True)
+    assert [r['text'] for r in result] == ['home']
+    assert result[0]['erase'] == 2
+    # outside of the frontmatter it is a regular context hint
+    result = get_hint('vault', 'sta')
+    assert 'status: ' not in [r['text'] for r in result]
+
+
+def test_hint_cache(app, tmp_path):
+    result = get_hint('vault', 'anotherta')
+    assert get_hint('vault', 'anotherta') == result
+    session = AppState.hints['vault'].get_session(None)
+    assert ('anotherta', False) in session.cache
+    assert session.get_search('string_tag_index').query == 'anotherta'
+    # new tag changes the index, so the cached hints are not used
+    (tmp_path / 'dir' / 'test3.md').write_text('#anothertag2')
+    AppState.indices['vault'].refresh()
+    AppState.graphs['vault'].build(dry=True)
+    result = get_hint('vault', 'anotherta')
+    assert {r['text'] for r in result} == {'#anothertag', '#anothertag2'}
+
+
+def test_prefix_hints(app, tmp_path):
+    (tmp_path / 'dir' / 'test3.md').write_text('[[test2]] [[test2.md]]')
+    AppState.indices['vault'].refresh()
+    AppState.graphs['vault'].build(dry=True)
+    # shorter than the ngram order, ranked by the number of links
+    result = get_hint('vault', '[[te')
+    assert result[0]['text'] == 'test2.md]]'
+    assert result[0]['erase'] == 2
+    result = get_hint('vault', '#my')
+    assert [r['text'] for r in result] == ['#mylongtag']
+    result = get_hint('vault', 'anot')
+    assert result[0]['text'] == '#anothertag'
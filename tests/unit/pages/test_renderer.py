@@ -2,7 +2,6 @@ import re
 import pytest
 from pathlib import Path
 
-from flask import Flask
 import obsiflask.pages.renderer as md
 from obsiflask.app_state import AppState
 from obsiflask.config import AppConfig, VaultConfig
@@ -78,7 +77,7 @@ tags: [demo1, demo2]
 
 
 def test_parse_frontmatter_broken(monkeypatch):
-    monkeypatch.setattr(md.frontmatter, "parse",
+    monkeypatch.setattr(md.frontmatter_parser, "parse",
                         lambda _: 1 / 0)  # force error
     out = md.parse_frontmatter("text", "bad.md", 'example')
     assert "text" in out  # returns original
@@ -148,6 +147,41 @@ def test_preprocess_with_frontmatter(tmp_path):
     assert "<a" in html
 
 
+
+def test_parse_highlight():
+    assert md.parse_highlight('1-3,bad,5-4,7-9') == [(1, 3), (7, 9)]
+    assert md.parse_highlight(None) == []
+
+
+def test_add_highlights_keeps_markup():
+    text = "---\na: word\n---\n# word\nsee [[Exists]] and #tag\n- word\nword"
+    spans = [(m.start(), m.end()) for m in re.finditer('word', text)]
+    spans.append((text.index('Exists') + 1, text.index('Exists') + 3))
+    spans.append((text.index('#tag'), text.index('#tag') + 4))
+    out = md.add_highlights(text, spans)
+    start, end = md.HIGHLIGHT_START, md.HIGHLIGHT_END
+    assert out.startswith("---\na: word\n---\n")
+    assert f"# {start}word{end}" in out
+    assert f"{start}[[Exists]]{end}" in out
+    assert "#tag" in out and f"{start}#tag" not in out
+    assert f"- {start}word{end}" in out
+    assert out.endswith(f"{start}word{end}")
+
+
+def test_preprocess_with_highlight(tmp_path):
+    file = tmp_path / "note.md"
+    file.write_text("# Title\n\nsome word\nand [[Exists]]")
+    idx = DummyIndex()
+    text = file.read_text()
+    html = md.preprocess(file,
+                         idx,
+                         "vault",
+                         highlight=[(text.index('word'), text.index('word') + 4),
+                                    (text.index('Exists'), text.index('Exists') + 2)])
+    assert '<mark class="search-highlight" id="highlight-0">word</mark>' in html
+    assert re.search('<mark class="search-highlight" id="highlight-1"><a [^>]+>Exists</a></mark>', html)
+    assert md.HIGHLIGHT_START not in html
+
 @pytest.mark.parametrize("ext", [".base", ".excalidraw", ".txt"])
 def test_render_renderer_redirect(monkeypatch, ext):
     monkeypatch.setattr(md, "redirect", lambda url: f"redirect:{url}")
@@ -56,7 +56,8 @@ def test_generate_text_check_results_exact(flask_app):
                                                "vault1",
                                                mode="exact",
                                                ignore_case=False))
-        assert any("Hello" in r[1] for r in results)
+        assert results[0][1].matches == [search.SearchMatch(0, 5, 1)]
+        assert any("Hello" in r[1].get_snippets("vault1")[0] for r in results)
 
 
 def test_generate_text_check_results_regex(flask_app):
@@ -65,7 +66,8 @@ def test_generate_text_check_results_regex(flask_app):
             search.generate_text_check_results(r"Hello\s\w+",
                                                "vault1",
                                                mode="regex"))
-        assert any("Hello" in r[1] for r in results)
+        assert results[0][1].matches == [search.SearchMatch(0, 11, 1)]
+        assert any("Hello" in r[1].get_snippets("vault1")[0] for r in results)
 
 
 def test_generate_text_check_results_fuzzy(flask_app):
@@ -76,4 +78,109 @@ def test_generate_text_check_results_fuzzy(flask_app):
                                                mode="fuzzy",
                                                fuzzy_window_coef=2.0,
                                                inclusion_percent=0.5))
-        assert any("Hello" in r[1] for r in results)
+        assert any("Hello" in r[1].get_snippets("vault1")[0] for r in results)
+
+
+def test_make_search_key_normalization():
+    assert search.make_search_key('#tag1 ', 'tags', True, True, 2.0, 0.5,
+                                  True) == search.make_search_key(
+                                      'tag1', 'tags', False, False, 1.0, 0.1,
+                                      False)
+    assert search.make_search_key('Hello', 'exact', True, False, 2.0, 0.5,
+                                  False) == search.make_search_key(
+                                      'hello', 'exact', True, False, 3.0,
+                                      0.1, True)
+    assert search.make_search_key('Hello', 'exact', False, False, 2.0, 0.5,
+                                  False) != search.make_search_key(
+                                      'hello', 'exact', False, False, 2.0,
+                                      0.5, False)
+
+
+def test_failed_search_is_not_cached(client):
+    for _ in range(2):
+        client.get('/search/vault1?q=(&mode=regex').data
+    stats = client.get('/stats/vault1').get_json()['search_cache']
+    assert stats['hits'] == 0
+    assert stats['entries'] == 0
+    assert any(m.message == 'Error during text search'
+               for m in AppState.messages[('vault1', None)])
+
+
+def test_search_cache_hits_and_invalidation(client, tmp_path):
+    response = client.get('/search/vault1?q=Hello&mode=exact')
+    assert b'Hello' in response.data
+    response = client.get('/search/vault1?q=Hello&mode=exact')
+    assert b'test.md' in response.data
+    stats = client.get('/stats/vault1').get_json()['search_cache']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+    (tmp_path / "test2.md").write_text("Hello again")
+    AppState.indices['vault1'].refresh()
+    response = client.get('/search/vault1?q=Hello&mode=exact')
+    assert b'test2.md' in response.data
+    stats = client.get('/stats/vault1').get_json()['search_cache']
+    assert stats['misses'] == 2
+
+
+def test_text_search_multiple_matches(flask_app, tmp_path):
+    (tmp_path / "multi.md").write_text("a <b>word</b>\nline two: Word\n\nword, word!")
+    AppState.indices['vault1'].refresh()
+    with flask_app.test_request_context():
+        results = dict(
+            search.generate_text_check_results("word",
+                                               "vault1",
+                                               mode="exact",
+                                               ignore_case=True,
+                                               max_matches=3))
+        hit = results['multi.md']
+        assert [(m.start, m.end, m.line) for m in hit.matches
+                ] == [(5, 9, 1), (24, 28, 2), (30, 34, 4)]
+        assert hit.get_highlight() == '5-9,24-28,30-34'
+        snippets = hit.get_snippets('vault1')
+        assert len(snippets) == 3
+        assert '&lt;b&gt;<strong>word</strong>&lt;/b&gt;' in snippets[0]
+
+        # offsets are mapped back to the original text
+        results = dict(
+            search.generate_text_check_results("two word",
+                                               "vault1",
+                                               mode="exact",
+                                               ignore_case=True,
+                                               ignore_non_words=True))
+        match = results['multi.md'].matches[0]
+        assert (match.start, match.end, match.line) == (19, 28, 2)
+
+
+def test_normalize_text_offsets():
+    text = 'Hello,  world!!\nnext'
+    norm, run_starts, removed, _ = search.normalize_text(text, True, True)
+    assert norm == 'hello world next'
+    start = norm.index('world')
+    assert search.to_original_offset(start, run_starts,
+                                     removed) == text.index('world')
+    assert search.to_original_offset(start + 5, run_starts,
+                                     removed) == text.index('!!')
+    assert search.to_original_offset(norm.index('next'), run_starts,
+                                     removed) == text.index('next')
+
+
+@pytest.mark.parametrize('ignore_non_words', [False, True])
+def test_normalize_text_expanding_lowercase(ignore_non_words):
+    # "İ".lower() is two characters
+    text = 'İİ, Title: word'
+    norm, run_starts, removed, origin = search.normalize_text(
+        text, True, ignore_non_words)
+    start = norm.index('word')
+    spans = [(start, start + 4)]
+    match = search.make_matches(spans, text, run_starts, removed, origin)[0]
+    assert text[match.start:match.end] == 'word'
+    start = norm.index('title')
+    assert search.to_original_offset(start, run_starts, removed,
+                                     origin) == text.index('Title')
+
+
+def test_search_page_links_highlight(client):
+    response = client.get('/search/vault1?q=more&mode=exact')
+    assert b'highlight=23-27' in response.data
+    assert b'<strong>more</strong>' in response.data
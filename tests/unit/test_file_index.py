@@ -79,3 +79,41 @@ def test_resolve_wikilink_with_anchor(sample_vault):
                                resolve_markdown_without_ext=True,
                                wrt_anchor=False)
     assert "note1.md" in link
+
+
+def test_refresh_delta_and_generation(sample_vault):
+    fi = FileIndex(str(sample_vault), template_dir=None, vault="default")
+    deltas = []
+    fi.add_listener(deltas.append)
+    fi.refresh()
+    assert len(deltas) == 1
+    assert (sample_vault / "note1.md") in deltas[0].added
+    generation = fi.generation
+
+    fi.refresh()
+    assert len(deltas) == 1
+    assert fi.generation == generation
+
+    (sample_vault / "note1.md").write_text("# note1 changed")
+    (sample_vault / "note2.md").unlink()
+    (sample_vault / "note4.md").write_text("# note4")
+    fi.refresh()
+    assert len(deltas) == 2
+    assert deltas[1].modified == {sample_vault / "note1.md"}
+    assert deltas[1].removed == {sample_vault / "note2.md"}
+    assert deltas[1].added == {sample_vault / "note4.md"}
+    assert fi.generation == deltas[1].generation == generation + 1
+
+
+def test_apply_changes(sample_vault):
+    fi = FileIndex(str(sample_vault), template_dir=None, vault="default")
+    fi.refresh()
+    deltas = []
+    fi.add_listener(deltas.append)
+    fi.apply_changes([sample_vault / "note1.md"])
+    assert len(deltas) == 0
+
+    (sample_vault / "note1.md").write_text("# note1 changed")
+    fi.apply_changes([sample_vault / "note1.md"])
+    assert deltas[0].modified == {sample_vault / "note1.md"}
+    assert not deltas[0].added
@@ -90,7 +90,7 @@ def test_copy_move_file_op(tmp_path):
     out_dir = tmp_path / "out"
     in_dir.mkdir()
     out_dir.mkdir()
-    app = _make_app(tmp_path)
+    _make_app(tmp_path)
 
     for in_type in [
             'obf',
@@ -136,3 +136,54 @@ def test_copy_move_file_op(tmp_path):
                 if (in_dir / f"out{suffix}").exists():
                     (in_dir / f"out{suffix}").unlink()
                 (out_dir / f"out{out_suffix}").unlink()
+
+
+def test_move_rewrites_backlinks(tmp_path):
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "notes" / "target.md").write_text("# Head\ntext")
+    (tmp_path / "img.png").write_bytes(b"png")
+    (tmp_path / "src.md").write_text(
+        "[[target]] [[target#Head|alias]] [[notes/target.md]] ![[img.png]] [[other]]"
+    )
+    (tmp_path / "notes" / "local.md").write_text("see [[ target ]]")
+    app = _make_app(tmp_path)
+    with app.app_context():
+        form = FileOpForm('vault1',
+                          data={
+                              "target": "notes/target.md",
+                              "destination": "archive/renamed.md"
+                          })
+        assert copy_move_file('vault1', form, copy=False)
+        assert (tmp_path / "src.md").read_text() == (
+            "[[renamed]] [[renamed#Head|alias]] [[renamed.md]] ![[img.png]] [[other]]"
+        )
+        assert (tmp_path / "notes" / "local.md").read_text() == "see [[ renamed ]]"
+
+        form = FileOpForm('vault1',
+                          data={
+                              "target": "img.png",
+                              "destination": "archive"
+                          })
+        assert copy_move_file('vault1', form, copy=False)
+        assert "![[img.png]]" in (tmp_path / "src.md").read_text()
+        assert (tmp_path / "archive" / "img.png").exists()
+
+
+def test_move_rewrites_backlinks_directory(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "note.md").write_text("[[a/other]]")
+    (tmp_path / "a" / "other.md").write_text("")
+    (tmp_path / "b" / "note.md").write_text("")
+    (tmp_path / "src.md").write_text("[[a/note]] [[b/note]]")
+    app = _make_app(tmp_path)
+    with app.app_context():
+        form = FileOpForm('vault1',
+                          data={
+                              "target": "a",
+                              "destination": "c"
+                          })
+        assert copy_move_file('vault1', form, copy=False)
+        # ambiguous names get the path w.r.t. vault
+        assert (tmp_path / "src.md").read_text() == "[[c/note]] [[b/note]]"
+        assert (tmp_path / "c" / "note.md").read_text() == "[[other]]"
@@ -0,0 +1,39 @@
+import frontmatter
+import pytest
+
+from obsiflask.frontmatter_parser import load_header, parse, parse_metadata
+
+
+@pytest.mark.parametrize('text', [
+    '---\nstatus: done\ntags: [a, b]\n---\nbody\n---\nmore',
+    '\n\n---\na: 1\n---\n\n  body  \n',
+    '  ---\na: 1\n---\nbody',
+    '---\na: 1\n---',
+    '----\na: 1\n-----   \nbody',
+    '---\n- 1\n- 2\n---\nbody',
+    '---\na: 1\nno closing boundary',
+    'no frontmatter\n---\na: 1\n---',
+    '',
+    '+++\na = 1\n+++\nbody',
+])
+def test_same_as_python_frontmatter(text):
+    try:
+        expected = frontmatter.parse(text)
+    except Exception:
+        with pytest.raises(Exception):
+            parse(text)
+        return
+    assert parse(text) == expected
+    assert parse_metadata(text) == expected[0]
+
+
+def test_header_cache():
+    text = '---\nkey: cached\n---\n'
+    parse_metadata(text)
+    hits = load_header.cache_info().hits
+    metadata = parse_metadata('\n' + text + 'other body')
+    assert metadata == {'key': 'cached'}
+    assert load_header.cache_info().hits == hits + 1
+    # the cached value is not shared with the callers
+    metadata['key'] = 'changed'
+    assert parse_metadata(text) == {'key': 'cached'}
@@ -1,6 +1,15 @@
+import random
 from collections import deque
 
-from obsiflask.hint import NaiveStringIndex, HintIndex
+import numpy as np
+import pytest
+
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.main import run
+from obsiflask.hint import (ArrayStringIndex, HintIndex, FrecencyModel,
+                            SearchSession, HintSession, PrefixIndex)
+from tests.benchmarks.naive_index import NaiveStringIndex
 
 
 def test_update_index_rebuild_and_state_change():
@@ -60,3 +69,251 @@ def test_hint_index_populate_and_update_file():
 
     h.update_file("a.md")
     assert h.default_files_per_user[None][0] == "a.md"
+
+
+def test_add_remove_update_postings():
+    idx = NaiveStringIndex(ngram_order=2, max_ngrams=100, max_ratio_in_ngram=1.0)
+    idx.update_index({"alpha", "beta", "gamma", "delta"}, 1)
+    idx.update_index({"alpha", "beta", "gamma", "omega"}, 2)
+    assert idx.current_state == 2
+    assert "delta" not in idx.strings
+    assert all("delta" not in s for s in idx.ngrams_to_strings.values())
+    assert "omega" in idx.ngrams_to_strings["om"]
+    candidates, _ = idx.search("omeg")
+    assert candidates[0][0] == "omega"
+
+
+def test_update_index_skips_same_generation():
+    idx = NaiveStringIndex(ngram_order=2, max_ngrams=100, max_ratio_in_ngram=1.0)
+    idx.update_index({"foo", "bar"}, 5)
+    idx.update_index({"foo", "bar", "baz"}, 5)
+    assert "baz" not in idx.strings
+    idx.update_index({"foo", "bar", "baz"}, 6)
+    assert "baz" in idx.strings
+
+
+def test_rebuild_restores_blacklisted_ngrams():
+    idx = NaiveStringIndex(ngram_order=2, max_ngrams=100, max_ratio_in_ngram=0.4)
+    idx.update_index({"ab1", "ab2", "ab3", "cd4", "ef5", "gh6"})
+    assert "ab" in idx.blacklist
+    idx.update_index({"ab1", "gh6", "ij7", "kl8", "mn9"})
+    # most of the strings are removed, so the index is rebuilt
+    assert "ab" not in idx.blacklist
+    assert idx.ngrams_to_strings["ab"] == {"ab1"}
+    assert idx.rebuild_size == 5
+
+
+def test_array_index_matches_naive_index():
+    rng = random.Random(0)
+    strings = {
+        ''.join(rng.choice('abcdefgh') for _ in range(rng.randint(3, 10)))
+        for _ in range(300)
+    }
+    naive = NaiveStringIndex(3, 10000, 1.0)
+    array = ArrayStringIndex(3, 10000, 1.0)
+    naive.update_index(strings)
+    array.update_index(strings)
+    for q in ['abc', 'hgfe', 'aaaa', 'cdefgh', 'zzz']:
+        naive_res, naive_best = naive.search(q)
+        array_res, array_best = array.search(q)
+        assert naive_best == array_best
+        # the order of equal length differences is not defined
+        assert sorted(d for _, d in naive_res) == sorted(d
+                                                         for _, d in array_res)
+
+
+def test_array_index_add_remove():
+    idx = ArrayStringIndex(ngram_order=2, max_ngrams=100, max_ratio_in_ngram=1.0)
+    idx.update_index({"alpha", "beta", "gamma", "delta"}, 1)
+    idx.update_index({"alpha", "beta", "gamma", "omega"}, 2)
+    assert idx.strings == {"alpha", "beta", "gamma", "omega"}
+    assert idx.search("delta")[0][0][0] != "delta"
+    assert idx.search("omeg")[0][0] == ("omega", 1)
+    for ids in idx.ngrams_to_strings.values():
+        assert ids.dtype == np.uint32
+        assert np.all(np.diff(ids.astype(np.int64)) > 0)
+    idx.update_index({"omega"}, 3)
+    # most of the strings are removed, so the index is rebuilt
+    assert idx.id_to_string == ["omega"]
+    assert idx.search("alpha") == ([], 0)
+
+
+def test_file_changes_are_applied_as_delta(tmp_path, monkeypatch):
+    (tmp_path / 'dir').mkdir()
+    (tmp_path / 'dir' / 'note.md').write_text('')
+    (tmp_path / 'note.md').write_text('')
+    (tmp_path / 'image.png').write_text('')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    run(config, True)
+    hints = AppState.hints['vault1']
+    for idx in [hints.string_all_file_index, hints.string_file_index]:
+        # the strings must not be compared
+        monkeypatch.setattr(idx, 'update_index', None)
+    (tmp_path / 'new.md').write_text('')
+    (tmp_path / 'note.md').unlink()
+    (tmp_path / 'image.png').unlink()
+    AppState.indices['vault1'].refresh()
+    assert hints.string_file_index.strings == {
+        'dir/note.md', 'note.md', 'new.md'
+    }
+    assert hints.string_all_file_index.strings == {
+        'dir', 'dir/note.md', 'note.md', 'new.md'
+    }
+    assert hints.string_file_index.current_state == AppState.indices[
+        'vault1'].names_generation
+
+
+def test_array_index_prune_keeps_rarest():
+    idx = ArrayStringIndex(ngram_order=2, max_ngrams=2, max_ratio_in_ngram=1.0)
+    idx.update_index({"abx", "aby", "abz"})
+    assert "ab" in idx.blacklist
+    assert len(idx.ngrams_to_strings) == 2
+    assert all(len(ids) == 1 for ids in idx.ngrams_to_strings.values())
+
+
+def test_frecency_decay_and_order():
+    model = FrecencyModel(half_life=10, max_items=10)
+    model.update('old.md', 4, now=0)
+    model.update('new.md', 1, now=20)
+    assert model.score('old.md', now=20) == pytest.approx(1)
+    assert model.score('new.md', now=20) == pytest.approx(1)
+    model.update('new.md', 1, now=20)
+    assert model.score('new.md', now=30) == pytest.approx(1)
+    assert model.top(2) == ['new.md', 'old.md']
+    assert model.score('missing.md') == 0
+
+
+def test_frecency_is_bounded():
+    model = FrecencyModel(half_life=10, max_items=3)
+    for i in range(100):
+        model.update(f'{i}.md', 1, now=i)
+        model.update('0.md', 1, now=i)
+    assert len(model.keys) == 3
+    assert len(model.heap) <= 2 * 3 + 1
+    assert model.top(3) == ['0.md', '99.md', '98.md']
+
+
+def test_hint_state_per_user():
+    h = HintIndex(2, 5, 0.9)
+    for user in [None, 'a', 'b', 'c']:
+        h.populate_default_files(user, [])
+    h.update_file('a.md', 'a', event='open')
+    state_a, state_c = h.get_state('a'), h.get_state('c')
+    h.update_file('b.md', 'b', event='open')
+    assert h.get_state('a') == state_a
+    # without own model the user gets the model of all users
+    assert h.get_state('c') != state_c
+    h.update_tag('tag', 'a')
+    assert h.get_state('a') != state_a
+
+
+def test_frecency_save_load(tmp_path):
+    h = HintIndex(2, 5, 0.9, save_path=tmp_path / 'frecency.json')
+    h.populate_default_files(None, [])
+    h.update_file('dir/a.md', event='link')
+    h.update_tag('tag')
+    h.save()
+    h2 = HintIndex(2, 5, 0.9, save_path=tmp_path / 'frecency.json')
+    h2.load()
+    assert set(h2.get_file_frecency(None).keys) == {'dir/a.md', 'a.md'}
+    assert h2.get_tag_frecency('user').top(1) == ['tag']
+
+
+def test_frecency_is_saved_encrypted(tmp_path, monkeypatch):
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    monkeypatch.setattr(AppState, 'config', config)
+    path = tmp_path / 'frecency.json'
+    h = HintIndex(2, 5, 0.9, save_path=path, vault='vault1')
+    h.populate_default_files(None, [])
+    h.update_file('secret/plan.md', event='open')
+    h.save()
+    assert b'plan.md' not in path.read_bytes()
+    h2 = HintIndex(2, 5, 0.9, save_path=path, vault='vault1')
+    h2.load()
+    assert set(h2.get_file_frecency(None).keys) == {
+        'secret/plan.md', 'plan.md'
+    }
+
+
+def test_search_session_matches_full_search():
+    rng = random.Random(1)
+    strings = {
+        ''.join(rng.choice('abcdefgh') for _ in range(rng.randint(3, 10)))
+        for _ in range(300)
+    }
+    idx = ArrayStringIndex(3, 10000, 1.0)
+    idx.update_index(strings)
+    session = SearchSession()
+    for word in ['abcdefgh', 'hgfedcba', 'aabbcc']:
+        for i in range(1, len(word) + 1):
+            # typing, then erasing the last char
+            for q in [word[:i], word[:i - 1]]:
+                assert idx.search(q, 1000, session) == idx.search(q, 1000)
+    assert session.query == 'aabbc'
+
+
+def test_search_session_invalidated_by_update():
+    idx = ArrayStringIndex(2, 100, 1.0)
+    idx.update_index({"alpha", "beta"}, 1)
+    session = SearchSession()
+    assert idx.search("omeg", 10, session) == ([], 0)
+    idx.update_index({"alpha", "beta", "omega"}, 2)
+    assert idx.search("omega", 10, session)[0] == [("omega", 0)]
+
+
+def test_hint_session_lru():
+    session = HintSession(cache_size=2)
+    session.put('a', 1, [{'text': 'a'}])
+    session.put('b', 1, [{'text': 'b'}])
+    assert session.get('a', 1) == [{'text': 'a'}]
+    session.put('c', 1, [{'text': 'c'}])
+    assert session.get('b', 1) is None
+    assert session.get('a', 1) == [{'text': 'a'}]
+    # outdated state
+    assert session.get('c', 2) is None
+    # results are copied
+    session.get('a', 1)[0]['text'] = 'changed'
+    assert session.get('a', 1) == [{'text': 'a'}]
+    session = HintSession(cache_size=0)
+    session.put('a', 1, [{'text': 'a'}])
+    assert session.get('a', 1) is None
+
+
+def brute_force_prefix(scores, q, limit):
+    found = [(-score, s) for s, score in scores.items()
+             if s.lower().startswith(q.lower())]
+    return [s for _, s in sorted(found)[:limit]]
+
+
+def test_prefix_index_matches_brute_force():
+    rng = random.Random(2)
+    idx = PrefixIndex(top_k=5)
+    scores = {}
+    for step in range(6):
+        new_scores = {
+            ''.join(rng.choice('abAB/') for _ in range(rng.randint(1, 6))):
+            float(rng.randint(0, 5))
+            for _ in range(200)
+        }
+        # keep a part of the strings with the old or new scores
+        for s in rng.sample(sorted(scores), len(scores) // 2):
+            new_scores[s] = scores[s] if rng.random() < 0.5 else float(
+                rng.randint(0, 5))
+        scores = new_scores
+        idx.update_index(scores, step)
+        assert idx.strings == set(scores)
+        for q in ['a', 'ab', 'B', 'ab/', 'aBa', 'x', '/']:
+            assert [s for s, _ in idx.search(q, 5)
+                    ] == brute_force_prefix(scores, q, 5)
+
+
+def test_prefix_index_compression():
+    idx = PrefixIndex()
+    idx.update_index({'project/a.md': 1, 'project/b.md': 2, 'plan.md': 0})
+    assert list(idx.root.children) == ['p']
+    assert idx.root.children['p'].label == 'p'
+    assert idx.search('PRO') == [('project/b.md', 9), ('project/a.md', 9)]
+    idx.remove({'plan.md'})
+    # the nodes are merged back
+    assert idx.root.children['p'].label == 'project/'
+    assert idx.search('pl') == []
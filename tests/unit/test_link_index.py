@@ -0,0 +1,29 @@
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.link_index import get_link_key
+from obsiflask.main import run
+
+
+def test_get_link_key():
+    assert get_link_key('folder/Note.md#header') == 'note'
+    assert get_link_key(' note ') == 'note'
+    assert get_link_key('image.png') == 'image.png'
+
+
+def test_link_index_updates(tmp_path):
+    (tmp_path / 'a.md').write_text('[[b]] [[c#x|y]]')
+    (tmp_path / 'b.md').write_text('[[c]]')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    run(config, True)
+    index = AppState.link_indices['vault1']
+    assert index.get_sources(tmp_path / 'c.md') == {
+        tmp_path / 'a.md', tmp_path / 'b.md'
+    }
+    (tmp_path / 'b.md').write_text('no links')
+    AppState.indices['vault1'].apply_changes([tmp_path / 'b.md'])
+    assert index.dirty == {tmp_path / 'b.md'}
+    assert index.get_sources(tmp_path / 'c.md') == {tmp_path / 'a.md'}
+    (tmp_path / 'a.md').unlink()
+    AppState.indices['vault1'].refresh()
+    assert index.get_sources(tmp_path / 'c.md') == set()
+    assert index.get_sources(tmp_path / 'b.md') == set()
@@ -0,0 +1,79 @@
+import pytest
+
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.main import run
+from obsiflask.mentions import AhoCorasick
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'Project Alpha.md').write_text('about the project, see alpha')
+    (tmp_path / 'Alpha.md').write_text('alpha itself')
+    (tmp_path / 'sub' / 'daily.md').write_text(
+        'Worked on project alpha.\nSee [[Project Alpha]] and alphabet.\nalpha')
+    (tmp_path / 'ab.md').write_text('short title')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    AppState.messages[('vault1', None)] = []
+    app = run(config, True)
+    with app.test_request_context():
+        yield app
+
+
+def test_aho_corasick():
+    automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+    found = sorted(
+        (automaton.patterns[p], s, e) for p, s, e in automaton.find('uShers'))
+    assert found == [('he', 2, 4), ('hers', 2, 6), ('she', 1, 4)]
+    assert AhoCorasick([]).find('text') == []
+
+
+def test_aho_corasick_expanding_lowercase():
+    # "İ" is lowercased to two characters, the offsets are in the original text
+    text = 'İİ Project İstanbul'
+    automaton = AhoCorasick(['project', 'istanbul', 'i̇stanbul'])
+    found = [(automaton.patterns[p], text[s:e])
+             for p, s, e in automaton.find(text)]
+    assert found == [('project', 'Project'), ('i̇stanbul', 'İstanbul')]
+
+
+def test_note_mentions(app, tmp_path):
+    index = AppState.mention_indices['vault1']
+    mentions = index.get_note_mentions(tmp_path / 'sub' / 'daily.md')
+    # longest title wins, linked text, word parts and short titles are skipped
+    assert [(m.title, m.target, m.line) for m in mentions] == [
+        ('project alpha', 'Project Alpha.md', 1), ('alpha', 'Alpha.md', 3)
+    ]
+    text = (tmp_path / 'sub' / 'daily.md').read_text()
+    assert text[mentions[1].start:mentions[1].end] == 'alpha'
+    # a note does not mention itself
+    assert index.get_note_mentions(tmp_path / 'Alpha.md') == []
+
+
+def test_report_is_updated_incrementally(app, tmp_path):
+    index = AppState.mention_indices['vault1']
+    counts, mentions = index.get_report()
+    assert dict(counts) == {'Project Alpha.md': 1, 'Alpha.md': 2}
+    assert set(mentions) == {'sub/daily.md', 'Project Alpha.md'}
+
+    (tmp_path / 'sub' / 'daily.md').write_text('nothing here')
+    AppState.indices['vault1'].apply_changes([tmp_path / 'sub' / 'daily.md'])
+    assert index.dirty == {tmp_path / 'sub' / 'daily.md'}
+    counts, _ = index.get_report()
+    assert dict(counts) == {'Alpha.md': 1}
+
+    (tmp_path / 'Nothing.md').write_text('')
+    AppState.indices['vault1'].refresh()
+    counts, _ = index.get_report()
+    assert dict(counts) == {'Alpha.md': 1, 'Nothing.md': 1}
+
+
+def test_mentions_pages(app):
+    client = app.test_client()
+    response = client.get('/mentions/vault1?raw=1').get_json()
+    assert response['counts'] == {'Project Alpha.md': 1, 'Alpha.md': 2}
+    response = client.get('/mentions/vault1')
+    assert b'sub/daily.md' in response.data
+    response = client.get('/renderer/vault1/sub/daily.md')
+    assert b'Unlinked mentions: 2' in response.data
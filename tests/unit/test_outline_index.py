@@ -0,0 +1,112 @@
+import re
+from urllib import parse
+
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.main import run
+from obsiflask.outline_index import parse_outline, match_outline
+from obsiflask.pages.renderer import preprocess
+
+
+def test_parse_outline():
+    text = '''---
+# yaml comment
+---
+# Title
+text ^intro
+
+```
+# not a heading ^nope
+```
+## Second level ##
+- item ^item-1
+'''
+    outline = parse_outline(text)
+    assert [(e.anchor, e.level, e.line) for e in outline] == [
+        ('Title', 1, 4),
+        ('^intro', 0, 5),
+        ('Second level', 2, 10),
+        ('^item-1', 0, 11),
+    ]
+
+
+def test_parse_outline_setext():
+    text = '''Title
+=====
+text ^intro
+
+Multi-line
+heading ^head
+---
+
+text
+
+---
+- item
+---
+'''
+    outline = parse_outline(text)
+    assert [(e.anchor, e.level, e.line) for e in outline] == [
+        ('Title', 1, 1),
+        ('^intro', 0, 3),
+        ('Multi-line heading ^head', 2, 5),
+    ]
+
+
+def test_match_outline():
+    outline = parse_outline('# Setup\n# Local setup\n# Summary\n')
+    assert [e.anchor for e in match_outline(outline, 'se', 10)
+            ] == ['Setup', 'Local setup']
+    assert [e.anchor for e in match_outline(outline, 'smr', 10)] == ['Summary']
+    assert len(match_outline(outline, '', 2)) == 2
+
+
+def test_outline_index_updates(tmp_path):
+    (tmp_path / 'a.md').write_text('# One\ntext ^block\n')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    run(config, True)
+    index = AppState.outline_indices['vault1']
+    assert index.has_anchor(tmp_path / 'a.md', 'One')
+    assert not index.has_anchor(tmp_path / 'a.md', 'one')
+    assert not index.has_anchor(tmp_path / 'a.md', 'Two')
+    assert index.has_anchor(tmp_path / 'a.md', '^block')
+    (tmp_path / 'a.md').write_text('# One\n# Two\n')
+    AppState.indices['vault1'].apply_changes([tmp_path / 'a.md'])
+    assert index.dirty == {tmp_path / 'a.md'}
+    assert index.has_anchor(tmp_path / 'a.md', 'Two')
+    assert not index.has_anchor(tmp_path / 'a.md', '^block')
+    assert [e.anchor for e in index.get_outline(tmp_path / 'a.md')
+            ] == ['One', 'Two']
+
+
+def test_resolve_wikilink_validates_anchor(tmp_path):
+    (tmp_path / 'a.md').write_text('Setext\ntitle\n===\n'
+                                   '## **Bold** text [[b]]\n'
+                                   '# Title\n')
+    (tmp_path / 'b.md').write_text('')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    run(config, True)
+    index = AppState.indices['vault1']
+
+    def resolve(link):
+        return index.resolve_wikilink(link,
+                                      tmp_path / 'b.md',
+                                      True,
+                                      validate_anchor=True)
+
+    # the verdict does not depend on the rendered pages
+    assert resolve('a#Title') == 'a.md#Title'
+    assert resolve('a#Two') == 'a.md'
+    html = preprocess(tmp_path / 'a.md', index, 'vault1')
+    ids = re.findall(r'<h\d id="([^"]*)"', html)
+    assert ids[0] == parse.quote('Setext title')
+    assert ids[1].startswith(parse.quote('<strong>Bold</strong> text <a'))
+    assert ids[2] == 'Title'
+    for heading_id in ids:
+        assert resolve('a#' +
+                       parse.unquote(heading_id)) == 'a.md#' + heading_id
+    assert resolve('a#**Bold** text [[b]]') == 'a.md'
+    assert resolve('a#title') == 'a.md'
+    assert resolve('a#Two') == 'a.md'
+    assert index.resolve_wikilink('a#Two', tmp_path / 'b.md',
+                                  True) == 'a.md#Two'
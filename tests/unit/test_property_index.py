@@ -0,0 +1,72 @@
+from obsiflask.app_state import AppState
+from obsiflask.bases.filter import FieldFilter, FilterAnd, FilterOr
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.main import run
+from obsiflask.query import execute_query
+
+
+def make_vault(tmp_path):
+    (tmp_path / 'a.md').write_text(
+        '---\nstatus: done\nlabels: [work, home]\n---\ntext')
+    (tmp_path / 'b.md').write_text('---\nstatus: draft\nlabels: work\n---\n')
+    (tmp_path / 'c.md').write_text('---\nstatus: done\nmeta: {x: 1}\n---\n')
+    (tmp_path / 'd.md').write_text('no properties')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    AppState.messages[('vault1', None)] = []
+    app = run(config, True)
+    return app, AppState.property_indices['vault1']
+
+
+def test_property_index_queries(tmp_path):
+    _, index = make_vault(tmp_path)
+    assert index.equal('status', 'done') == {tmp_path / 'a.md', tmp_path / 'c.md'}
+    assert index.equal('status', '') is None
+    assert index.contains('labels', 'work') == {
+        tmp_path / 'a.md', tmp_path / 'b.md'
+    }
+    assert index.contains('labels', 'wor') == {tmp_path / 'b.md'}
+    assert index.contains('meta', 'x') is None
+    assert index.get_keys()[0] == ('status', 3)
+    assert index.get_values('labels') == [('work', 2), ('home', 1)]
+
+
+def test_property_index_updates(tmp_path):
+    _, index = make_vault(tmp_path)
+    index.get_keys()
+    (tmp_path / 'a.md').write_text('---\nstatus: draft\n---\n')
+    AppState.indices['vault1'].apply_changes([tmp_path / 'a.md'])
+    assert index.equal('status', 'draft') == {
+        tmp_path / 'a.md', tmp_path / 'b.md'
+    }
+    assert index.contains('labels', 'home') == set()
+    (tmp_path / 'b.md').unlink()
+    AppState.indices['vault1'].refresh()
+    assert index.equal('status', 'draft') == {tmp_path / 'a.md'}
+    (tmp_path / 'e.md').write_text('---\nstatus: draft\n---\n')
+    AppState.indices['vault1'].refresh()
+    assert index.equal('status', 'draft') == {
+        tmp_path / 'a.md', tmp_path / 'e.md'
+    }
+    assert len(index.paths) == 4
+
+
+def test_filter_plan(tmp_path):
+    make_vault(tmp_path)
+    f = FieldFilter('status == "done" and labels.contains("home")')
+    assert f.plan('vault1') == ({tmp_path / 'a.md'}, True)
+    f = FieldFilter('status == "done" and file.ext == "md"')
+    assert f.plan('vault1') == ({tmp_path / 'a.md', tmp_path / 'c.md'}, True)
+    f = FilterOr([FieldFilter('status == "draft"'), FieldFilter('x > 1')])
+    assert f.plan('vault1') == (None, False)
+    f = FilterAnd([FieldFilter('"draft" == status')])
+    assert f.plan('vault1') == ({tmp_path / 'b.md'}, True)
+
+
+def test_query_with_properties(tmp_path):
+    app, _ = make_vault(tmp_path)
+    with app.test_request_context():
+        assert list(execute_query('status == "done"',
+                                  'vault1')) == ['a.md', 'c.md']
+        assert list(
+            execute_query('labels.contains("work") and status == "done"',
+                          'vault1')) == ['a.md']
@@ -0,0 +1,86 @@
+import pytest
+
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.main import run
+from obsiflask.query import (parse_query, plan, execute_query, QueryContext,
+                             AndNode, OrNode, NotNode, TagPredicate,
+                             PathPredicate, TextPredicate, LinkPredicate,
+                             FormulaPredicate)
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / 'runbooks').mkdir()
+    (tmp_path / 'runbooks' / 'deploy.md').write_text(
+        'How to deploy the service #ops\n[[index]]')
+    (tmp_path / 'runbooks' / 'rollback.md').write_text(
+        'How to roll back #ops')
+    (tmp_path / 'notes.md').write_text('deploy notes #ops')
+    (tmp_path / 'index.md').write_text('[[deploy]] [[notes]]')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    AppState.messages[('vault1', None)] = []
+    app = run(config, True)
+    with app.test_request_context():
+        yield app
+
+
+def test_parse_query():
+    node = parse_query(
+        'text("deploy") and #ops and file.folder == "runbooks" and file.ext != "md"'
+    )
+    assert isinstance(node, AndNode)
+    assert [type(c) for c in node.children] == [
+        TextPredicate, TagPredicate, PathPredicate, FormulaPredicate
+    ]
+    assert node.children[2].field == 'folder'
+    assert node.children[2].value == 'runbooks'
+
+    node = parse_query('!(#a or linksto("b"))')
+    assert isinstance(node, NotNode)
+    assert isinstance(node.child, OrNode)
+    assert isinstance(node.child.children[1], LinkPredicate)
+
+    assert isinstance(parse_query('file.name.startsWith("a")'),
+                      FormulaPredicate)
+
+
+def test_parse_query_errors():
+    with pytest.raises(Exception):
+        parse_query('text(file.name)')
+    with pytest.raises(Exception):
+        parse_query('#a == 1')
+
+
+def test_plan_uses_indices(app):
+    ctx = QueryContext('vault1')
+    node = parse_query('text("deploy") and #ops and file.folder == "runbooks"')
+    candidates, residuals = plan(node, ctx)
+    assert {c.name for c in candidates} == {'deploy.md'}
+    # tag and path predicates are answered by indices
+    assert [type(r) for r in residuals] == [TextPredicate]
+
+    node = parse_query('#ops or file.name.startsWith("index")')
+    candidates, residuals = plan(node, ctx)
+    assert candidates is None
+    assert residuals == [node]
+
+
+def test_execute_query(app):
+    assert list(
+        execute_query('text("deploy") and #ops and file.folder == "runbooks"',
+                      'vault1')) == ['runbooks/deploy.md']
+    assert sorted(execute_query('#ops and !text("deploy")',
+                                'vault1')) == ['runbooks/rollback.md']
+    assert sorted(execute_query('linkedfrom("index")',
+                                'vault1')) == ['notes.md', 'runbooks/deploy.md']
+    assert sorted(execute_query('linksto("index") or file.name == "notes.md"',
+                                'vault1')) == ['notes.md', 'runbooks/deploy.md']
+    assert list(execute_query('#absent and text("deploy")', 'vault1')) == []
+
+
+def test_search_page_query_mode(app):
+    client = app.test_client()
+    response = client.get('/search/vault1?q=%23ops and text("roll")&mode=query')
+    assert b'rollback.md' in response.data
+    assert b'deploy.md' not in response.data
@@ -0,0 +1,99 @@
+import pytest
+
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.encrypt.obfuscate import obf_open, obf_write_atomic
+from obsiflask.main import run
+from obsiflask.replace import find_replacements, apply_replacements
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / 'a.md').write_text('old term, Old term\nsecond line')
+    (tmp_path / 'b.md').write_text('nothing here')
+    (tmp_path / 'c.md').write_text('path\\to old term')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(tmp_path))})
+    AppState.messages[('vault1', None)] = []
+    app = run(config, True, disable_csrf=True)
+    with obf_open(tmp_path / 'secret.obf.md', 'vault1', 'w') as out:
+        out.write('secret old term')
+    AppState.indices['vault1'].refresh()
+    with app.test_request_context():
+        yield app
+
+
+def test_find_replacements(app):
+    changes = find_replacements('vault1', 'old term', 'new\\term')
+    assert [(c.path, c.count) for c in changes] == [('a.md', 1), ('c.md', 1),
+                                                    ('secret.obf.md', 1)]
+    assert changes[1].new_text == 'path\\to new\\term'
+    assert '-old term, Old term\n+new\\term, Old term' in changes[0].get_diff()
+
+    changes = find_replacements('vault1', 'old term', 'x', ignore_case=True)
+    assert changes[0].new_text.startswith('x, x')
+
+    changes = find_replacements('vault1', r'(\w+) line', r'\1 row', regex=True)
+    assert [c.new_text for c in changes] == ['old term, Old term\nsecond row']
+
+    with pytest.raises(ValueError):
+        find_replacements('vault1', '', 'x')
+
+
+def test_apply_replacements(app, tmp_path):
+    generation = AppState.indices['vault1'].generation
+    salt_header = (tmp_path / 'secret.obf.md').read_bytes()[:20]
+    changes = find_replacements('vault1', 'old term', 'new term')
+    # concurrent modification after the preview
+    (tmp_path / 'c.md').write_text('changed old term')
+    written, skipped = apply_replacements('vault1', changes)
+    assert written == ['a.md', 'secret.obf.md']
+    assert skipped == ['c.md']
+    assert (tmp_path / 'a.md').read_text().startswith('new term')
+    with obf_open(tmp_path / 'secret.obf.md', 'vault1') as inp:
+        assert inp.read() == 'secret new term'
+    # obfuscated files keep the salt
+    assert (tmp_path / 'secret.obf.md').read_bytes()[:20] == salt_header
+    # single change batch
+    assert AppState.indices['vault1'].generation == generation + 1
+    assert AppState.text_indices['vault1'].candidates('new term') == {
+        tmp_path / 'a.md', tmp_path / 'secret.obf.md'
+    }
+    assert not list(tmp_path.glob('.*.tmp'))
+
+
+def test_obf_write_atomic_new_file(app, tmp_path):
+    obf_write_atomic(tmp_path / 'new.obf.md', 'vault1', 'content')
+    with obf_open(tmp_path / 'new.obf.md', 'vault1') as inp:
+        assert inp.read() == 'content'
+
+
+def test_replace_page(app, tmp_path):
+    client = app.test_client()
+    response = client.post('/replace/vault1',
+                           data={
+                               'pattern': 'second',
+                               'replacement': 'third',
+                               'preview': 'Preview'
+                           })
+    assert b'Preview: 1 files' in response.data
+    assert b'+third line' in response.data
+    assert (tmp_path / 'a.md').read_text().endswith('second line')
+
+    generation = AppState.indices['vault1'].get_generation()
+    response = client.post('/replace/vault1',
+                           data={
+                               'pattern': 'second',
+                               'replacement': 'third',
+                               'generation': str(generation - 1),
+                               'apply': 'Apply'
+                           })
+    assert (tmp_path / 'a.md').read_text().endswith('second line')
+
+    response = client.post('/replace/vault1',
+                           data={
+                               'pattern': 'second',
+                               'replacement': 'third',
+                               'generation': str(generation),
+                               'apply': 'Apply'
+                           })
+    assert (tmp_path / 'a.md').read_text().endswith('third line')
@@ -0,0 +1,62 @@
+from obsiflask.search_cache import SearchCache
+
+
+def test_get_put():
+    cache = SearchCache(1000)
+    assert cache.get(('exact', 'a'), 0) is None
+    cache.put(('exact', 'a'), 0, [('a.md', 'ctx')])
+    assert cache.get(('exact', 'a'), 0) == [('a.md', 'ctx')]
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['bytes'] == len('a.md') + len('ctx')
+
+
+def test_generation_drops_entries():
+    cache = SearchCache(1000)
+    cache.put(('exact', 'a'), 0, [('a.md', '')])
+    assert cache.get(('exact', 'a'), 1) is None
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['bytes'] == 0
+
+
+def test_lru_eviction_by_bytes():
+    cache = SearchCache(20)
+    cache.put(('q', 1), 0, [('1234567890', '')])
+    cache.put(('q', 2), 0, [('1234567890', '')])
+    cache.get(('q', 1), 0)  # now the second entry is the oldest one
+    cache.put(('q', 3), 0, [('1234567890', '')])
+    assert cache.get(('q', 2), 0) is None
+    assert cache.get(('q', 1), 0) is not None
+    assert cache.get(('q', 3), 0) is not None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] <= 20
+
+
+def test_too_large_entry_is_ignored():
+    cache = SearchCache(5)
+    cache.put(('q', ), 0, [('1234567890', '')])
+    assert cache.get(('q', ), 0) is None
+
+
+def test_wrap_saves_only_finished_iteration():
+    cache = SearchCache(1000)
+    gen = cache.wrap(('q', ), 0, iter([('a', ''), ('b', '')]))
+    next(gen)
+    gen.close()
+    assert cache.get(('q', ), 0) is None
+    assert list(cache.wrap(('q', ), 0, iter([('a', ''),
+                                            ('b', '')]))) == [('a', ''),
+                                                              ('b', '')]
+    assert cache.get(('q', ), 0) == [('a', ''), ('b', '')]
+
+
+def test_wrap_skips_failed_search():
+
+    def failed():
+        yield ('a', '')
+        return False
+
+    cache = SearchCache(1000)
+    assert list(cache.wrap(('q', ), 0, failed())) == [('a', '')]
+    assert cache.get(('q', ), 0) is None
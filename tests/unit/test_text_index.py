@@ -0,0 +1,140 @@
+import pytest
+
+from obsiflask import text_index as text_index_module
+from obsiflask.app_state import AppState
+from obsiflask.config import AppConfig, VaultConfig
+from obsiflask.encrypt.obfuscate import obf_open
+from obsiflask.main import run
+from obsiflask.text_index import TextIndex, get_trigrams, read_header, read_text
+
+
+@pytest.fixture
+def app(tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    (vault / 'plain.md').write_text('Deploy the service to production')
+    (vault / 'other.md').write_text('Nothing interesting here')
+    (vault / 'image.png').write_bytes(b'\x00\x01')
+    config = AppConfig(vaults={'vault1': VaultConfig(str(vault))},
+                       service_dir=str(tmp_path / 'service'))
+    AppState.messages[('vault1', None)] = []
+    with obf_open(vault / 'secret.obf.md', 'vault1', 'w',
+                  obfuscation_mode='obfuscate',
+                  key=config.vaults['vault1'].obfuscation_key) as out:
+        out.write('The secret deploy procedure')
+    app = run(config, True)
+    return app
+
+
+def test_get_trigrams():
+    assert get_trigrams('AbCd') == {'abc', 'bcd'}
+    assert get_trigrams('ab') == set()
+
+
+def test_obfuscated_files_are_indexed(app):
+    index: TextIndex = AppState.text_indices['vault1']
+    vault_path = AppState.indices['vault1'].path
+    paths = index.get_paths()
+    assert vault_path / 'secret.obf.md' in paths
+    assert vault_path / 'image.png' not in paths
+    assert index.get_text(vault_path /
+                          'secret.obf.md') == 'The secret deploy procedure'
+    assert index.candidates('DEPLOY') == {
+        vault_path / 'secret.obf.md', vault_path / 'plain.md'
+    }
+    assert index.candidates('nothing interesting') == {
+        vault_path / 'other.md'
+    }
+    assert index.candidates('absent') == set()
+    assert index.candidates('de') is None
+
+
+def test_update_from_file_index(app):
+    index: TextIndex = AppState.text_indices['vault1']
+    vault_path = AppState.indices['vault1'].path
+    (vault_path / 'new.md').write_text('brand new note')
+    (vault_path / 'other.md').unlink()
+    AppState.indices['vault1'].refresh()
+    assert index.candidates('brand new') == {vault_path / 'new.md'}
+    assert index.candidates('interesting') == set()
+
+
+def test_get_text_rereads_changed_files(app):
+    vault_path = AppState.indices['vault1'].path
+    (vault_path / 'plain.md').write_text('changed content, longer than before')
+    assert read_text(vault_path / 'plain.md',
+                     'vault1') == 'changed content, longer than before'
+
+
+def test_saved_index_is_encrypted_and_reused(app, tmp_path, monkeypatch):
+    index: TextIndex = AppState.text_indices['vault1']
+    index.save()
+    saved = (tmp_path / 'service' / 'text_index_vault1.bin').read_bytes()
+    assert b'secret' not in saved
+    assert b'Deploy' not in saved
+
+    reads = []
+    original = text_index_module.obf_open
+
+    def counting_obf_open(path, *args, **kwargs):
+        reads.append(path)
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(text_index_module, 'obf_open', counting_obf_open)
+    new_index = TextIndex('vault1')
+    new_index.load()
+    assert len(reads) == 1  # only the index itself
+    vault_path = AppState.indices['vault1'].path
+    assert new_index.candidates('secret deploy') == {
+        vault_path / 'secret.obf.md'
+    }
+    assert len(reads) == 1
+    # the candidates are read to verify the matches
+    assert new_index.get_text(vault_path /
+                              'secret.obf.md') == 'The secret deploy procedure'
+    assert len(reads) == 2
+
+
+def test_load_drops_changed_files(app, monkeypatch):
+    index: TextIndex = AppState.text_indices['vault1']
+    index.save()
+    vault_path = AppState.indices['vault1'].path
+    # changed while the app is down
+    (vault_path / 'other.md').unlink()
+    (vault_path / 'plain.md').write_text('Rewritten note')
+    new_index = TextIndex('vault1')
+    new_index.load()
+    assert new_index.get_paths() == [vault_path / 'secret.obf.md']
+    assert new_index.candidates('interesting') == set()
+    assert new_index.candidates('deploy') == {vault_path / 'secret.obf.md'}
+
+
+def test_postings_are_compacted(app):
+    index: TextIndex = AppState.text_indices['vault1']
+    vault_path = AppState.indices['vault1'].path
+    old_id = index.ids[vault_path / 'plain.md']
+    (vault_path / 'plain.md').write_text('Another version of the note')
+    AppState.indices['vault1'].refresh()
+    assert index.candidates('deploy') == {vault_path / 'secret.obf.md'}
+    assert index.stale > 0
+    index.save()
+    assert index.stale == 0
+    ids = set().union(*index.postings.values())
+    assert old_id not in ids
+    assert ids <= set(index.docs)
+
+
+@pytest.mark.parametrize('use_index', [True, False])
+def test_read_header(app, monkeypatch, use_index):
+    vault_path = AppState.indices['vault1'].path
+    (vault_path / 'props.md').write_text(
+        '\n---\nstatus: done\n---\nbody\n---\nmore')
+    (vault_path / 'toml.md').write_text('+++\na = 1\n+++\nbody')
+    if not use_index:
+        monkeypatch.setattr(AppState, 'text_indices', {})
+    assert read_header(vault_path / 'props.md',
+                       'vault1') == '---\nstatus: done\n---\n'
+    assert read_header(vault_path / 'plain.md', 'vault1') == ''
+    assert read_header(vault_path / 'toml.md',
+                       'vault1') == '+++\na = 1\n+++\nbody'
+    assert read_header(vault_path / 'secret.obf.md', 'vault1') == ''